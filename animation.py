@@ -0,0 +1,72 @@
+# animation.py
+import pygame
+from functions import *
+from masks import mask_cache
+
+# The actions the knight can perform. They are integers so that the player's current animation can be stored
+# as a single index instead of a string key.
+ACTION_IDLE = 0
+ACTION_RUN = 1
+ACTION_JUMP = 2
+ACTION_ATTACK = 3
+ACTION_HURT = 4
+ACTION_DIE = 5
+# The direction the knight is facing.
+FACING_RIGHT = 0
+FACING_LEFT = 1
+
+# Links every action to the name it has in the PLAYER_IMAGES dictionary built in main.py.
+ACTION_NAMES = {
+    ACTION_IDLE : 'IDLE',
+    ACTION_RUN : 'RUN',
+    ACTION_JUMP : 'JUMP',
+    ACTION_ATTACK : 'ATTACK',
+    ACTION_HURT : 'HURT',
+    ACTION_DIE : 'DIE'
+}
+FACING_NAMES = {
+    FACING_RIGHT : 'RIGHT',
+    FACING_LEFT : 'LEFT'
+}
+
+# The animation state is the combination of an action and a facing direction, stored in one integer.
+def animation_state(action, facing):
+    return action * 2 + facing
+
+class AnimationTable:
+    def __init__(self, PLAYER_IMAGES, target_height, animation_speed):
+        # We use the first idle image to find the size at which every frame will be drawn. It is the same
+        # process as before: we keep the original image proportions and only change the height.
+        original_image = PLAYER_IMAGES['PLAYER_IDLE_RIGHT'][0]
+        scale_factor = target_height / original_image.get_height()
+        self.draw_height = target_height
+        self.draw_width = int(original_image.get_width() * scale_factor)
+        self.animation_speed = animation_speed
+
+        # 'frames' holds, for each animation state, the tuple of the scaled images of the animation. The images
+        # are scaled only once here, so the player never has to rescale an image while the game is running.
+        # 'ticks' holds, for each animation state, the image to display at each value of the player's animation
+        # index. Each image is repeated 'animation_speed' times, so picking the image is a simple index lookup.
+        self.frames = [None] * (len(ACTION_NAMES) * len(FACING_NAMES))
+        self.ticks = [None] * (len(ACTION_NAMES) * len(FACING_NAMES))
+        for action, action_name in ACTION_NAMES.items():
+            for facing, facing_name in FACING_NAMES.items():
+                state = animation_state(action, facing)
+                raw_images = PLAYER_IMAGES['PLAYER_%s_%s' % (action_name, facing_name)]
+                scaled_images = []
+                for raw_image in raw_images:
+                    if raw_image.get_size() == (self.draw_width, self.draw_height):
+                        scaled_images.append(raw_image)
+                    else:
+                        scaled_images.append(pygame.transform.scale(raw_image, (self.draw_width, self.draw_height)))
+                self.frames[state] = tuple(scaled_images)
+                # The collision masks of the frames are computed now, so that the collisions only look them up.
+                mask_cache.prewarm(scaled_images)
+                self.ticks[state] = tuple(image for image in scaled_images for _ in range(animation_speed))
+
+    # The number of animation index values before the animation loops back to its first image.
+    def length(self, state):
+        return len(self.ticks[state])
+
+    def first_image(self, state):
+        return self.frames[state][0]
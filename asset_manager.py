@@ -0,0 +1,108 @@
+# asset_manager.py
+# Loads the image and sound files in the background. Decoding a PNG or a WAV file releases the GIL, so the files are
+# decoded by a pool of threads while the main thread keeps drawing the window. Converting an image for the window
+# must happen on the main thread, so the decoded images are finished by 'update', which the main thread calls.
+#
+# Every asset has a priority. The assets are decoded in the order of their priority, and the game only waits for the
+# priorities it needs (for example the start screen only needs the background).
+import concurrent.futures
+import pygame
+from functions import *
+
+# Runs on a thread of the pool. 'prepare' takes the decoded image and returns the tuple of the images to keep.
+def decode_image(path, prepare):
+    return prepare(pygame.image.load(path))
+
+def decode_sound(path):
+    return pygame.mixer.Sound(path)
+
+class AssetManager:
+    def __init__(self, number_of_threads):
+        self.number_of_threads = number_of_threads
+        self.executor = None
+        self.images = {}
+        self.sounds = {}
+        # The jobs waiting for 'start', as (priority, function, arguments, finish) tuples.
+        self.queued_jobs = []
+        # The jobs submitted to the pool and not finished yet, as (priority, future, finish) tuples.
+        self.running_jobs = []
+        # The number of assets not finished yet for each priority.
+        self.remaining = {}
+        self.total = 0
+        self.finished = 0
+
+    def queue(self, priority, function, arguments, finish):
+        self.queued_jobs.append((priority, function, arguments, finish))
+        self.remaining[priority] = self.remaining.get(priority, 0) + 1
+        self.total += 1
+
+    # Decodes the image file and gives it to 'prepare'. The images it returns are stored under 'names'.
+    def queue_image(self, priority, path, names, prepare):
+        self.queue(priority, decode_image, (path, prepare), lambda images: self.finish_images(names, images))
+
+    def queue_sound(self, priority, name, path):
+        self.queue(priority, decode_sound, (path,), lambda sound: self.finish_sound(name, sound))
+
+    # Adds images that are already loaded (for example from the asset pack).
+    def add_images(self, images):
+        self.images.update(images)
+
+    def finish_images(self, names, images):
+        converted = pygame.display.get_surface() is not None
+        for name, image in zip(names, images):
+            if converted:
+                image = image.convert_alpha()
+            self.images[name] = image
+
+    def finish_sound(self, name, sound):
+        self.sounds[name] = sound
+
+    # Submits the queued jobs to the pool, from the highest priority (the smallest number) to the lowest.
+    def start(self):
+        if not self.queued_jobs:
+            return
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(self.number_of_threads)
+        self.queued_jobs.sort(key=lambda job: job[0])
+        for priority, function, arguments, finish in self.queued_jobs:
+            self.running_jobs.append((priority, self.executor.submit(function, *arguments), finish))
+        self.queued_jobs = []
+
+    # Finishes the jobs done by the pool. Must be called on the main thread. An error raised while decoding a
+    # file is raised again here.
+    def update(self):
+        still_running = []
+        for priority, future, finish in self.running_jobs:
+            if future.done():
+                finish(future.result())
+                self.remaining[priority] -= 1
+                self.finished += 1
+            else:
+                still_running.append((priority, future, finish))
+        self.running_jobs = still_running
+        if not self.running_jobs and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def is_ready(self, priority):
+        return all(remaining == 0 for job_priority, remaining in self.remaining.items() if job_priority <= priority)
+
+    # The fraction of the assets that are finished, between 0 and 1.
+    def progress(self):
+        if self.total == 0:
+            return 1.0
+        return self.finished / self.total
+
+    # Waits until every asset of this priority or a higher one is finished. 'draw_progress' is called with the
+    # progress while waiting.
+    def wait(self, priority, draw_progress=None):
+        self.start()
+        while True:
+            self.update()
+            if self.is_ready(priority):
+                return
+            if draw_progress is not None:
+                draw_progress(self.progress())
+            waited_futures = [future for job_priority, future, finish in self.running_jobs if job_priority <= priority]
+            concurrent.futures.wait(waited_futures, timeout=settings.ASSET_LOADER_PROGRESS_INTERVAL / 1000,
+                                    return_when=concurrent.futures.FIRST_COMPLETED)
@@ -0,0 +1,153 @@
+# asset_pack.py
+# Decoding the PNG files and scaling them is the slowest part of starting the game. The asset pack stores the
+# images already scaled and flipped, as raw pixels, in a single file. Loading the pack maps the file in memory
+# and creates the surfaces directly from it, so nothing is decoded or scaled.
+#
+# Layout of the file:
+# - a header: the magic bytes and the length of the index,
+# - the index, in JSON: the key of the pack and, for each image, the offset of its pixels and its size,
+# - the pixels of every image, each one starting at a multiple of PIXEL_ALIGNMENT bytes. The pixels are stored in
+#   the BGRA byte order, which is the order of the 32 bits surfaces SDL creates by default. That way the surfaces
+#   made from the pack are drawn without any conversion, even when there is no window to convert them for.
+#
+# The key holds the modification time of every source file and the Settings values used to scale the images.
+# When one of them changes, the pack is out of date and is built again.
+import json
+import mmap
+import os
+import struct
+import threading
+import pygame
+from functions import *
+
+PACK_MAGIC = b'DODGEPAK'
+PACK_VERSION = 2
+PIXEL_FORMAT = 'BGRA'
+HEADER = struct.Struct('<8sI')
+PIXEL_ALIGNMENT = 16
+
+def aligned(offset):
+    return (offset + PIXEL_ALIGNMENT - 1) // PIXEL_ALIGNMENT * PIXEL_ALIGNMENT
+
+# The key describing the images built from these source files with these Settings values.
+def pack_key(source_files, setting_names):
+    return {
+        'version': PACK_VERSION,
+        'sources': {path: os.stat(path).st_mtime_ns for path in source_files},
+        'settings': {name: getattr(settings, name) for name in setting_names}
+    }
+
+# The pixels of an image as they are stored in the pack: (width, height, bytes).
+def image_pixels(image):
+    return image.get_width(), image.get_height(), pygame.image.tobytes(image, PIXEL_FORMAT)
+
+# Writes the images (a dictionary linking a name to a surface) in the pack file.
+def write_pack(path, images, key):
+    write_pack_pixels(path, {name: image_pixels(image) for name, image in images.items()}, key)
+
+# Writes the pixels of the images (a dictionary linking a name to the result of 'image_pixels') in the pack file.
+# It does not use any surface, so it can run on another thread while the game draws. The file is written next to
+# its final place and then renamed, so a game started at the same time never reads half of a pack. Each writer
+# has its own temporary file, so several processes can build the pack at the same time. When another writer's
+# pack took the place first (or the pack is open and cannot be replaced, on Windows), this one is dropped: both
+# were built with the same key, so they hold the same images.
+def write_pack_pixels(path, images_pixels, key):
+    entries = {}
+    pixels = []
+    offset = 0
+    for name, (width, height, data) in images_pixels.items():
+        offset = aligned(offset)
+        entries[name] = [offset, width, height]
+        pixels.append((offset, data))
+        offset += len(data)
+    index = json.dumps({'key': key, 'images': entries}).encode('utf-8')
+    pixels_start = aligned(HEADER.size + len(index))
+
+    # The temporary file is named after the process and the thread, and it is created with the usual permissions.
+    temporary_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+    try:
+        with open(temporary_path, 'wb') as file:
+            file.write(HEADER.pack(PACK_MAGIC, len(index)))
+            file.write(index)
+            for offset, data in pixels:
+                file.seek(pixels_start + offset)
+                file.write(data)
+        os.replace(temporary_path, path)
+    except (FileNotFoundError, PermissionError):
+        if not pack_has_key(path, key):
+            raise
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+# True when the pack file exists and was built with this key. Only the index is read.
+def pack_has_key(path, key):
+    try:
+        with open(path, 'rb') as file:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return False
+            magic, index_length = HEADER.unpack(header)
+            return magic == PACK_MAGIC and json.loads(file.read(index_length))['key'] == key
+    except (OSError, ValueError):
+        return False
+
+class AssetPack:
+    def __init__(self, data, images):
+        # Without a window the surfaces use the memory of the mapped file, so the mapping is kept as long as the
+        # pack. With one, the images were copied out of the file and 'data' is None.
+        self.data = data
+        self.images = images
+
+    def __getitem__(self, name):
+        return self.images[name]
+
+# Reads the index of the pack. Returns None when the file is not a pack, is cut short or is damaged.
+def read_index(data):
+    magic, index_length = HEADER.unpack_from(data)
+    if magic != PACK_MAGIC:
+        return None
+    try:
+        index = json.loads(data[HEADER.size:HEADER.size + index_length])
+        pixels_start = aligned(HEADER.size + index_length)
+        entries = {name: (pixels_start + offset, width, height) for name, (offset, width, height) in index['images'].items()}
+        key = index['key']
+    except (ValueError, KeyError, TypeError):
+        return None
+    if any(start + width * height * 4 > len(data) for start, width, height in entries.values()):
+        return None
+    return key, entries
+
+# Opens the pack file. Returns None when the file does not exist, is not a pack (or a damaged one) or was built
+# with another key. Then the images are decoded from the PNG files.
+def open_pack(path, key):
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            return None
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    index = read_index(data)
+    if index is None or index[0] != key:
+        data.close()
+        return None
+
+    buffer = memoryview(data)
+    converted = pygame.display.get_surface() is not None
+    images = {}
+    for name, (start, width, height) in index[1].items():
+        pixels = buffer[start:start + width * height * 4]
+        image = pygame.image.frombuffer(pixels, (width, height), PIXEL_FORMAT)
+        # With a window the images are converted like load_image does, which copies them out of the file. The
+        # surface made on the file is then dropped, so that the file can be unmapped once every image is copied.
+        if converted:
+            image = image.convert_alpha()
+            pixels.release()
+        images[name] = image
+    if converted:
+        buffer.release()
+        data.close()
+        data = None
+    return AssetPack(data, images)
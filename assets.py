@@ -0,0 +1,290 @@
+# assets.py
+import os
+import sys
+import pygame
+from functions import *
+from animation import AnimationTable
+from surface_cache import surface_cache
+from masks import mask_cache
+from functools import partial
+from asset_pack import image_pixels, open_pack, pack_key, write_pack, write_pack_pixels
+from asset_manager import AssetManager
+from entity import Spear
+
+# The folder and file name of each of the player's animations. There are 10 images per animation.
+PLAYER_ANIMATION_FILES = {
+    'RUN' : 'player_animations/player_run_images/Knight_01__RUN_00%s.png',
+    'ATTACK' : 'player_animations/player_attack_images/Knight_01__ATTACK_00%s.png',
+    'DIE' : 'player_animations/player_die_images/Knight_01__DIE_00%s.png',
+    'HURT' : 'player_animations/player_hurt_images/Knight_01__HURT_00%s.png',
+    'IDLE' : 'player_animations/player_idle_images/Knight_01__IDLE_00%s.png',
+    'JUMP' : 'player_animations/player_jump_images/Knight_01__JUMP_00%s.png'
+}
+PLAYER_ANIMATION_LENGTH = 10
+
+# The background layers from the farthest to the closest, with their scrolling speed (as a multiple of
+# 'settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR').
+BACKGROUND_LAYER_FILES = [
+    ('background_layers/1_sky.png', 1),
+    ('background_layers/2_clouds.png', 2),
+    ('background_layers/3_mountain.png', 1),
+    ('background_layers/4_clouds.png', 3),
+    ('background_layers/5_ground.png', 4),
+    ('background_layers/6_ground.png', 7),
+    ('background_layers/7_ground.png', 8),
+    ('background_layers/8_plant.png', 8)
+]
+GROUND_FILE = 'background_layers/ground.png'
+GROUND_SPEED = 10
+
+# The files of the images that are neither animations nor background layers, with their name in the asset pack.
+IMAGE_FILES = {
+    'BADDIE' : 'baddie.png',
+    'PLATFORM' : 'platform.png',
+    'SPEAR' : 'spear.png',
+    'SHIELD_EFFECT' : 'shield_effect.png',
+    'SHIELD_PICKUP' : 'shield_pickup.png',
+    'RED_HEART' : 'red_heart.png',
+    'BLUE_HEART' : 'blue_heart.png'
+}
+
+# The Settings values that change the size of the prepared images. Changing one of them rebuilds the asset pack.
+PACK_SETTINGS = [
+    'WINDOW_WIDTH', 'WINDOW_HEIGHT', 'GROUND_HEIGHT', 'PLAYER_HEIGHT', 'PLAYER_HITBOX_IMAGE_HEIGHT_FACTOR',
+    'PLAYER_LIVES_DISPLAY_SIZE', 'SHIELD_PICKUP_SIZE', 'SPEAR_WIDTH', 'PLATFORM_WIDTH', 'PLATFORM_HEIGHT'
+]
+
+def source_files():
+    files = list(IMAGE_FILES.values())
+    for file_name in PLAYER_ANIMATION_FILES.values():
+        files += [file_name % (i) for i in range(PLAYER_ANIMATION_LENGTH)]
+    files += [file_name for file_name, speed in BACKGROUND_LAYER_FILES]
+    files.append(GROUND_FILE)
+    return files
+
+# The priorities of the assets. The start screen only needs the background, the first frame of the game needs every
+# image, and the sounds are only needed later. Nothing waits for the asset pack, which is written last.
+PRIORITY_START_SCREEN = 0
+PRIORITY_GAMEPLAY = 1
+PRIORITY_SOUNDS = 2
+PRIORITY_PACK = 3
+
+# The sound effects have the name of the game event that plays them (see game_events.py).
+SOUND_FILES = {
+    'GAME_OVER' : 'gameover.wav',
+    'JUMP' : 'Jump.wav',
+    'ATTACK' : 'Spear.wav',
+    'KILL' : 'Kill.wav',
+    'ENEMY_ATTACK' : 'Dragon_attack.wav',
+    'HIT' : 'Hit.wav',
+    'DEATH' : 'Death.wav',
+    'SHIELD_BREAK' : 'Shield_break.wav',
+    'PICKUP' : 'pickup.wav',
+    'SHIELD' : 'Shield.wav',
+    'BUTTON' : 'Button.wav'
+}
+
+def scaled_to_height(image, target_height):
+    scale_factor = target_height / image.get_height()
+    return pygame.transform.scale(image, (int(image.get_width() * scale_factor), target_height))
+
+# The functions preparing the decoded images. Each one returns the tuple of the images to keep. They run on the
+# threads of the asset manager.
+def prepare_unchanged(image):
+    return (image,)
+
+def prepare_scaled(size, image):
+    return (pygame.transform.scale(image, size),)
+
+def prepare_scaled_to_width(target_width, image):
+    return (pygame.transform.scale(image, (target_width, int(image.get_height() * target_width / image.get_width()))),)
+
+def prepare_scaled_to_height(target_height, image):
+    return (scaled_to_height(image, target_height),)
+
+# The knight's images are flipped at full resolution and then scaled.
+def prepare_player_image(image):
+    return (scaled_to_height(image, settings.PLAYER_HEIGHT), scaled_to_height(pygame.transform.flip(image, True, False), settings.PLAYER_HEIGHT))
+
+# Tells how to make every image used by the game, as (priority, file, names, prepare) tuples. The images keep the
+# same sizes as when the entities scaled them themselves, so the entities find them already at the right size.
+def image_recipes():
+    lives_size = (settings.PLAYER_LIVES_DISPLAY_SIZE, settings.PLAYER_LIVES_DISPLAY_SIZE)
+    shield_effect_size = int(settings.PLAYER_HEIGHT * settings.PLAYER_HITBOX_IMAGE_HEIGHT_FACTOR) + 10
+    recipes = []
+    for i, (file_name, speed) in enumerate(BACKGROUND_LAYER_FILES):
+        recipes.append((PRIORITY_START_SCREEN, file_name, ('BACKGROUND_%d' % (i),), partial(prepare_scaled, (settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT))))
+    recipes.append((PRIORITY_START_SCREEN, GROUND_FILE, ('GROUND',), partial(prepare_scaled_to_height, settings.GROUND_HEIGHT)))
+    for action, file_name in PLAYER_ANIMATION_FILES.items():
+        for i in range(PLAYER_ANIMATION_LENGTH):
+            recipes.append((PRIORITY_GAMEPLAY, file_name % (i), ('PLAYER_%s_RIGHT_%d' % (action, i), 'PLAYER_%s_LEFT_%d' % (action, i)), prepare_player_image))
+    # The baddies are drawn at many sizes, so their image is kept as it is.
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['BADDIE'], ('BADDIE',), prepare_unchanged))
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['PLATFORM'], ('PLATFORM',), partial(prepare_scaled, (settings.PLATFORM_WIDTH, settings.PLATFORM_HEIGHT))))
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['SPEAR'], ('SPEAR',), partial(prepare_scaled_to_width, settings.SPEAR_WIDTH)))
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['SHIELD_EFFECT'], ('SHIELD_EFFECT',), partial(prepare_scaled, (shield_effect_size, shield_effect_size))))
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['SHIELD_PICKUP'], ('SHIELD_PICKUP',), partial(prepare_scaled, (settings.SHIELD_PICKUP_SIZE, settings.SHIELD_PICKUP_SIZE))))
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['RED_HEART'], ('RED_HEART',), partial(prepare_scaled, lives_size)))
+    recipes.append((PRIORITY_GAMEPLAY, IMAGE_FILES['BLUE_HEART'], ('BLUE_HEART',), partial(prepare_scaled, lives_size)))
+    return recipes
+
+# Loads every image from its file on the current thread.
+def build_images():
+    images = {}
+    for priority, path, names, prepare in image_recipes():
+        images.update(zip(names, prepare(load_image(path))))
+    return images
+
+# Builds the asset pack when it is missing or out of date. It is called before starting processes that all load
+# the assets (see vec_env.py), so that the pack is written once instead of by every process at the same time.
+def prepare_asset_pack():
+    if settings.ASSET_PACK_FILE is None:
+        return
+    key = pack_key(source_files(), PACK_SETTINGS)
+    if open_pack(settings.ASSET_PACK_FILE, key) is None:
+        write_pack(settings.ASSET_PACK_FILE, build_images(), key)
+
+# Writes the asset pack on a thread of the pool of the asset manager. Nothing waits for this job (the asset manager
+# may not even be updated any more when it ends), so an error is reported here: the game runs without the pack,
+# but without the message it would decode the PNG files at every start without anyone knowing why.
+def write_pack_in_background(path, images_pixels, key):
+    try:
+        write_pack_pixels(path, images_pixels, key)
+    except Exception as error:
+        print('The asset pack %s could not be written, the images will be decoded again at the next start: %r' % (path, error), file=sys.stderr)
+
+# Holds all of the images and sounds used by the game. It does not need a window, so the game can also be loaded
+# without one (for example with the SDL dummy video driver).
+# The images come from the asset pack 'settings.ASSET_PACK_FILE' when it is up to date. Otherwise they are decoded
+# from the PNG files by the asset manager, and the pack is written again by the pool of the asset manager once they
+# are all loaded. When 'settings.ASSET_PACK_FILE' is None, the images are decoded from the PNG files at every start.
+# Without an asset manager, everything is loaded before the constructor returns. With one, the caller decides when
+# to wait for each priority with 'load', and can draw the progress in the meantime.
+# With 'writes_pack' False, an out of date pack is not written again (the caller built it with 'prepare_asset_pack').
+class GameAssets:
+    def __init__(self, asset_manager=None, writes_pack=True):
+        self.writes_pack = writes_pack
+        loads_everything = asset_manager is None
+        if loads_everything:
+            asset_manager = AssetManager(settings.ASSET_LOADER_THREADS)
+        self.asset_manager = asset_manager
+        self.asset_pack = None
+        self.pack_key_to_write = None
+        # The pixels of the images to write in the pack, by name (see 'prepare_for_pack').
+        self.pack_pixels = {}
+        self.loaded_priority = -1
+        self.queue_images()
+        if pygame.mixer.get_init():
+            for name, file_name in SOUND_FILES.items():
+                asset_manager.queue_sound(PRIORITY_SOUNDS, name, file_name)
+        asset_manager.start()
+        if loads_everything:
+            self.load(PRIORITY_SOUNDS)
+
+    def queue_images(self):
+        recipes = image_recipes()
+        if settings.ASSET_PACK_FILE is not None:
+            key = pack_key(source_files(), PACK_SETTINGS)
+            self.asset_pack = open_pack(settings.ASSET_PACK_FILE, key)
+            if self.asset_pack is not None:
+                self.asset_manager.add_images(self.asset_pack.images)
+                return
+            if self.writes_pack:
+                self.pack_key_to_write = key
+        for priority, path, names, prepare in recipes:
+            if self.pack_key_to_write is not None:
+                prepare = partial(self.prepare_for_pack, names, prepare)
+            self.asset_manager.queue_image(priority, path, names, prepare)
+
+    # Runs on a thread of the pool like 'prepare', and also keeps the pixels of the images for the pack. They are
+    # read here, before the images are given to the game: a surface being read is locked and cannot be drawn.
+    def prepare_for_pack(self, names, prepare, image):
+        images = prepare(image)
+        for name, prepared_image in zip(names, images):
+            self.pack_pixels[name] = image_pixels(prepared_image)
+        return images
+
+    # Waits until the assets of this priority and of the higher ones are loaded, and makes them available.
+    # 'draw_progress' is called with the loading progress while waiting.
+    def load(self, priority, draw_progress=None):
+        self.asset_manager.wait(priority, draw_progress)
+        images = self.asset_manager.images
+        if self.loaded_priority < PRIORITY_START_SCREEN <= priority:
+            self.load_start_screen_images(images)
+        if self.loaded_priority < PRIORITY_GAMEPLAY <= priority:
+            self.load_gameplay_images(images)
+            if self.pack_key_to_write is not None:
+                # The images are written in the order of the recipes, not in the order the threads finished them.
+                pack_pixels = {name: self.pack_pixels[name] for recipe in image_recipes() for name in recipe[2]}
+                self.asset_manager.queue(PRIORITY_PACK, write_pack_in_background, (settings.ASSET_PACK_FILE, pack_pixels, self.pack_key_to_write), lambda result: None)
+                self.asset_manager.start()
+                self.pack_key_to_write = None
+                self.pack_pixels = {}
+        if self.loaded_priority < PRIORITY_SOUNDS <= priority:
+            # Every sound by name. It is empty when the game runs without any audio device.
+            self.SOUNDS = dict(self.asset_manager.sounds)
+            self.GAME_OVER_SOUND = self.SOUNDS.get('GAME_OVER')
+        self.loaded_priority = max(self.loaded_priority, priority)
+
+    def load_start_screen_images(self, images):
+        # Tuples of the background image layer associated wiht its scrolling speed. The images are made to loop
+        # horizontally to make the effect of an infinite image.
+        self.BACKGROUND_IMAGES_AND_SPEEDS = [(images['BACKGROUND_%d' % (i)], speed * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR)
+                                             for i, (file_name, speed) in enumerate(BACKGROUND_LAYER_FILES)]
+        # Ground image. It is drawn separately because it will be drawn in the foreground.
+        self.GROUND_IMAGE_AND_SPEED = (images['GROUND'], GROUND_SPEED * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR)
+
+    def load_gameplay_images(self, images):
+        # Game related images.
+        self.BADDIE_IMAGE = images['BADDIE']
+        self.PLATFORM_IMAGE = images['PLATFORM']
+        self.SPEAR_IMAGE = images['SPEAR']
+        self.SHIELD_EFFECT_IMAGE = images['SHIELD_EFFECT']
+        self.SHIELD_PICKUP_IMAGE = images['SHIELD_PICKUP']
+        self.RED_HEART_IMAGE = images['RED_HEART']
+        self.BLUE_HEART_IMAGE = images['BLUE_HEART']
+        # The baddies can have any size between 'settings.BADDIE_MIN_SIZE' and 'settings.BADDIE_MAX_SIZE'. We scale their
+        # image to all of these sizes now so that spawning a baddie never has to scale an image. The scaled images of
+        # the baddies, the spears and the shield pickups are pinned in the surface cache, and their collision masks
+        # are computed now too (see masks.py).
+        mask_cache.prewarm(surface_cache.pin(self.BADDIE_IMAGE, (size, size)) for size in range(settings.BADDIE_MIN_SIZE, settings.BADDIE_MAX_SIZE + 1))
+        mask_cache.prewarm(surface_cache.pin(self.SPEAR_IMAGE, Spear.draw_size(self.SPEAR_IMAGE), flip_x=flip_x) for flip_x in (False, True))
+        mask_cache.prewarm([surface_cache.pin(self.SHIELD_PICKUP_IMAGE, (settings.SHIELD_PICKUP_SIZE, settings.SHIELD_PICKUP_SIZE))])
+
+        # The player is animated. So in order to store all of the different animations we created a dictionary.
+        # Each key gives acces to the list with all of the images related to this action, facing right or left.
+        PLAYER_IMAGES = {}
+        for action in PLAYER_ANIMATION_FILES:
+            for facing in ('RIGHT', 'LEFT'):
+                PLAYER_IMAGES['PLAYER_%s_%s' % (action, facing)] = [images['PLAYER_%s_%s_%d' % (action, facing, i)] for i in range(PLAYER_ANIMATION_LENGTH)]
+        # The images are already at the size at which they are drawn, so the animation table uses them as they are.
+        self.PLAYER_ANIMATIONS = AnimationTable(PLAYER_IMAGES, settings.PLAYER_HEIGHT, settings.PLAYER_ANIMATION_SLOWER)
+
+# Builds the asset pack, even if it is up to date, and compares the time needed to prepare the images from the
+# PNG files with the time needed to load them from the pack: python assets.py
+if __name__ == '__main__':
+    import time
+
+    # The resident memory of the process in megabytes, read from /proc/self/statm. None where it does not exist.
+    def resident_memory():
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+        except OSError:
+            return None
+
+    start = time.perf_counter()
+    images = build_images()
+    build_time = time.perf_counter() - start
+    write_pack(settings.ASSET_PACK_FILE, images, pack_key(source_files(), PACK_SETTINGS))
+    pixel_bytes = sum(image.get_width() * image.get_height() * 4 for image in images.values())
+    del images
+    memory_before = resident_memory()
+    start = time.perf_counter()
+    pack = open_pack(settings.ASSET_PACK_FILE, pack_key(source_files(), PACK_SETTINGS))
+    load_time = time.perf_counter() - start
+    memory_after = resident_memory()
+    print('%d images, %.1f MB of pixels written to %s' % (len(pack.images), pixel_bytes / 2**20, settings.ASSET_PACK_FILE))
+    print('built from the PNG files in %.2f s, loaded from the pack in %.3f s' % (build_time, load_time))
+    if memory_before is not None:
+        print('resident memory: %.1f MB before loading the pack, %.1f MB after' % (memory_before, memory_after))
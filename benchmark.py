@@ -0,0 +1,243 @@
+# benchmark.py
+# Runs the game loop of main.py without a window over a scripted sequence of inputs and measures how long each
+# phase of a frame takes. The results can be compared to a stored baseline to find out if a change made the game slower.
+# The frame times depend on the computer, so the baseline is made on the computer that runs the benchmark (before
+# the change to measure) and is not part of the repository. There is one baseline per backend and quality.
+#
+# python benchmark.py --update-baseline    -> runs the benchmark and stores the results as the baseline of this computer
+# python benchmark.py                      -> runs the benchmark and compares it to the baseline
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import pygame
+from functions import *
+
+# The baseline file used without --baseline, named after the backend and the quality.
+DEFAULT_BASELINE_FILE = 'benchmark_baseline_%s_q%d.json'
+# The frame time percentiles that are reported and compared to the baseline.
+PERCENTILES = (50, 95, 99)
+
+# Creates the inputs of every frame of the benchmark. The sequence only depends on the seed, so every run of the
+# benchmark plays exactly the same game.
+def create_input_script(number_of_frames, seed):
+    from simulation import InputState
+    script_random = random.Random(seed)
+    inputs_script = []
+    run_direction = 0
+    for frame in range(number_of_frames):
+        # The player changes the direction he runs in from time to time, and jumps and attacks regularly.
+        if frame % 45 == 0:
+            run_direction = script_random.choice((-1, 0, 1, 1))
+        inputs_script.append(InputState(run_direction == -1, run_direction == 1, script_random.random() < 0.04, script_random.random() < 0.06))
+    return inputs_script
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class FrameBenchmark:
+    def __init__(self, number_of_frames, seed, warmup_frames, quality=0, backend='surface'):
+        self.number_of_frames = number_of_frames
+        self.seed = seed
+        self.warmup_frames = warmup_frames
+        self.quality = quality
+        self.backend = backend
+
+    def setup(self):
+        # The SDL dummy video driver lets the game create its window surface without showing anything.
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        from assets import GameAssets
+        from simulation import GameSimulation
+        from renderer import GameRenderer
+        from quality import QUALITY_LEVELS
+        from render_backend import create_backend
+        pygame.init()
+        settings.RENDER_BACKEND = self.backend
+        # Without a graphics card, the texture backend runs on SDL's software renderer.
+        if os.environ['SDL_VIDEODRIVER'] == 'dummy':
+            settings.TEXTURE_RENDERER_SOFTWARE = True
+        backend = create_backend('Benchmark')
+        font = pygame.font.SysFont(None, 48)
+        assets = GameAssets()
+        self.simulation = GameSimulation(assets, seed=self.seed)
+        self.renderer = GameRenderer(backend.surface, assets, font, backend)
+        self.renderer.prewarm_backend()
+        if self.quality > 0:
+            self.renderer.set_quality(QUALITY_LEVELS[self.quality])
+        # Every phase of a frame, in the order main.py runs them.
+        self.phases = [('input', None)]
+        self.phases += [('update.%s' % name, phase) for name, phase in self.simulation.update_phases]
+        self.phases += [('update.background', None)]
+        self.phases += [('draw.%s' % name, phase) for name, phase in self.renderer.draw_phases]
+        self.simulation.phase_timer = self.time_update_phase
+        self.phase_times = {name: [] for name, phase in self.phases}
+        self.measured = False
+
+    # Runs a phase of GameSimulation.step and measures it.
+    def time_update_phase(self, name, phase):
+        start = time.perf_counter_ns()
+        phase()
+        end = time.perf_counter_ns()
+        if self.measured:
+            self.phase_times['update.%s' % name].append(end - start)
+
+    def run(self):
+        self.setup()
+        random.seed(self.seed)
+        inputs_script = create_input_script(self.warmup_frames + self.number_of_frames, self.seed)
+        phase_times = self.phase_times
+        frame_times = []
+        allocated_blocks = []
+        collections_before = [stats['collections'] for stats in gc.get_stats()]
+        games = 1
+        simulation = self.simulation
+        renderer = self.renderer
+        clock = time.perf_counter_ns
+
+        for frame, inputs in enumerate(inputs_script):
+            measured = frame >= self.warmup_frames
+            self.measured = measured
+            if measured and frame == self.warmup_frames:
+                collections_before = [stats['collections'] for stats in gc.get_stats()]
+            blocks_before = sys.getallocatedblocks()
+            frame_start = clock()
+
+            # Input: the events are read like in main.py, but the player's inputs come from the script.
+            start = clock()
+            event_dispatcher.poll()
+            end = clock()
+            if measured:
+                phase_times['input'].append(end - start)
+
+            # Update: a step of the simulation, whose phases are measured one by one by 'time_update_phase'.
+            simulation.step(inputs)
+            start = clock()
+            renderer.update()
+            end = clock()
+            if measured:
+                phase_times['update.background'].append(end - start)
+
+            # Draw: the same phases as GameRenderer.draw, measured one by one.
+            for name, phase in renderer.draw_phases:
+                start = clock()
+                phase(simulation)
+                end = clock()
+                if measured:
+                    phase_times['draw.%s' % name].append(end - start)
+
+            frame_end = clock()
+            if measured:
+                frame_times.append(frame_end - frame_start)
+                allocated_blocks.append(sys.getallocatedblocks() - blocks_before)
+
+            # The benchmark keeps playing after a game over, like a player who starts a new game.
+            if simulation.game_over:
+                simulation.reset()
+                games += 1
+
+        collections_after = [stats['collections'] for stats in gc.get_stats()]
+        return self.create_report(phase_times, frame_times, allocated_blocks, collections_before, collections_after, games)
+
+    def create_report(self, phase_times, frame_times, allocated_blocks, collections_before, collections_after, games):
+        report = {
+            'frames': self.number_of_frames,
+            'seed': self.seed,
+            'backend': self.backend,
+            'quality': self.quality,
+            'games': games,
+            'frame_ms': {},
+            'phases_ms': {},
+            'allocated_blocks_per_frame': sum(allocated_blocks) / max(1, len(allocated_blocks)),
+            'gc_collections': [after - before for before, after in zip(collections_before, collections_after)]
+        }
+        sorted_frame_times = sorted(frame_times)
+        for percent in PERCENTILES:
+            report['frame_ms']['p%d' % percent] = percentile(sorted_frame_times, percent) / 1e6
+        report['frame_ms']['mean'] = sum(frame_times) / max(1, len(frame_times)) / 1e6
+        for name, times in phase_times.items():
+            sorted_times = sorted(times)
+            report['phases_ms'][name] = {
+                'mean': sum(times) / max(1, len(times)) / 1e6,
+                'p50': percentile(sorted_times, 50) / 1e6,
+                'p95': percentile(sorted_times, 95) / 1e6,
+                'p99': percentile(sorted_times, 99) / 1e6
+            }
+        return report
+
+def print_report(report):
+    print('%d frames, seed %d, %d games' % (report['frames'], report['seed'], report['games']))
+    print('frame time: mean %.3f ms, p50 %.3f ms, p95 %.3f ms, p99 %.3f ms' % (
+        report['frame_ms']['mean'], report['frame_ms']['p50'], report['frame_ms']['p95'], report['frame_ms']['p99']))
+    print('net allocated blocks per frame: %.1f, gc collections (gen 0, 1, 2): %s' % (
+        report['allocated_blocks_per_frame'], report['gc_collections']))
+    print('%-28s %9s %9s %9s %9s' % ('phase', 'mean', 'p50', 'p95', 'p99'))
+    for name, times in report['phases_ms'].items():
+        print('%-28s %9.3f %9.3f %9.3f %9.3f' % (name, times['mean'], times['p50'], times['p95'], times['p99']))
+
+# Compares the frame time percentiles to the baseline. Returns the list of the percentiles that got slower than
+# the baseline by more than the tolerance.
+def find_regressions(report, baseline, tolerance):
+    regressions = []
+    for percent in PERCENTILES:
+        key = 'p%d' % percent
+        baseline_time = baseline['frame_ms'].get(key)
+        if baseline_time is None:
+            continue
+        if report['frame_ms'][key] > baseline_time * (1 + tolerance):
+            regressions.append('%s frame time %.3f ms > baseline %.3f ms (+%d%% allowed)' % (
+                key, report['frame_ms'][key], baseline_time, tolerance * 100))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Frame time benchmark of the game loop.')
+    parser.add_argument('--frames', type=int, default=3000, help='number of measured frames')
+    parser.add_argument('--warmup', type=int, default=120, help='number of frames run before measuring')
+    parser.add_argument('--seed', type=int, default=1234, help='seed of the random numbers and of the input script')
+    parser.add_argument('--baseline', help='baseline JSON file (default: benchmark_baseline_<backend>_q<quality>.json)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown compared to the baseline (0.25 = 25%%)')
+    parser.add_argument('--quality', type=int, default=0, help='quality level of the drawing (0 is the highest, see quality.py)')
+    parser.add_argument('--backend', choices=('surface', 'texture'), default='surface', help='render backend (see render_backend.py)')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    arguments = parser.parse_args()
+    if arguments.baseline is None:
+        arguments.baseline = DEFAULT_BASELINE_FILE % (arguments.backend, arguments.quality)
+
+    report = FrameBenchmark(arguments.frames, arguments.seed, arguments.warmup, arguments.quality, arguments.backend).run()
+    print_report(report)
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if arguments.update_baseline:
+        with open(arguments.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print('baseline stored in %s' % arguments.baseline)
+        return 0
+    if not os.path.exists(arguments.baseline):
+        print('no baseline found in %s, run with --update-baseline to create one' % arguments.baseline)
+        return 0
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if (baseline.get('backend'), baseline.get('quality')) != (arguments.backend, arguments.quality):
+        print('the baseline in %s was not made with the %s backend at quality %d, run with --update-baseline to make one' % (
+            arguments.baseline, arguments.backend, arguments.quality))
+        return 0
+    regressions = find_regressions(report, baseline, arguments.tolerance)
+    if regressions:
+        print('REGRESSION')
+        for regression in regressions:
+            print('  ' + regression)
+        return 1
+    print('no regression compared to %s' % arguments.baseline)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,33 +2,45 @@ import pygame
 from pygame.locals import *
 from functions import *
 from settings import *
+from animation import *
+from surface_cache import surface_cache
+from spatial_hash import spritecollide
+from masks import collide_masks
+from pools import PooledSprite
+from scheduler import Scheduler
+from game_events import *
 import random
 
-class Entity(pygame.sprite.Sprite):
+class Entity(PooledSprite):
     def __init__ (self, image, image_width, image_height):
         super().__init__()
-        self.image = pygame.transform.scale(image, (image_width, image_height))
+        self.original_image = image
+        # The scaled image comes from the shared surface cache, so entities of the same size share the same image.
+        self.image = surface_cache.get_scaled(image, (image_width, image_height))
         self.rect = self.image.get_rect()
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, PLAYER_IMAGES):
+    # 'events' is the GameEvents of the simulation, which is told when the player jumps, attacks, picks up a shield
+    # or is hit. 'scheduler' is the Scheduler of the simulation, which ends the shield and the invulnerability. A
+    # player made without one runs its own scheduler in 'update'.
+    def __init__(self, PLAYER_ANIMATIONS, events=None, scheduler=None):
         super().__init__()
+        if events is None:
+            events = GameEvents()
+        self.events = events
+        self.runs_scheduler = scheduler is None
+        if scheduler is None:
+            scheduler = Scheduler()
+        self.scheduler = scheduler
         # The current image index will be useful to iterate through the animations.
         self.current_image_index = 0
-        self.player_images = PLAYER_IMAGES
-        # The target height will be used to find the width of the player image that will be displayed.
-        target_height = settings.PLAYER_HEIGHT
-
-        original_image = self.player_images['PLAYER_IDLE_RIGHT'][0]
-        original_width = original_image.get_width()
-        original_height = original_image.get_height()
-        # We define the scale factor that tells us by how much we shrank the height compared to the original image.
-        # That way we will keep the original image proportions.
-        scale_factor = target_height / original_height
-        self.draw_height = target_height
-        self.draw_width = int(original_width * scale_factor)
-        # Here the image that will be displayed on the screen is created by scaling the original image.
-        self.image = pygame.transform.scale(original_image, (self.draw_width, self.draw_height))
+        # The animation table holds every image of the knight already scaled to 'settings.PLAYER_HEIGHT'.
+        self.animations = PLAYER_ANIMATIONS
+        self.animation_state = animation_state(ACTION_IDLE, FACING_RIGHT)
+        self.draw_height = self.animations.draw_height
+        self.draw_width = self.animations.draw_width
+        # Here the image that will be displayed on the screen is the first idle image.
+        self.image = self.animations.first_image(self.animation_state)
         # We define the hitbox of the player. We want the hitbox to be around the player's armor and it should
         # not take into account the spear nor the cape of the player. Also the image has quite a lot of empty space
         # around the knight, so we want to ignore that.
@@ -67,12 +79,14 @@ class Player(pygame.sprite.Sprite):
 
         # Setting the variables regarding the lives and shield.
         self.lives = settings.PLAYER_STARTING_LIVES
-        # These two timers will be used to track when will the corresponding effect need to be disabled after being activated.
-        self.invulnerability_timer = 0
-        self.shield_timer = 0
+        # The scheduled events that will disable the corresponding effect after it was activated.
+        self.invulnerability_end = None
+        self.shield_end = None
         # We set the variables to false.
         self.has_shield = False
         self.is_invulnerable = False
+        # True when the player is invulnerable and his image is in the invisible part of the flash.
+        self.flash_hidden = False
         self.dead = False
 
         # We also set the movement variables to False.
@@ -84,44 +98,30 @@ class Player(pygame.sprite.Sprite):
         self.attack_right = False
         self.attack_left = False
 
-    def handle_input(self, ground_group, platform_group, spear_group, SPEAR_IMAGE):
-        # The 'red cross' at the top left of the window closes the game.
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                terminate()
-            # The 'space', 'up arrow' and 'w' keys make the player jump only if he is on the ground or on a platform.
-            if event.type == KEYDOWN:
-                if event.key in (K_SPACE, K_UP, K_w) and (self.on_ground or self.on_platform):
-                    self.jump(ground_group, platform_group)
-                # The 'down arrow' and 's' keys make the player throw a spear only if he is not already attacking.
-                if event.key in (K_DOWN, K_s) and (not self.attack_left or not self.attack_right):
-                    self.attack(spear_group, SPEAR_IMAGE)
-            # The game will close after the player clicks the 'escape' key.
-            if event.type == KEYUP:
-                if event.key == K_ESCAPE:
-                    terminate()
-            
-        # Here we look at the state of the all the keys at each frame. It is useful because
-        # running left or right are continuous movements.
-        keys = pygame.key.get_pressed()
-        # We first set the movements to False.
-        self.run_left = False
-        self.run_right = False
-        # The 'left arrow' and 'a' keys make the player go left.
-        if keys[K_LEFT] or keys[K_a]:
-            self.run_left = True
-        # The 'right arrow' and 'd' keys make the player go right.
-        if keys[K_RIGHT] or keys[K_d]:
-            self.run_right = True
+    def handle_input(self, inputs, ground_group, platform_group, spear_group, spear_pool):
+        # The inputs are given by the game (the keyboard in the window, or a script or a bot when the game runs
+        # without a window). The jump and the attack are only True at the step where the key was pressed.
+        # The jump makes the player jump only if he is on the ground or on a platform.
+        if inputs.jump and (self.on_ground or self.on_platform):
+            self.jump(ground_group, platform_group)
+        # The attack makes the player throw a spear only if he is not already attacking.
+        if inputs.attack and (not self.attack_left or not self.attack_right):
+            self.attack(spear_group, spear_pool)
+
+        # Running left or right are continuous movements, so they are True as long as the keys are held down.
+        self.run_left = inputs.left
+        self.run_right = inputs.right
         # If both movements were set to True we reset them both to False. (the forces kind of balance out)
         if self.run_left and self.run_right:
             self.run_right = self.run_left = False
 
-    def update(self, ground_group, platform_group, spear_group, SPEAR_IMAGE, baddie_group, shield_pickup_group, shield_effect_group, SHIELD_EFFECT_IMAGE):
-        # Here we get the current time in ticks (milliseconds).
-        self.current_time = pygame.time.get_ticks()
+    def update(self, inputs, current_time, ground_group, platform_group, spear_group, spear_pool, baddie_group, shield_pickup_group, shield_effect_group, SHIELD_EFFECT_IMAGE):
+        # The current time in milliseconds is given by the game's clock.
+        self.current_time = current_time
+        if self.runs_scheduler:
+            self.scheduler.run(current_time)
         # Check for the player's input at each update.
-        self.handle_input(ground_group, platform_group, spear_group, SPEAR_IMAGE)
+        self.handle_input(inputs, ground_group, platform_group, spear_group, spear_pool)
         # Set the initial acceleration to (0, gravity). (gravity is always present)
         self.acceleration = pygame.math.Vector2(0, self.VERTICAL_ACCELERATION)
         # Update the horizontal acceleration of the player according to the inputs.
@@ -134,27 +134,20 @@ class Player(pygame.sprite.Sprite):
         # First we look if the player is attacking, then if he is jumping, then if he is running. and if he does
         # nothing then the knight will idle. To check he the player is going left or right we check the
         # player's velocity on the 'x' axis. If it is positiv it means he was or is moving right and if negative
-        # it means the opposite.
+        # it means the opposite. When he is attacking or running we use the direction of the attack or of the run.
         if self.attack_right or self.attack_left:
-            if self.attack_right:
-                self.animate(self.player_images['PLAYER_ATTACK_RIGHT'], settings.PLAYER_ANIMATION_SLOWER)
-            else:
-                self.animate(self.player_images['PLAYER_ATTACK_LEFT'], settings.PLAYER_ANIMATION_SLOWER)
+            action = ACTION_ATTACK
+            facing = FACING_RIGHT if self.attack_right else FACING_LEFT
         elif self.in_a_jump:
-            if self.velocity.x > 0:
-                self.animate(self.player_images['PLAYER_JUMP_RIGHT'], settings.PLAYER_ANIMATION_SLOWER)
-            else:
-                self.animate(self.player_images['PLAYER_JUMP_LEFT'], settings.PLAYER_ANIMATION_SLOWER)
+            action = ACTION_JUMP
+            facing = FACING_RIGHT if self.velocity.x > 0 else FACING_LEFT
         elif self.run_left or self.run_right:
-            if self.run_right:
-                self.animate(self.player_images['PLAYER_RUN_RIGHT'], settings.PLAYER_ANIMATION_SLOWER)            
-            else:
-                self.animate(self.player_images['PLAYER_RUN_LEFT'], settings.PLAYER_ANIMATION_SLOWER)
+            action = ACTION_RUN
+            facing = FACING_RIGHT if self.run_right else FACING_LEFT
         else:
-            if self.velocity.x > 0:
-                self.animate(self.player_images['PLAYER_IDLE_RIGHT'], settings.PLAYER_ANIMATION_SLOWER)
-            else:
-                self.animate(self.player_images['PLAYER_IDLE_LEFT'], settings.PLAYER_ANIMATION_SLOWER)
+            action = ACTION_IDLE
+            facing = FACING_RIGHT if self.velocity.x > 0 else FACING_LEFT
+        self.animate(animation_state(action, facing))
 
         # Calculate the new kinematics according to the player's movements.
         self.acceleration.x -= self.velocity.x * self.HORIZONTAL_FRICTION
@@ -173,44 +166,40 @@ class Player(pygame.sprite.Sprite):
         self.check_platform_collisions(platform_group)
         self.check_ground_collision(ground_group)
         
-        # Checks if the shield effect is over and needs to be disabled.
-        if self.has_shield and self.current_time > self.shield_timer:
-            self.has_shield = False
-        
-        # Checks if the invulnerability effect is over and needs to be disabled. Also it makes the invulnerability effect
-        # visible by making the player image flash.
+        # Makes the invulnerability effect visible by making the player image flash. The renderer does not draw the
+        # player while 'flash_hidden' is True.
         if self.is_invulnerable:
-            if self.current_time > self.invulnerability_timer:
-                self.is_invulnerable = False
             # Makes the player's image go invisible every 200 milliseconds, that makes the player flash.
-            if self.current_time // 100 % 2 == 0:
-                self.image.set_alpha(0) # Makes the player invisible
-            else:
-                self.image.set_alpha(255) # Makes the player visible again.
+            self.flash_hidden = self.current_time // 100 % 2 == 0
         else:
-            self.image.set_alpha(255) # Makes the player visible by default.
+            self.flash_hidden = False # Makes the player visible by default.
 
         self.check_for_pickable_objects_collision(shield_pickup_group, shield_effect_group, SHIELD_EFFECT_IMAGE)
         self.check_for_enemy_collision(baddie_group)
 
     def check_for_pickable_objects_collision(self, shield_pickup_group, shield_effect_group, SHIELD_EFFECT_IMAGE):
-        collected_shield_object = pygame.sprite.spritecollide(self, shield_pickup_group, True)
+        collected_shield_object = spritecollide(self, shield_pickup_group, True, collide_masks)
         if collected_shield_object:
+            self.events.emit(PICKUP)
             if not self.has_shield:
+                self.events.emit(SHIELD)
                 self.has_shield = True
-                self.shield_timer = self.current_time + settings.SHIELD_DURATION_TIME
+                self.shield_end = self.scheduler.schedule(settings.SHIELD_DURATION_TIME, self.end_shield)
                 # Ajouter le bouclier au groupe pour qu'il soit dessiné et mis à jour
                 shield_effect_group.add(ShieldEffect(SHIELD_EFFECT_IMAGE, self))
 
     def check_for_enemy_collision(self, baddie_group):
-        touched_enemy = pygame.sprite.spritecollide(self, baddie_group, True)
+        touched_enemy = spritecollide(self, baddie_group, True, collide_masks)
         if touched_enemy:
+            self.events.emit(ENEMY_ATTACK)
             self.take_damage()
     
     def take_damage(self):        
         if self.has_shield:
             # If the player has a shield and takes damage, the shield absorbs it and breaks.
             self.has_shield = False
+            self.scheduler.cancel(self.shield_end)
+            self.events.emit(SHIELD_BREAK)
             return
         if not self.is_invulnerable:
             self.lives -= 1
@@ -218,16 +207,26 @@ class Player(pygame.sprite.Sprite):
                 # If the player is still alive, then the invulnerability effect starts and will be on for
                 # 'settings.PLAYER_INVULNERABILITY_TIME' milliseconds.
                 self.is_invulnerable = True
-                self.invulnerability_timer = self.current_time + settings.PLAYER_INVULNERABILITY_TIME
+                self.invulnerability_end = self.scheduler.schedule(settings.PLAYER_INVULNERABILITY_TIME, self.end_invulnerability)
+                self.events.emit(HIT)
             else:
                 # If the player has no more lives, he dies.
                 self.dead = True
+                self.events.emit(DEATH)
     
+    # Called by the scheduler when the shield lasted 'settings.SHIELD_DURATION_TIME' milliseconds.
+    def end_shield(self):
+        self.has_shield = False
+
+    # Called by the scheduler when the invulnerability lasted 'settings.PLAYER_INVULNERABILITY_TIME' milliseconds.
+    def end_invulnerability(self):
+        self.is_invulnerable = False
+
     def check_platform_collisions(self, platform_group):
         # touched_platforms will be equal to True if the player (self) is colliding with one of the platforms
         # in the platform_group (which is a sprite group). The third parameter tells us if we want to remove
         # the object that collided with the player.
-        touched_platforms = pygame.sprite.spritecollide(self, platform_group, False)
+        touched_platforms = spritecollide(self, platform_group, False)
         # If the players touches a platform AND if he is falling (velocity of 'y' > 0) AND if the bottom of
         # his hitbox is higher than the bottom of the platform, THEN the player will be teleported to the top
         # of the platform. He will also be moving at the same speed as the platform and his velocity.y will
@@ -242,7 +241,7 @@ class Player(pygame.sprite.Sprite):
             self.on_platform = False
     # Same principles as for the check_platform_collisions function.
     def check_ground_collision(self, ground_group):
-        touched_ground = pygame.sprite.spritecollide(self, ground_group, False)
+        touched_ground = spritecollide(self, ground_group, False)
         if touched_ground:
             self.position.y = touched_ground[0].rect.top
             self.velocity.y = 0
@@ -261,8 +260,8 @@ class Player(pygame.sprite.Sprite):
     # But we have to specify that the jumps is enabled only when the player is over the object.
     # (The collision between the bottom of the player and the top of the object)
     def jump(self, ground_group, platform_group):
-        touched_platforms = pygame.sprite.spritecollide(self, platform_group, False)
-        touched_ground = pygame.sprite.spritecollide(self, ground_group, False)
+        touched_platforms = spritecollide(self, platform_group, False)
+        touched_ground = spritecollide(self, ground_group, False)
         consition_1 = touched_platforms and self.rect.bottom <= touched_platforms[0].rect.top + settings.PLATFORM_HEIGHT // 2
         condition_2 = touched_ground and self.rect.bottom <= touched_ground[0].rect.top + settings.GROUND_HEIGHT // 2
 
@@ -273,8 +272,9 @@ class Player(pygame.sprite.Sprite):
             self.on_ground = False
             self.on_platform = False
             self.in_a_jump = True
+            self.events.emit(JUMP)
 
-    def attack(self, spear_group, SPEAR_IMAGE):
+    def attack(self, spear_group, spear_pool):
         # Here we check if the cooldown is over by seeing if there is at least 'self.attack_cooldown' milliseconds
         # that separate the current time and the last attack time.
         if self.current_time - self.last_attack_time > self.attack_cooldown:
@@ -291,79 +291,85 @@ class Player(pygame.sprite.Sprite):
             # (here we only store the center of the player's hitbox)
             start_x = self.rect.centerx
             start_y = self.rect.centery
-            # Here we create the new spear and add it to the spear_group.
-            new_spear = Spear(start_x, start_y, current_direction, SPEAR_IMAGE)
+            # Here we take a spear from the pool and add it to the spear_group.
+            new_spear = spear_pool.acquire(start_x, start_y, current_direction)
             spear_group.add(new_spear)
+            self.events.emit(ATTACK)
         
-    def animate(self, list_of_images, animation_speed):
-        # To animate the knight we will go through the list of images of the associated animation and
+    def animate(self, state):
+        # To animate the knight we will go through the images of the associated animation state and
         # then we will set the actual image of the player to the current one. And when we have gone through
-        # the whole list we start again from the begining.
-        # The animation_speed variable let us manipulate the speed at which we display the images by making
-        # each image repeat 'animation_speed' times before going to the next one. It is because the integer
-        # division (//) rounds down to the integer everytime.
-        if self.current_image_index < animation_speed * len(list_of_images) - 1:
+        # the whole animation we start again from the begining.
+        # The animation table already repeats each image 'settings.PLAYER_ANIMATION_SLOWER' times, so the
+        # current image is found directly with the current image index.
+        self.animation_state = state
+        animation_length = self.animations.length(state)
+        if self.current_image_index < animation_length - 1:
             self.current_image_index += 1
         else:
             self.current_image_index = 0
-        raw_image = list_of_images[self.current_image_index // animation_speed]
-        self.image = pygame.transform.scale(raw_image, (self.draw_width, self.draw_height))
+        self.image = self.animations.ticks[state][self.current_image_index]
         # When the player throws a spear we want to go through the animation only once.
-        if (self.attack_left or self.attack_right) and self.current_image_index == animation_speed * len(list_of_images) - 1:
+        if (self.attack_left or self.attack_right) and self.current_image_index == animation_length - 1:
             self.attack_right = False
             self.attack_left = False
 
-class Spear(pygame.sprite.Sprite):
-    def __init__(self, position_x, position_y, direction, SPEAR_IMAGE):
+# The spears, shield pickups, baddies and platforms are PooledSprites: when they are created by an EntityPool,
+# killing them puts them back in the pool and the reset method prepares them to be used again.
+class Spear(PooledSprite):
+    def __init__(self, SPEAR_IMAGE, position_x, position_y, direction):
         super().__init__()
-        # It's the same process as for the player's image.
-        original_image = SPEAR_IMAGE
-        target_width = settings.SPEAR_WIDTH
+        self.original_image = SPEAR_IMAGE
+        self.draw_width, self.draw_height = Spear.draw_size(SPEAR_IMAGE)
+        self.rect = pygame.Rect(0, 0, self.draw_width, self.draw_height)
+        # We store the spear's speed
+        self.speed = settings.SPEAR_SPEED
+        self.reset(position_x, position_y, direction)
 
-        original_width = original_image.get_width()
-        original_height = original_image.get_height()
+    # The size at which the spear is drawn. It's the same process as for the player's image.
+    @staticmethod
+    def draw_size(SPEAR_IMAGE):
+        target_width = settings.SPEAR_WIDTH
+        scale_factor = target_width / SPEAR_IMAGE.get_width()
+        return (target_width, int(SPEAR_IMAGE.get_height() * scale_factor))
 
-        scale_factor = target_width / original_width
-        self.draw_width = target_width
-        self.draw_height = int(original_height * scale_factor)            
-        
-        self.image = pygame.transform.scale(original_image, (self.draw_width, self.draw_height))
+    def reset(self, position_x, position_y, direction):
         # Here if the direction is -1 (meaning the player faces to the left) we have to
         # flip the spear's image.
-        if direction == -1:
-            self.image = pygame.transform.flip(self.image, True, False)
-        self.rect = self.image.get_rect()
+        self.image = surface_cache.get_scaled(self.original_image, (self.draw_width, self.draw_height), flip_x=(direction == -1))
         # We set the spear at the center of the player's hitbox.
         self.rect.center = (position_x, position_y)
-        # We store the spear's speed and direction
-        self.speed = settings.SPEAR_SPEED
+        # We store the spear's direction
         self.direction = direction
 
-    def update(self, baddie_group):
+    def update(self, baddie_group, events=None):
         # Here we move the spear at each update.
         self.rect.x += self.speed * self.direction
         # If the spear is out of the window screen we remove it from the spear_group.        
         if self.rect.right < 0 or self.rect.left > settings.WINDOW_WIDTH:
             self.kill()
         # If the spear touches an enemy, it kills the enemy and disappears.
-        if pygame.sprite.spritecollide(self, baddie_group, True):
+        if spritecollide(self, baddie_group, True, collide_masks):
             self.kill()
+            if events is not None:
+                events.emit(KILL)
 
-class ShieldPickup(pygame.sprite.Sprite):
-    def __init__(self, SHIELD_PICKUP_IMAGE):
+class ShieldPickup(PooledSprite):
+    def __init__(self, SHIELD_PICKUP_IMAGE, random_generator=random):
         super().__init__()
+        self.random_generator = random_generator
         # Charger et redimensionner l'image du pick-up
-        self.image = pygame.transform.scale(SHIELD_PICKUP_IMAGE, (settings.SHIELD_PICKUP_SIZE, settings.SHIELD_PICKUP_SIZE))
+        self.image = surface_cache.get_scaled(SHIELD_PICKUP_IMAGE, (settings.SHIELD_PICKUP_SIZE, settings.SHIELD_PICKUP_SIZE))
         self.rect = self.image.get_rect()
-        
+        self.speed = settings.SHIELD_PICKUP_SCROLL_SPEED
+        self.reset()
+
+    def reset(self):
         # Position d'apparition : aléatoire sur Y, à droite de l'écran sur X
         self.rect.left = settings.WINDOW_WIDTH 
-        self.rect.bottom = random.randint(settings.SHIELD_PICKUP_SIZE, settings.WINDOW_HEIGHT - settings.GROUND_HEIGHT)
-        
-        self.speed = settings.SHIELD_PICKUP_SCROLL_SPEED
+        self.rect.bottom = self.random_generator.randint(settings.SHIELD_PICKUP_SIZE, settings.WINDOW_HEIGHT - settings.GROUND_HEIGHT)
         
     def update(self):
-        current_time = pygame.time.get_ticks()
         self.rect.x -= self.speed
         if self.rect.right < 0:
             self.kill()            
@@ -372,7 +378,7 @@ class ShieldEffect(pygame.sprite.Sprite):
     def __init__(self, SHIELD_IMAGE, player):
         super().__init__()
         # Scales the shield image to the player's size.
-        self.image = pygame.transform.scale(SHIELD_IMAGE, (player.rect.height + 10, player.rect.height + 10))
+        self.image = surface_cache.get_scaled(SHIELD_IMAGE, (player.rect.height + 10, player.rect.height + 10))
         self.rect = self.image.get_rect()
         self.player = player # Référence au joueur qu'il doit suivre
     def update(self):
@@ -382,18 +388,30 @@ class ShieldEffect(pygame.sprite.Sprite):
         if not self.player.has_shield:
             self.kill()
 
+# The baddies, platforms and shield pickups draw their random numbers from the generator they are given. The
+# simulation gives each type its own generator, so that a game started with the same seed is always the same.
 class Baddies(Entity):
-    def __init__ (self, BADDIE_IMAGE):
+    def __init__ (self, BADDIE_IMAGE, random_generator=random):
         image = BADDIE_IMAGE
-        self.size = random.randint(settings.BADDIE_MIN_SIZE, settings.BADDIE_MAX_SIZE)
+        self.random_generator = random_generator
+        self.size = self.random_generator.randint(settings.BADDIE_MIN_SIZE, settings.BADDIE_MAX_SIZE)
         super().__init__(image, self.size, self.size)
+        self.place()
+
+    def reset(self):
+        # A reused baddie gets a new random size. Its image comes from the surface cache, so nothing is scaled.
+        self.size = self.random_generator.randint(settings.BADDIE_MIN_SIZE, settings.BADDIE_MAX_SIZE)
+        self.image = surface_cache.get_scaled(self.original_image, (self.size, self.size))
+        self.rect.size = (self.size, self.size)
+        self.place()
 
+    def place(self):
         # Set the Baddie's position randomly
         self.rect.left = settings.WINDOW_WIDTH
-        self.rect.bottom = random.randint(0, settings.WINDOW_HEIGHT - self.size)
+        self.rect.bottom = self.random_generator.randint(0, settings.WINDOW_HEIGHT - self.size)
 
         # Set the Baddie's speed randomly
-        self.speed = random.randint(settings.BADDIE_MIN_SPEED, settings.BADDIE_MAX_SPEED)
+        self.speed = self.random_generator.randint(settings.BADDIE_MIN_SPEED, settings.BADDIE_MAX_SPEED)
 
     def update(self):
         self.rect.x -= self.speed
@@ -401,14 +419,17 @@ class Baddies(Entity):
             self.kill()
 
 class Platform(Entity):
-    def __init__ (self, PLATFORM_IMAGE):
+    def __init__ (self, PLATFORM_IMAGE, random_generator=random):
         image = PLATFORM_IMAGE
+        self.random_generator = random_generator
         self.height = settings.PLATFORM_HEIGHT
         self.width = settings.PLATFORM_WIDTH
         super().__init__(image, self.width, self.height)
+        self.reset()
 
+    def reset(self):
         self.rect.left = settings.WINDOW_WIDTH
-        self.rect.top = random.randint(0, settings.WINDOW_HEIGHT - self.height - settings.GROUND_HEIGHT)
+        self.rect.top = self.random_generator.randint(0, settings.WINDOW_HEIGHT - self.height - settings.GROUND_HEIGHT)
 
     def update(self):
         self.rect.x -= settings.PLATFORM_SPEED
@@ -427,7 +448,7 @@ class Ground(pygame.sprite.Sprite):
         scale_factor = target_height / original_height
         self.draw_height = target_height
         self.draw_width = int(original_width * scale_factor)
-        self.image = pygame.transform.scale(image, (self.draw_width, self.draw_height))
+        self.image = surface_cache.get_scaled(image, (self.draw_width, self.draw_height))
 
         hitbox_width = self.draw_width
         hitbox_height = int(self.draw_height * settings.GROUND_HITBOX_IMAGE_HEIGHT_FACTOR)
@@ -446,21 +467,3 @@ class Ground(pygame.sprite.Sprite):
         if self.rect.right <= 0 and self.full_image_rect.right <= 0:
             self.rect.left += 5 * self.draw_width
             self.full_image_rect.left += 5 * self.draw_width
-
-class Background(Entity):
-    def __init__(self, image, scrolling_speed, x, y):
-        self.width = settings.WINDOW_WIDTH
-        self.height = settings.WINDOW_HEIGHT
-        super().__init__(image, self.width, self.height)
-
-        self.speed = scrolling_speed
-        self.rect.topleft = (x, y)
-
-    def update(self):
-        self.rect.x -= self.speed        
-        # If the image has scrolled entirely off 2 times the window width to left of the screen (because the
-        # background is drawn three times in the game),
-        # reset its position to be directly to the right the screen (for seamless looping).
-        if self.rect.right <= 0:
-            self.rect.left += 2 * self.width
-    
\ No newline at end of file
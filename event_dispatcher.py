@@ -0,0 +1,45 @@
+# event_dispatcher.py
+import pygame
+
+# Reads the events of pygame in one place and gives each event to the functions subscribed to its type. Every event
+# is read once, and all of the parts of the game interested in it (the player, the menus, the profiler) receive it.
+# - During the game, 'poll' reads the events once per frame without waiting.
+# - On the menus, 'wait' sleeps until an event arrives (or until a timeout), so the game does not use the processor
+#   while nothing happens.
+class EventDispatcher:
+    def __init__(self):
+        # For each event type, the list of the functions called with the events of this type.
+        self.subscribers = {}
+
+    def subscribe(self, event_type, callback):
+        self.subscribers.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, event_type, callback):
+        callbacks = self.subscribers.get(event_type)
+        if callbacks is not None and callback in callbacks:
+            callbacks.remove(callback)
+
+    def dispatch(self, event):
+        callbacks = self.subscribers.get(event.type)
+        if callbacks:
+            # A callback can unsubscribe while the event is dispatched, so we go through a copy of the list.
+            for callback in tuple(callbacks):
+                callback(event)
+
+    # Dispatches the events received since the last call.
+    def poll(self):
+        for event in pygame.event.get():
+            self.dispatch(event)
+
+    # Sleeps until an event arrives, or at most 'timeout' milliseconds, then dispatches all of the waiting events.
+    def wait(self, timeout=None):
+        if timeout is None:
+            event = pygame.event.wait()
+        else:
+            event = pygame.event.wait(int(timeout))
+        if event.type != pygame.NOEVENT:
+            self.dispatch(event)
+        self.poll()
+
+# The dispatcher used by the whole game.
+event_dispatcher = EventDispatcher()
@@ -3,39 +3,74 @@ import pygame
 import sys
 from pygame.locals import *
 from settings import Settings
+from text_cache import TextCache
+from event_dispatcher import event_dispatcher
 
 settings = Settings()
+# The texts drawn by the game are only rendered once and then kept in this cache.
+text_cache = TextCache(settings.TEXT_CACHE_MAX_ENTRIES)
 
 def draw_text(text, font, surface, x, y, color=(255,0,0)):
-    text_surface = font.render(text, True, color)
+    text_surface = text_cache.render(font, text, color)
     text_rect = text_surface.get_rect()
     text_rect.topleft = (x, y)
     surface.blit(text_surface, text_rect)
 
+# Loads an image. When a window exists, the image is converted so that the computer can draw it more efficiently.
+# Without a window (for example when the game runs headless) the image is kept as it was loaded.
+def load_image(path):
+    image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        return image.convert_alpha()
+    return image
+
 # Quit Pygame and exit the program.
 def terminate():
     pygame.quit()
     sys.exit()
 
-# Pause the game until the player presses a key.
-def wait_for_player_to_press_key():
-    while True:
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                terminate()
-            if event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
-                    terminate()
-                return
+# Closes the game when the window is closed or when the 'escape' key is pressed. It is subscribed to the event
+# dispatcher for the whole game.
+def close_game_on_quit_events(event):
+    if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+        terminate()
+
+# Pause the game until the player presses a key. The game sleeps until an event arrives, so it does not use the
+# processor while waiting. When 'update' is given, it is called at least every 'update_interval' milliseconds
+# until it returns False (for example to draw the progress of the loading).
+def wait_for_player_to_press_key(update=None, update_interval=None):
+    pressed_keys = []
+    event_dispatcher.subscribe(KEYDOWN, pressed_keys.append)
+    try:
+        while not pressed_keys:
+            if update is not None and not update():
+                update = None
+            event_dispatcher.wait(update_interval if update is not None else None)
+    finally:
+        event_dispatcher.unsubscribe(KEYDOWN, pressed_keys.append)
+
+# Draws the loading progress (between 0 and 1) as a bar at the bottom of the window.
+def draw_progress_bar(surface, progress):
+    outline = pygame.Rect(0, 0, settings.LOADING_BAR_WIDTH, settings.LOADING_BAR_HEIGHT)
+    outline.center = (settings.WINDOW_WIDTH // 2, settings.WINDOW_HEIGHT * 3 // 4)
+    filled = outline.copy()
+    filled.width = int(outline.width * progress)
+    pygame.draw.rect(surface, settings.LOADING_BAR_COLOR, filled)
+    pygame.draw.rect(surface, settings.TEXT_COLOR, outline, 1)
+
+# The screen shown while the background of the start screen is loading.
+def draw_loading_screen(surface, progress):
+    surface.fill(settings.BACKGROUND_COLOR)
+    draw_progress_bar(surface, progress)
+
 def game_over_text(surface):
-    font_game_over = pygame.font.Font(None, 48)
-    text_game_over = font_game_over.render('GAME OVER', True, settings.TEXT_COLOR)
+    font_game_over = text_cache.get_font(None, 48)
+    text_game_over = text_cache.render(font_game_over, 'GAME OVER', settings.TEXT_COLOR)
     text_rect_game_over = text_game_over.get_rect()
     text_rect_game_over.center = (settings.WINDOW_WIDTH // 2, settings.WINDOW_HEIGHT // 3)
     surface.blit(text_game_over, text_rect_game_over)
 
-    font_game_over_subtitle = pygame.font.Font(None, 48)
-    text_game_over_subtitle = font_game_over.render('Press a key to play again.', True, settings.TEXT_COLOR)
+    text_game_over_subtitle = text_cache.render(font_game_over, 'Press a key to play again.', settings.TEXT_COLOR)
     text_rect_game_over_subtitle = text_game_over_subtitle.get_rect()
     text_rect_game_over_subtitle.center = (settings.WINDOW_WIDTH // 2, (settings.WINDOW_HEIGHT // 3) + 30)
-    surface.blit(text_game_over_subtitle, text_rect_game_over_subtitle)    
+    surface.blit(text_game_over_subtitle, text_rect_game_over_subtitle)
@@ -0,0 +1,58 @@
+# game_events.py
+
+# The names of the things that happen during the game. The sound bank plays the sound with the same name (the
+# spawns have no sound, they are only recorded by the telemetry).
+JUMP = 'JUMP'
+ATTACK = 'ATTACK'
+KILL = 'KILL'
+ENEMY_ATTACK = 'ENEMY_ATTACK'
+HIT = 'HIT'
+DEATH = 'DEATH'
+SHIELD_BREAK = 'SHIELD_BREAK'
+PICKUP = 'PICKUP'
+SHIELD = 'SHIELD'
+SPAWN_BADDIE = 'SPAWN_BADDIE'
+SPAWN_PLATFORM = 'SPAWN_PLATFORM'
+SPAWN_SHIELD_PICKUP = 'SPAWN_SHIELD_PICKUP'
+
+# Tells the rest of the game what happens in the simulation, like the player jumping or a spear killing a baddie.
+# The entities call 'emit' and the functions subscribed to the events are called right away. The simulation does
+# not know what is done with the events: without any subscriber (for example when it runs without a window), they
+# are simply ignored.
+# While 'deferred' is a list, the events are added to it instead, and 'dispatch' gives them to the subscribers later.
+# The pipelined mode does this so that the subscribers are always called on the main thread (see pipeline.py).
+# 'time' and 'score' are the time of the simulation (in milliseconds) and the score when the event being given to
+# the subscribers was emitted. They are stored with the deferred events, so the subscribers that record them (like
+# the telemetry) read them here and not from the simulation, which may have stepped further since.
+class GameEvents:
+    def __init__(self, simulation=None):
+        self.simulation = simulation
+        self.subscribers = []
+        self.deferred = None
+        self.time = 0
+        self.score = 0
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def emit(self, name):
+        simulation = self.simulation
+        if simulation is not None:
+            time = simulation.clock.get_ticks()
+            score = simulation.score
+        else:
+            time = score = 0
+        if self.deferred is not None:
+            self.deferred.append((name, time, score))
+            return
+        self.dispatch(name, time, score)
+
+    def dispatch(self, name, time, score):
+        self.time = time
+        self.score = score
+        for callback in self.subscribers:
+            callback(name)
@@ -4,210 +4,214 @@ import sys
 from pygame.locals import *
 from settings import *
 from functions import *
-from entity import *
-from entity import Ground
-
-
-# Initialize Pygame.
-pygame.init()
-
-# Set up display, window name, clock, font.
-window_surface = pygame.display.set_mode((settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT))
-pygame.display.set_caption('Dodger')
-clock = pygame.time.Clock()
-font = pygame.font.SysFont(None, 48)
-
-# Game related images. The images are converted so that the computer can draw more efficiently.
-BADDIE_IMAGE = pygame.image.load('baddie.png').convert_alpha()
-PLATFORM_IMAGE = pygame.image.load('platform.png').convert_alpha()
-SPEAR_IMAGE = pygame.image.load('spear.png').convert_alpha()
-SHIELD_EFFECT_IMAGE = pygame.image.load('shield_effect.png').convert_alpha()
-SHIELD_PICKUP_IMAGE = pygame.image.load('shield_pickup.png').convert_alpha()
-RED_HEART_IMAGE = pygame.image.load('red_heart.png').convert_alpha()
-RED_HEART_IMAGE = pygame.transform.scale(RED_HEART_IMAGE, (settings.PLAYER_LIVES_DISPLAY_SIZE, settings.PLAYER_LIVES_DISPLAY_SIZE))
-BLUE_HEART_IMAGE = pygame.image.load('blue_heart.png').convert_alpha()
-BLUE_HEART_IMAGE = pygame.transform.scale(BLUE_HEART_IMAGE, (settings.PLAYER_LIVES_DISPLAY_SIZE, settings.PLAYER_LIVES_DISPLAY_SIZE))
-
-# The player is animated. So in order to store all of the different animations we created a dictionary.
-# Each key gives acces to the list with all of the images related to this action. We also had to flip the images
-# to have an animation whether the player is facing right or left.
-PLAYER_IMAGES = {
-    'PLAYER_RUN_RIGHT' : [],
-    'PLAYER_RUN_LEFT' : [],
-    'PLAYER_ATTACK_RIGHT' : [],
-    'PLAYER_ATTACK_LEFT' : [],
-    'PLAYER_DIE_RIGHT' : [],
-    'PLAYER_DIE_LEFT' : [],
-    'PLAYER_HURT_RIGHT' : [],
-    'PLAYER_HURT_LEFT' : [],
-    'PLAYER_IDLE_RIGHT' : [],
-    'PLAYER_IDLE_LEFT' : [],
-    'PLAYER_JUMP_RIGHT' : [],
-    'PLAYER_JUMP_LEFT' : []
-}
-for player_action in PLAYER_IMAGES.keys():
-    if 'RUN_RIGHT' in player_action:
-        for i in range(10):
-            temporary_image = pygame.image.load('player_animations/player_run_images/Knight_01__RUN_00%s.png' % (i)).convert_alpha()
-            PLAYER_IMAGES['PLAYER_RUN_RIGHT'].append(temporary_image)
-            PLAYER_IMAGES['PLAYER_RUN_LEFT'].append(pygame.transform.flip(temporary_image, True, False))
-    elif 'ATTACK_RIGHT' in player_action:
-        for i in range(10):
-            temporary_image = pygame.image.load('player_animations/player_attack_images/Knight_01__ATTACK_00%s.png' % (i)).convert_alpha()
-            PLAYER_IMAGES['PLAYER_ATTACK_RIGHT'].append(temporary_image)
-            PLAYER_IMAGES['PLAYER_ATTACK_LEFT'].append(pygame.transform.flip(temporary_image, True, False))
-    elif 'DIE_RIGHT' in player_action:
-        for i in range(10):
-            temporary_image = pygame.image.load('player_animations/player_die_images/Knight_01__DIE_00%s.png' % (i)).convert_alpha()
-            PLAYER_IMAGES['PLAYER_DIE_RIGHT'].append(temporary_image)
-            PLAYER_IMAGES['PLAYER_DIE_LEFT'].append(pygame.transform.flip(temporary_image, True, False))
-    elif 'HURT_RIGHT' in player_action:
-        for i in range(10):
-            temporary_image = pygame.image.load('player_animations/player_hurt_images/Knight_01__HURT_00%s.png' % (i)).convert_alpha()
-            PLAYER_IMAGES['PLAYER_HURT_RIGHT'].append(temporary_image)
-            PLAYER_IMAGES['PLAYER_HURT_LEFT'].append(pygame.transform.flip(temporary_image, True, False))
-    elif 'IDLE_RIGHT' in player_action:
-        for i in range(10):
-            temporary_image = pygame.image.load('player_animations/player_idle_images/Knight_01__IDLE_00%s.png' % (i)).convert_alpha()
-            PLAYER_IMAGES['PLAYER_IDLE_RIGHT'].append(temporary_image)
-            PLAYER_IMAGES['PLAYER_IDLE_LEFT'].append(pygame.transform.flip(temporary_image, True, False))
-    elif 'JUMP_RIGHT' in player_action:
-        for i in range(10):
-            temporary_image = pygame.image.load('player_animations/player_jump_images/Knight_01__JUMP_00%s.png' % (i)).convert_alpha()
-            PLAYER_IMAGES['PLAYER_JUMP_RIGHT'].append(temporary_image)
-            PLAYER_IMAGES['PLAYER_JUMP_LEFT'].append(pygame.transform.flip(temporary_image, True, False))
-                                
-# Tuples of the background image layer associated wiht its scrolling speed. The images are converted so that the computer can draw more efficiently.
-# If we don't do that the game will start lagging. The images are made to loop horizontally to make the effect of an infinite image.
-BACKGROUND_IMAGES_AND_SPEEDS = [
-    (pygame.image.load('background_layers/1_sky.png').convert_alpha(), settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/2_clouds.png').convert_alpha(), 2 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/3_mountain.png').convert_alpha(), settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/4_clouds.png').convert_alpha(), 3 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/5_ground.png').convert_alpha(), 4 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/6_ground.png').convert_alpha(), 7 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/7_ground.png').convert_alpha(), 8 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR),
-    (pygame.image.load('background_layers/8_plant.png').convert_alpha(), 8 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR)
-    ]
-# Ground image. It is drawn separately because it will be drawn in the foreground.
-GROUND_IMAGE_AND_SPEED = (pygame.image.load('background_layers/ground.png').convert_alpha(), 10 * settings.BACKGROUND_SCROLL_SPEED_MULTIPLICATOR)
-# Set up sounds.
-game_over_sound = pygame.mixer.Sound('gameover.wav')
-pygame.mixer.music.load('background.mid')
-
-# Show the "Start" screen.
-
-# Creates the group that will hold all of the background layers.
-background_group = pygame.sprite.Group()
-# Creates all of the background layers with the Background class constructor. Each time the constructor is called
-# it creates all of the layers at the same position and stores the speed of the layer with the correct image for that layer.
-# It happens because BACKGROUND_IMAGES_AND_SPEEDS is a list of tuples (layer_image, layer_speed) for each layer. The constructor
-# is called 3 times because we create the current background on the screen and 2 background in advamce. That way, when the images
-# scroll it seems like it's a continuous image.
-for image, scrolling_speed in BACKGROUND_IMAGES_AND_SPEEDS:
-    background_group.add(Background(image, scrolling_speed, 0, 0))
-    background_group.add(Background(image, scrolling_speed, settings.WINDOW_WIDTH, 0))
-    background_group.add(Background(image, scrolling_speed, 2 * settings.WINDOW_WIDTH, 0))
-# Draws the background on the window surface.
-background_group.draw(window_surface)
-# Draws the ground in the foreground. It will be useful to store it in a separate group because we will draw th player between
-# the background and the ground.
-ground_group = pygame.sprite.Group()
-test_ground = Ground(GROUND_IMAGE_AND_SPEED[0], 0, 0, 0)
-for index in range(0,6):
-    ground_group.add(Ground(GROUND_IMAGE_AND_SPEED[0], GROUND_IMAGE_AND_SPEED[1], index * test_ground.draw_width, settings.WINDOW_HEIGHT))
-for ground in ground_group:
-    window_surface.blit(ground.image, ground.full_image_rect)
-# Draws the text on the starting screen.
-draw_text('Dodger', font, window_surface, settings.WINDOW_WIDTH // 3, settings.WINDOW_HEIGHT // 3)
-draw_text('Press a key to start.', font, window_surface, settings.WINDOW_WIDTH // 3, (settings.WINDOW_HEIGHT // 3) + 50)
-# Updates the window surface so that the player sees what has been drawn until now.
-pygame.display.update()
-
-# Wait for the player to press a key to start.
-wait_for_player_to_press_key()
-
-
-# First game loop
-while True:
-    # Start a new game
-    player = Player(PLAYER_IMAGES)
-    player_group = pygame.sprite.GroupSingle(player)
-    spear_group = pygame.sprite.Group()
-    baddie_group = pygame.sprite.Group()
-    platform_group = pygame.sprite.Group()
-    shield_effect_group = pygame.sprite.Group()
-    shield_pickup_group = pygame.sprite.Group()
-    player_group.draw(window_surface)
-    score = 0
-    baddie_add_counter = 0
-    platform_add_counter = 0
-    shield_spawn_timer = 0
-    pygame.mixer.music.play(-1, 0.0)
-
-    # Second game loop
-    while not player.dead:
-        score += 1
-
-        # Add new baddies
-        baddie_add_counter += 1
-        if baddie_add_counter >= settings.ADD_NEW_BADDIE_RATE:
-            baddie_add_counter = 0
-            baddie_group.add(Baddies(BADDIE_IMAGE))
-
-        # Add new platform 
-        platform_add_counter += 1
-        if platform_add_counter >= settings.ADD_NEW_PLATFORM_RATE:
-            platform_add_counter = 0
-            platform_group.add(Platform(PLATFORM_IMAGE))
-
-        # Apparition aléatoire du bouclier (basé sur le temps ou le score)
-        shield_spawn_timer += 1
-        if shield_spawn_timer >= 100:
-            shield_spawn_timer = 0
-            # Ajoutez le bouclier ramassable au groupe
-            shield_pickup_group.add(ShieldPickup(SHIELD_PICKUP_IMAGE))
-
-        # Update game objects
-        platform_group.update()
-        player_group.update(ground_group, platform_group, spear_group, SPEAR_IMAGE, baddie_group, shield_pickup_group, shield_effect_group, SHIELD_EFFECT_IMAGE)
-        baddie_group.update()
-        spear_group.update(baddie_group)
-        background_group.update()
-        ground_group.update()
-        shield_effect_group.update()
-        shield_pickup_group.update()
-
-        # Draw everything
-        background_group.draw(window_surface)
-        draw_text('Score: %s' % (score), font, window_surface, 10, 0)
-        window_surface.blit(player.image, player.full_image_rect)
-        baddie_group.draw(window_surface)
-        platform_group.draw(window_surface)
-        spear_group.draw(window_surface)
-        for ground in ground_group:
-            window_surface.blit(ground.image, ground.full_image_rect)
-        shield_effect_group.draw(window_surface)
-        shield_pickup_group.draw(window_surface)
-        
-        # Draws the number of lives the player has left
-        for i in range(player.lives):
-            heart_left = settings.WINDOW_WIDTH - settings.PLAYER_LIVES_MARGIN_X - (settings.PLAYER_LIVES_DISPLAY_SIZE * (i + 1)) - (settings.PLAYER_LIVES_HEART_SPACING * i)
-            if player.has_shield:
-                window_surface.blit(BLUE_HEART_IMAGE, (heart_left, settings.PLAYER_LIVES_MARGIN_Y))
-            else:
-                window_surface.blit(RED_HEART_IMAGE, (heart_left, settings.PLAYER_LIVES_MARGIN_Y))
-
-        # Update display inside the game
-        pygame.display.update()
-
-        # Control FPS
-        clock.tick(settings.FPS)
-    
-    # Shows the game over screen
-    pygame.mixer.music.stop()
-    game_over_sound.play()
-    game_over_text(window_surface)
-    pygame.display.update()
-    wait_for_player_to_press_key()
-    game_over_sound.stop()
+from event_dispatcher import event_dispatcher
+from assets import GameAssets, PRIORITY_START_SCREEN, PRIORITY_GAMEPLAY, PRIORITY_SOUNDS
+from asset_manager import AssetManager
+from simulation import GameSimulation, InputState
+from renderer import GameRenderer
+from render_backend import create_backend
+from profiler import Profiler
+from quality import QualityGovernor
+from sound_bank import SoundBank
+from pipeline import PipelinedSimulation
+from replay import ReplayWriter
+from telemetry import TelemetryLog
+
+# Turns the keyboard into the inputs of the simulation. It is subscribed to the event dispatcher during the games:
+# the key presses are received from the dispatcher, and the keys held down are read at each frame.
+class KeyboardInput:
+    def __init__(self):
+        self.inputs = InputState()
+
+    def on_key_down(self, event):
+        # The 'space', 'up arrow' and 'w' keys make the player jump.
+        if event.key in (K_SPACE, K_UP, K_w):
+            self.inputs.jump = True
+        # The 'down arrow' and 's' keys make the player throw a spear.
+        if event.key in (K_DOWN, K_s):
+            self.inputs.attack = True
+
+    # Returns the inputs of the frame. The events must have been dispatched before.
+    def read(self):
+        inputs = self.inputs
+        self.inputs = InputState()
+        # Here we look at the state of the all the keys at each frame. It is useful because
+        # running left or right are continuous movements.
+        keys = pygame.key.get_pressed()
+        # The 'left arrow' and 'a' keys make the player go left.
+        inputs.left = bool(keys[K_LEFT] or keys[K_a])
+        # The 'right arrow' and 'd' keys make the player go right.
+        inputs.right = bool(keys[K_RIGHT] or keys[K_d])
+        return inputs
+
+# Wraps a function drawing the loading progress so that the window can still be closed while the game is loading.
+def keep_window_responsive(draw_progress):
+    def draw_progress_and_read_events(progress):
+        event_dispatcher.poll()
+        draw_progress(progress)
+    return draw_progress_and_read_events
+
+# Creates the simulation. When 'settings.REPLAY_FILE' is set, the inputs of every step are recorded in it, so that
+# the session can be played again with replay.py.
+def create_simulation(assets):
+    simulation = GameSimulation(assets, seed=settings.GAME_SEED)
+    if settings.REPLAY_FILE is not None:
+        simulation.input_recorder = ReplayWriter(settings.REPLAY_FILE, simulation.seed)
+    return simulation
+
+def main():
+    # Initialize Pygame.
+    pygame.init()
+
+    # Set up display, window name, clock, font. The backend chosen in the settings creates the window.
+    backend = create_backend('Dodger')
+    clock = pygame.time.Clock()
+    font = text_cache.get_font(None, 48, system=True)
+    # The 'red cross' at the top left of the window and the 'escape' key close the game.
+    event_dispatcher.subscribe(QUIT, close_game_on_quit_events)
+    event_dispatcher.subscribe(KEYDOWN, close_game_on_quit_events)
+
+    # The images and sounds are loaded in the background. They are loaded after the window is created so that the
+    # images can be converted. Until the background of the start screen is loaded, only the progress is shown.
+    asset_manager = AssetManager(settings.ASSET_LOADER_THREADS)
+    assets = GameAssets(asset_manager)
+    def draw_loading_progress(progress):
+        draw_loading_screen(backend.ui_surface(), progress)
+        backend.present()
+    assets.load(PRIORITY_START_SCREEN, keep_window_responsive(draw_loading_progress))
+    pygame.mixer.music.load('background.mid')
+
+    # The renderer draws the game on the window, the simulation holds the game itself. The simulation is created
+    # once the images of the game are loaded.
+    renderer = GameRenderer(backend.surface, assets, font, backend)
+    profiler = Profiler(clock)
+    # Lowers the quality of the drawing when the computer cannot draw the frames in time.
+    quality_governor = None
+    if settings.QUALITY_GOVERNOR:
+        quality_governor = QualityGovernor(renderer)
+    # 'F3' shows or hides the profiler and 'F4' writes a profile of the last seconds.
+    event_dispatcher.subscribe(KEYDOWN, lambda event: profiler.handle_key(event, renderer))
+    keyboard_input = KeyboardInput()
+
+    # Show the "Start" screen and wait for the player to press a key to start. While the rest of the assets are
+    # loading, the start screen shows the progress. Once everything is loaded, the game sleeps until a key is pressed.
+    simulation = None
+    def update_start_screen():
+        nonlocal simulation
+        asset_manager.update()
+        if simulation is None and asset_manager.is_ready(PRIORITY_GAMEPLAY):
+            assets.load(PRIORITY_GAMEPLAY)
+            simulation = create_simulation(assets)
+        renderer.draw_start_screen(simulation, asset_manager.progress())
+        return asset_manager.progress() < 1
+    wait_for_player_to_press_key(update_start_screen, settings.ASSET_LOADER_PROGRESS_INTERVAL)
+    # The first frame of the game waits for the images, and for the sounds which are quick to decode.
+    if simulation is None:
+        assets.load(PRIORITY_GAMEPLAY, keep_window_responsive(lambda progress: renderer.draw_start_screen(None, progress)))
+        simulation = create_simulation(assets)
+    assets.load(PRIORITY_SOUNDS, keep_window_responsive(lambda progress: renderer.draw_start_screen(simulation, progress)))
+    renderer.prewarm_backend()
+    # The sound effects are played when the simulation tells what happens.
+    sound_bank = SoundBank(assets.SOUNDS)
+    simulation.events.subscribe(sound_bank.play)
+    # The telemetry of the session is recorded when 'settings.TELEMETRY_DIRECTORY' is set.
+    telemetry = None
+    if settings.TELEMETRY_DIRECTORY is not None:
+        telemetry = TelemetryLog.for_session(settings.TELEMETRY_DIRECTORY, simulation)
+    # In the pipelined mode the simulation runs on its own thread (see pipeline.py).
+    pipeline = None
+    if settings.PIPELINED_SIMULATION:
+        pipeline = PipelinedSimulation(simulation)
+
+    # The replay is closed when the game ends, even when the game is closed with 'terminate'.
+    try:
+        # First game loop
+        while True:
+            # Start a new game
+            sound_bank.play('BUTTON')
+            simulation.reset()
+            if simulation.input_recorder is not None:
+                simulation.input_recorder.flush()
+            pygame.mixer.music.play(-1, 0.0)
+
+            # Second game loop. The simulation always steps by 'settings.SIMULATION_TIMESTEP' milliseconds. The time
+            # spent drawing the frames is added to an accumulator, and the simulation steps as many times as needed to
+            # catch up with it. That way the game runs at the same speed whatever the number of frames drawn per second.
+            inputs = InputState()
+            accumulator = 0.0
+            clock.tick()
+            if quality_governor is not None:
+                quality_governor.reset_samples()
+            # The keys pressed are only given to the player during the game.
+            event_dispatcher.subscribe(KEYDOWN, keyboard_input.on_key_down)
+            if pipeline is not None:
+                pipeline.start(renderer.background.steps)
+            game_over = False
+            while not game_over:
+                if profiler.enabled:
+                    profiler.begin_frame()
+                # The events are read once per frame.
+                event_dispatcher.poll()
+                inputs.add(keyboard_input.read())
+
+                # The number of steps of the frame. After a long frame, at most 'settings.MAX_CATCH_UP_STEPS' steps are
+                # run and the rest of the late time is dropped, otherwise a slow computer would never catch up.
+                steps = min(int(accumulator // settings.SIMULATION_TIMESTEP), settings.MAX_CATCH_UP_STEPS)
+                accumulator -= steps * settings.SIMULATION_TIMESTEP
+                if accumulator >= settings.SIMULATION_TIMESTEP:
+                    accumulator %= settings.SIMULATION_TIMESTEP
+
+                if pipeline is None:
+                    # Update game objects.
+                    for _ in range(steps):
+                        if simulation.game_over:
+                            break
+                        simulation.step(inputs)
+                        renderer.update()
+                        inputs.clear_pressed_keys()
+                    # Draw everything and update display inside the game, between the last two steps.
+                    renderer.interpolation = accumulator / settings.SIMULATION_TIMESTEP
+                    renderer.draw(simulation)
+                    game_over = simulation.game_over
+                else:
+                    # The simulation thread computes this frame while the snapshot of an earlier frame is drawn.
+                    pipeline.submit(inputs, steps, accumulator / settings.SIMULATION_TIMESTEP)
+                    if steps > 0:
+                        inputs.clear_pressed_keys()
+                    snapshot = pipeline.next_snapshot()
+                    renderer.background.scroll(snapshot.background_steps)
+                    renderer.interpolation = snapshot.interpolation
+                    renderer.draw(snapshot)
+                    game_over = snapshot.game_over
+                if telemetry is not None:
+                    telemetry.record_frame(simulation if pipeline is None else snapshot)
+                if profiler.enabled:
+                    profiler.end_frame()
+
+                # Control FPS
+                accumulator += clock.tick(settings.RENDER_FPS)
+                if quality_governor is not None:
+                    quality_governor.update(clock.get_rawtime())
+
+            # Shows the game over screen. The simulation thread finishes the frames it was asked for, so that the
+            # simulation can be reset on this thread.
+            if pipeline is not None:
+                pipeline.drain()
+            event_dispatcher.unsubscribe(KEYDOWN, keyboard_input.on_key_down)
+            keyboard_input.read()
+            pygame.mixer.music.stop()
+            assets.GAME_OVER_SOUND.play()
+            renderer.draw_game_over_screen(simulation)
+            wait_for_player_to_press_key()
+            assets.GAME_OVER_SOUND.stop()
+    finally:
+        # The simulation thread stops and the events of the simulation are given to the subscribers right away again.
+        if pipeline is not None:
+            pipeline.close()
+        if simulation.input_recorder is not None:
+            simulation.input_recorder.close()
+        if telemetry is not None:
+            telemetry.close()
+
+if __name__ == '__main__':
+    main()
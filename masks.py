@@ -0,0 +1,46 @@
+# masks.py
+import weakref
+import pygame
+from functions import *
+
+# Keeps the collision mask of every image used by the entities. Computing a mask reads every pixel of the image, so
+# the masks are computed in advance, when the images are loaded ('prewarm'), and the game only looks them up.
+# The entities share their images (they come from the surface cache or from the animation table), so they also
+# share their masks. The prewarmed images are the ones pinned in the surface cache (and the frames of the player),
+# which live for the whole game.
+class MaskCache:
+    def __init__(self):
+        # The key is the image itself. The masks are forgotten with their images, so an image evicted from the
+        # surface cache does not stay alive because of its mask.
+        self.masks = weakref.WeakKeyDictionary()
+        # 'misses' counts the masks computed during the game because they were not prewarmed. It should stay at 0.
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image):
+        mask = self.masks.get(image)
+        if mask is not None:
+            self.hits += 1
+            return mask
+        self.misses += 1
+        mask = pygame.mask.from_surface(image)
+        self.masks[image] = mask
+        return mask
+
+    def prewarm(self, images):
+        for image in images:
+            if image not in self.masks:
+                self.masks[image] = pygame.mask.from_surface(image)
+
+mask_cache = MaskCache()
+
+# The collision test given to spritecollide for the pixel accurate collisions. The cheap test of the rectangles
+# runs first, and only the sprites whose rectangles touch have their masks compared. The masks are placed where
+# the images are drawn: for the player it is 'full_image_rect', while his rectangle is the hitbox around his armor.
+def collide_masks(left, right):
+    if not left.rect.colliderect(right.rect):
+        return False
+    left_position = getattr(left, 'full_image_rect', left.rect)
+    right_position = getattr(right, 'full_image_rect', right.rect)
+    offset = (right_position.x - left_position.x, right_position.y - left_position.y)
+    return mask_cache.get(left.image).overlap(mask_cache.get(right.image), offset) is not None
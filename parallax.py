@@ -0,0 +1,93 @@
+# parallax.py
+import pygame
+from functions import *
+from surface_cache import surface_cache
+
+class ParallaxLayer:
+    def __init__(self, image, speed, opaque):
+        self.image = image
+        self.speed = speed
+        self.opaque = opaque
+        # The offset is how far the layer has scrolled to the left. It loops back to 0 after a whole image width.
+        self.offset = 0.0
+        # Only the rows that contain visible pixels are drawn. A fully opaque layer is drawn entirely.
+        if opaque:
+            self.visible_rows = image.get_rect()
+        else:
+            self.visible_rows = image.get_bounding_rect()
+            self.visible_rows.x = 0
+            self.visible_rows.width = image.get_width()
+
+class ParallaxCompositor:
+    # 'merged_layers' is the number of the farthest layers that are flattened into a single layer, which scrolls at
+    # the speed of the farthest one. Merging them is less accurate but draws fewer layers, so the quality governor
+    # uses it on slow computers.
+    def __init__(self, images_and_speeds, width, height, merged_layers=1):
+        self.width = width
+        self.height = height
+        self.layers = []
+        # The number of updates since the start, used to place the layers of a new compositor (see 'scroll').
+        self.steps = 0
+        if merged_layers > 1:
+            farthest_speed = images_and_speeds[0][1]
+            images_and_speeds = [(image, farthest_speed if i < merged_layers else speed) for i, (image, speed) in enumerate(images_and_speeds)]
+        # The layers that follow each other and scroll at the same speed always stay aligned, so they are
+        # flattened into one image once here. Layers with another speed in between are not merged, otherwise
+        # the drawing order would change.
+        for image, speed in images_and_speeds:
+            scaled_image = surface_cache.get_scaled(image, (width, height))
+            if self.layers and self.layers[-1][1] == speed:
+                flattened_image = self.layers[-1][0].copy()
+                flattened_image.blit(scaled_image, (0, 0))
+                self.layers[-1] = (flattened_image, speed)
+            else:
+                self.layers.append((scaled_image, speed))
+        self.layers = [self.create_layer(image, speed) for image, speed in self.layers]
+        # The number of pixels blended (drawn with transparency) and copied (drawn without transparency)
+        # during the last frame.
+        self.blended_pixels = 0
+        self.copied_pixels = 0
+
+    def create_layer(self, image, speed):
+        # A layer is opaque if all of its pixels have the maximum alpha value. Such a layer is converted without
+        # its alpha channel so that drawing it is a simple copy instead of a blend.
+        opaque = pygame.mask.from_surface(image, 254).count() == image.get_width() * image.get_height()
+        if opaque and pygame.display.get_surface() is not None:
+            image = image.convert()
+        return ParallaxLayer(image, speed, opaque)
+
+    def update(self):
+        self.steps += 1
+        for layer in self.layers:
+            layer.offset = (layer.offset + layer.speed) % self.width
+
+    # Scrolls the layers to where they are after 'steps' updates, so that a new compositor continues where another
+    # one stopped.
+    def scroll(self, steps):
+        self.steps = steps
+        for layer in self.layers:
+            layer.offset = layer.speed * steps % self.width
+
+    # Returns the (image, dest, area) commands drawing the layers, for Surface.blits or a RenderQueue.
+    # 'interpolation' is how far the frame is between the previous update (0) and the last one (1).
+    def commands(self, interpolation=1.0):
+        self.blended_pixels = 0
+        self.copied_pixels = 0
+        commands = []
+        for layer in self.layers:
+            # Each layer is drawn as at most two strips. The first strip is the part of the image that is still
+            # on the screen after scrolling, the second one is the beginning of the image that loops on the right.
+            offset = int((layer.offset - layer.speed * (1 - interpolation)) % self.width)
+            top = layer.visible_rows.top
+            rows = layer.visible_rows.height
+            commands.append((layer.image, (0, top), (offset, top, self.width - offset, rows)))
+            if offset > 0:
+                commands.append((layer.image, (self.width - offset, top), (0, top, offset, rows)))
+            if layer.opaque:
+                self.copied_pixels += self.width * rows
+            else:
+                self.blended_pixels += self.width * rows
+        return commands
+
+    def draw(self, surface, interpolation=1.0):
+        surface.blits(self.commands(interpolation), doreturn=False)
@@ -0,0 +1,163 @@
+# pipeline.py
+# The pipelined mode runs the simulation on its own thread while the main thread draws. At each frame the main
+# thread gives the inputs and the number of steps of the next frame to the simulation thread, and draws the
+# snapshot of the frame before. Drawing and updating the window release the GIL, so on a computer with several
+# cores the next frame is computed while the current one is drawn.
+#
+# A snapshot only holds what the renderer needs: the images (shared with the simulation, never copied) and the
+# positions of the sprites, the score and the lives. It is never modified once it is made, so the renderer can draw
+# it while the simulation goes on. The snapshots are passed through a queue holding 'settings.PIPELINE_BUFFERS - 1'
+# of them: with 2 buffers (double buffering) the simulation computes one frame ahead of the drawing, with 3 (triple
+# buffering) up to two frames ahead, which smooths out uneven steps but shows the inputs one frame later.
+#
+# The events of the simulation are not given to their subscribers (the sound bank, the telemetry) on the simulation
+# thread. They are stored in the snapshot of their frame, and given to the subscribers on the main thread when the
+# snapshot is taken, so that a sound is played with the frame that shows what made it.
+import queue
+import threading
+from functions import *
+from simulation import InputState, SimulationClock
+from swarm import BaddieSwarm
+
+# The state of a sprite at the end of a frame. 'rect' is where its image is drawn (the full image of the player
+# and of the ground, the hitbox of the other sprites).
+class SpriteState:
+    __slots__ = ('image', 'rect')
+
+    def __init__(self, sprite):
+        self.image = sprite.image
+        self.rect = getattr(sprite, 'full_image_rect', sprite.rect).copy()
+
+class PlayerState(SpriteState):
+    __slots__ = ('flash_hidden', 'lives', 'has_shield')
+
+    def __init__(self, player):
+        super().__init__(player)
+        self.flash_hidden = player.flash_hidden
+        self.lives = player.lives
+        self.has_shield = player.has_shield
+
+# The baddies of the swarm stress mode. The arrays are copied, the images are shared.
+class SwarmState:
+    def __init__(self, swarm):
+        self.count = swarm.count
+        self.images = swarm.images
+        self.x = swarm.x[:swarm.count].copy()
+        self.y = swarm.y[:swarm.count].copy()
+        self.w = swarm.w[:swarm.count].copy()
+
+    def __len__(self):
+        return self.count
+
+    # The swarm state is drawn exactly like the swarm.
+    commands = BaddieSwarm.commands
+    draw = BaddieSwarm.draw
+
+# Everything the renderer and the overlays read from the simulation, with the same names, so that a snapshot can be
+# drawn like a simulation. 'interpolation' and 'background_steps' are the interpolation of the frame and the number
+# of steps the background has scrolled, and 'events' the events emitted during the steps of the frame, as
+# (name, time, score) tuples.
+class FrameSnapshot:
+    GROUP_NAMES = ('baddie_group', 'platform_group', 'spear_group', 'ground_group', 'shield_effect_group', 'shield_pickup_group')
+
+    def __init__(self, simulation, background_steps, interpolation, events=()):
+        self.background_steps = background_steps
+        self.interpolation = interpolation
+        self.events = events
+        self.score = simulation.score
+        # The clock stopped at the time of the frame.
+        self.clock = SimulationClock(simulation.clock.time)
+        self.game_over = simulation.game_over
+        self.previous_positions = {}
+        self.player = self.capture(simulation, simulation.player, PlayerState)
+        for name in self.GROUP_NAMES:
+            setattr(self, name, tuple(self.capture(simulation, sprite, SpriteState) for sprite in getattr(simulation, name)))
+        self.swarm = None if simulation.swarm is None else SwarmState(simulation.swarm)
+        self.pools = simulation.pool_stats()
+
+    def capture(self, simulation, sprite, state_class):
+        state = state_class(sprite)
+        previous_position = simulation.previous_positions.get(sprite)
+        if previous_position is not None:
+            self.previous_positions[state] = previous_position
+        return state
+
+    def pool_stats(self):
+        return self.pools
+
+# Runs a GameSimulation on its own thread. While jobs are in flight the simulation belongs to the thread: the
+# caller must call 'drain' before using the simulation again (for example to reset it).
+class PipelinedSimulation:
+    def __init__(self, simulation, buffers=None):
+        if buffers is None:
+            buffers = settings.PIPELINE_BUFFERS
+        self.simulation = simulation
+        # The number of frames between the frame drawn and the frame being computed.
+        self.latency = max(1, buffers - 1)
+        self.background_steps = 0
+        self.jobs = queue.Queue()
+        self.snapshots = queue.Queue(maxsize=self.latency)
+        # The number of jobs whose snapshot was not taken yet.
+        self.pending = 0
+        # The events of the simulation wait in this list until the end of their frame.
+        simulation.events.deferred = []
+        self.thread = threading.Thread(target=self.run, name='simulation', daemon=True)
+        self.thread.start()
+
+    # Fills the pipeline with snapshots of the simulation as it is now. 'background_steps' is where the background
+    # of the renderer is.
+    def start(self, background_steps):
+        self.background_steps = background_steps
+        for _ in range(self.latency):
+            self.submit(InputState(), 0, 1.0)
+
+    # Asks for the next frame: 'steps' steps with the inputs, drawn at 'interpolation'. The inputs are copied,
+    # so the caller can keep reading the keyboard into its own InputState.
+    def submit(self, inputs, steps, interpolation):
+        self.pending += 1
+        self.jobs.put((InputState(inputs.left, inputs.right, inputs.jump, inputs.attack), steps, interpolation))
+
+    # Waits for the oldest frame asked for and returns its snapshot. The events of the frame are given to their
+    # subscribers now, on the main thread.
+    def next_snapshot(self):
+        snapshot = self.snapshots.get()
+        self.pending -= 1
+        # An error in the simulation thread is raised again here, in the main thread.
+        if isinstance(snapshot, BaseException):
+            raise snapshot
+        for name, time, score in snapshot.events:
+            self.simulation.events.dispatch(name, time, score)
+        return snapshot
+
+    # Waits until every frame asked for is computed and forgets their snapshots.
+    def drain(self):
+        while self.pending > 0:
+            self.next_snapshot()
+
+    # Stops the thread. The events of the simulation are given to the subscribers right away again.
+    def close(self):
+        self.drain()
+        self.jobs.put(None)
+        self.thread.join()
+        self.simulation.events.deferred = None
+
+    def run(self):
+        simulation = self.simulation
+        deferred_events = simulation.events.deferred
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            inputs, steps, interpolation = job
+            try:
+                for _ in range(steps):
+                    if simulation.game_over:
+                        break
+                    simulation.step(inputs)
+                    inputs.clear_pressed_keys()
+                    self.background_steps += 1
+                snapshot = FrameSnapshot(simulation, self.background_steps, interpolation, tuple(deferred_events))
+                deferred_events.clear()
+            except Exception as error:
+                snapshot = error
+            self.snapshots.put(snapshot)
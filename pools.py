@@ -0,0 +1,60 @@
+# pools.py
+import pygame
+
+# A sprite that can be reused by an EntityPool. When it is killed it goes back to its pool instead of being
+# thrown away. Sprites created without a pool behave like normal sprites.
+class PooledSprite(pygame.sprite.Sprite):
+    pool = None
+    in_pool = False
+
+    def kill(self):
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
+
+# Keeps the killed entities of one type so that they can be reused instead of creating new ones. The entity class
+# must accept the pool's arguments followed by the acquire arguments, and have a reset method that takes the
+# acquire arguments and puts the entity back in its starting state.
+class EntityPool:
+    def __init__(self, entity_class, *arguments):
+        self.entity_class = entity_class
+        self.arguments = arguments
+        self.free_entities = []
+        # Statistics of the pool.
+        self.created = 0
+        self.reused = 0
+        self.in_use = 0
+        self.high_water_mark = 0
+
+    def acquire(self, *arguments):
+        if self.free_entities:
+            entity = self.free_entities.pop()
+            entity.reset(*arguments)
+            self.reused += 1
+        else:
+            entity = self.entity_class(*self.arguments, *arguments)
+            entity.pool = self
+            self.created += 1
+        entity.in_pool = False
+        self.in_use += 1
+        if self.in_use > self.high_water_mark:
+            self.high_water_mark = self.in_use
+        return entity
+
+    def release(self, entity):
+        # An entity can be killed twice during the same update (for example a spear that leaves the screen and
+        # touches a baddie), but it must only be released once.
+        if entity.in_pool:
+            return
+        entity.in_pool = True
+        self.in_use -= 1
+        self.free_entities.append(entity)
+
+    def stats(self):
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'in_use': self.in_use,
+            'free': len(self.free_entities),
+            'high_water_mark': self.high_water_mark
+        }
@@ -0,0 +1,204 @@
+# profiler.py
+import cProfile
+import io
+import pstats
+import time
+import pygame
+from collections import deque
+from functions import *
+from surface_cache import surface_cache
+from spatial_hash import collision_stats
+
+# A debug overlay that shows where the time of each frame goes. It is toggled in the game with F3, and F4 writes
+# a cProfile snapshot of the last seconds of the game.
+# The timing hooks are only installed while the profiler is enabled. When it is disabled the game runs the original
+# functions, so the hooks cost nothing.
+class Profiler:
+    def __init__(self, clock):
+        self.clock = clock
+        self.renderer = None
+        self.enabled = False
+        self.font = None
+        # Time spent in each hooked function during the current frame, in nanoseconds.
+        self.timings = {}
+        # The timings of the last finished frame, shown in the overlay.
+        self.last_timings = {}
+        # The rolling graph of the frame times, in milliseconds.
+        self.frame_times = deque(maxlen=settings.PROFILER_GRAPH_LENGTH)
+        self.frame_start = 0
+        # The value of collision_stats.checks at the start of the frame.
+        self.collision_checks_start = 0
+        self.last_collision_checks = 0
+        # The original functions replaced by the hooks, so that they can be put back when the profiler is disabled.
+        self.installed_hooks = []
+        # The cProfile capture runs in segments of one second. The last 'settings.PROFILER_CAPTURE_SECONDS' segments
+        # are kept, so a snapshot always covers the last seconds of the game.
+        self.capture = None
+        self.capture_start = 0
+        self.captured_segments = deque(maxlen=settings.PROFILER_CAPTURE_SECONDS)
+
+    # Creates a function that runs 'function' and adds its duration to the timings of the frame.
+    def timed(self, name, function):
+        timings = self.timings
+        clock = time.perf_counter_ns
+        def timed_function(*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            timings[name] = timings.get(name, 0) + clock() - start
+            return result
+        return timed_function
+
+    # Replaces the attribute of 'owner' (a class or an object) by a timed version of it.
+    def hook_attribute(self, owner, attribute, name):
+        original = getattr(owner, attribute)
+        self.installed_hooks.append(('attribute', owner, attribute, original))
+        setattr(owner, attribute, self.timed(name, original))
+
+    # Replaces each phase of a list of (name, phase) by a timed version of it.
+    def hook_phases(self, phases, prefix):
+        original = list(phases)
+        self.installed_hooks.append(('phases', phases, None, original))
+        phases[:] = [(name, self.timed(prefix + name, phase)) for name, phase in original]
+
+    def install_hooks(self, renderer):
+        from entity import Player, Spear
+        self.hook_attribute(Player, 'update', 'Player.update')
+        self.hook_attribute(Spear, 'update', 'Spear.update')
+        self.hook_phases(renderer.draw_phases, 'draw.')
+
+    def remove_hooks(self):
+        # The hooks are removed in the opposite order, so that the true originals are the ones put back.
+        for kind, owner, attribute, original in reversed(self.installed_hooks):
+            if kind == 'attribute':
+                setattr(owner, attribute, original)
+            else:
+                owner[:] = original
+        self.installed_hooks = []
+
+    # Called by the event dispatcher with the keys pressed: 'F3' shows or hides the profiler and 'F4' writes a
+    # profile of the last seconds.
+    def handle_key(self, event, renderer):
+        if event.key == K_F3:
+            self.toggle(renderer)
+        if event.key == K_F4:
+            self.dump_snapshot()
+
+    def toggle(self, renderer):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable(renderer)
+
+    def enable(self, renderer):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.renderer = renderer
+        # The overlay is only drawn while the profiler is enabled, so that the texture backend does not upload an
+        # empty overlay at every frame.
+        renderer.overlays.append(self.draw)
+        self.install_hooks(renderer)
+        self.start_capture_segment()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.renderer.overlays.remove(self.draw)
+        self.remove_hooks()
+        self.stop_capture_segment()
+        self.frame_times.clear()
+
+    def start_capture_segment(self):
+        self.capture = cProfile.Profile()
+        self.capture_start = time.perf_counter()
+        self.capture.enable()
+
+    def stop_capture_segment(self):
+        if self.capture is None:
+            return
+        self.capture.disable()
+        self.captured_segments.append(pstats.Stats(self.capture))
+        self.capture = None
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter_ns()
+        self.collision_checks_start = collision_stats.checks
+
+    def end_frame(self):
+        self.frame_times.append((time.perf_counter_ns() - self.frame_start) / 1e6)
+        self.last_timings = dict(self.timings)
+        self.timings.clear()
+        self.last_collision_checks = collision_stats.checks - self.collision_checks_start
+        # Starts a new capture segment every second.
+        if time.perf_counter() - self.capture_start >= 1:
+            self.stop_capture_segment()
+            self.start_capture_segment()
+
+    # Writes the captured seconds of the game in a .prof file (readable with pstats or snakeviz) and prints
+    # the functions that took the most time. Returns the name of the file.
+    def dump_snapshot(self):
+        if not self.enabled:
+            return None
+        self.stop_capture_segment()
+        self.start_capture_segment()
+        if not self.captured_segments:
+            return None
+        snapshot = pstats.Stats()
+        for segment in self.captured_segments:
+            snapshot.add(segment)
+        file_name = 'profile_%s.prof' % time.strftime('%Y%m%d_%H%M%S')
+        snapshot.dump_stats(file_name)
+        summary = io.StringIO()
+        snapshot.stream = summary
+        snapshot.sort_stats('cumulative').print_stats(20)
+        print('Profile of the last %d seconds written to %s' % (len(self.captured_segments), file_name))
+        print(summary.getvalue())
+        return file_name
+
+    # Draws the overlay on the window surface.
+    def draw(self, surface, simulation):
+        if not self.enabled:
+            return
+        if self.font is None:
+            self.font = text_cache.get_font(None, 22)
+        lines = ['FPS: %.1f' % self.clock.get_fps()]
+        if self.frame_times:
+            lines.append('frame: %.2f ms (max %.2f ms)' % (self.frame_times[-1], max(self.frame_times)))
+        for name, nanoseconds in sorted(self.last_timings.items()):
+            lines.append('%s: %.3f ms' % (name, nanoseconds / 1e6))
+        lines.append('collision checks: %d' % self.last_collision_checks)
+        for name in ('baddie_group', 'spear_group', 'platform_group', 'ground_group', 'shield_pickup_group', 'shield_effect_group'):
+            lines.append('%s: %d' % (name, len(getattr(simulation, name))))
+        if simulation.swarm is not None:
+            lines.append('swarm: %d' % len(simulation.swarm))
+        for name, stats in simulation.pool_stats().items():
+            lines.append('%s pool: %d in use, high-water mark %d' % (name, stats['in_use'], stats['high_water_mark']))
+        lines.append('background: %d pixels blended' % self.renderer.background.blended_pixels)
+        lines.append('draws: %d in %d blits calls' % (self.renderer.draws, self.renderer.blits_calls))
+        lines.append('surface cache: %d%% hits (%d entries)' % (surface_cache.hit_rate() * 100, len(surface_cache.entries)))
+        lines.append('text cache: %d%% hits (%d entries)' % (text_cache.hit_rate() * 100, len(text_cache.rendered_texts)))
+
+        x = settings.PROFILER_OVERLAY_X
+        y = settings.PROFILER_OVERLAY_Y
+        for line in lines:
+            text_surface = self.font.render(line, True, settings.PROFILER_TEXT_COLOR)
+            surface.blit(text_surface, (x, y))
+            y += text_surface.get_height()
+        self.draw_graph(surface, x, y + 5)
+
+    # Draws the frame times as a line graph. The horizontal line is the frame budget of 'settings.RENDER_FPS'.
+    def draw_graph(self, surface, x, y):
+        width = settings.PROFILER_GRAPH_LENGTH * 2
+        height = settings.PROFILER_GRAPH_HEIGHT
+        budget = 1000 / settings.RENDER_FPS
+        scale = height / (2 * budget)
+        pygame.draw.rect(surface, settings.PROFILER_TEXT_COLOR, (x, y, width, height), 1)
+        budget_y = y + height - int(budget * scale)
+        pygame.draw.line(surface, settings.PROFILER_BUDGET_COLOR, (x, budget_y), (x + width, budget_y))
+        if len(self.frame_times) < 2:
+            return
+        points = []
+        for index, frame_time in enumerate(self.frame_times):
+            points.append((x + index * 2, y + height - min(height, int(frame_time * scale))))
+        pygame.draw.lines(surface, settings.PROFILER_GRAPH_COLOR, False, points)
@@ -0,0 +1,76 @@
+# quality.py
+from functions import *
+
+# A level of quality of the drawing.
+# - render_scale: the size of the surface the game is drawn on, compared to the window. Below 1 the game is drawn
+#   on a smaller surface which is then scaled up to the window.
+# - merged_background_layers: the number of the farthest background layers merged into one.
+# - invulnerability_flash: False to draw the player without flashing while he is invulnerable.
+class QualityLevel:
+    def __init__(self, name, render_scale, merged_background_layers, invulnerability_flash):
+        self.name = name
+        self.render_scale = render_scale
+        self.merged_background_layers = merged_background_layers
+        self.invulnerability_flash = invulnerability_flash
+
+# The levels from the highest quality to the lowest. Each level keeps the savings of the level before it.
+QUALITY_LEVELS = [
+    QualityLevel('High', 1, 1, True),
+    QualityLevel('Medium', settings.QUALITY_RENDER_SCALE, 1, True),
+    QualityLevel('Low', settings.QUALITY_RENDER_SCALE, settings.QUALITY_MERGED_BACKGROUND_LAYERS, True),
+    QualityLevel('Lowest', settings.QUALITY_RENDER_SCALE, settings.QUALITY_MERGED_BACKGROUND_LAYERS, False)
+]
+
+# Watches the time spent on each frame and changes the quality of the renderer so that the frames fit in the
+# frame budget. The frame times are averaged over 'settings.QUALITY_SAMPLE_FRAMES' frames (a sample):
+# - when a sample uses more than 'settings.QUALITY_STEP_DOWN_LOAD' of the budget, the quality goes down one level,
+# - when several samples in a row use less than 'settings.QUALITY_STEP_UP_LOAD' of the budget, it goes up one level.
+# The gap between the two loads and the number of samples needed to go up keep the quality from changing back and
+# forth. When the quality has to go down soon after going up, going up needs twice as many samples the next time.
+class QualityGovernor:
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.frame_budget = 1000 / settings.RENDER_FPS
+        self.level = 0
+        self.frame_times = []
+        self.samples_with_headroom = 0
+        self.step_up_samples = settings.QUALITY_STEP_UP_SAMPLES
+        self.last_change_was_up = False
+        self.samples_since_change = 0
+        self.renderer.set_quality(QUALITY_LEVELS[self.level])
+
+    # 'frame_time' is the number of milliseconds spent on the frame, without the time spent waiting for the next one.
+    def update(self, frame_time):
+        self.frame_times.append(frame_time)
+        if len(self.frame_times) < settings.QUALITY_SAMPLE_FRAMES:
+            return
+        load = sum(self.frame_times) / len(self.frame_times) / self.frame_budget
+        self.frame_times.clear()
+        self.samples_since_change += 1
+
+        if load > settings.QUALITY_STEP_DOWN_LOAD:
+            self.samples_with_headroom = 0
+            if self.level < len(QUALITY_LEVELS) - 1:
+                if self.last_change_was_up and self.samples_since_change <= settings.QUALITY_STEP_UP_SAMPLES:
+                    self.step_up_samples = min(self.step_up_samples * 2, settings.QUALITY_MAX_STEP_UP_SAMPLES)
+                self.set_level(self.level + 1)
+        elif load < settings.QUALITY_STEP_UP_LOAD:
+            self.samples_with_headroom += 1
+            if self.level > 0 and self.samples_with_headroom >= self.step_up_samples:
+                self.samples_with_headroom = 0
+                self.set_level(self.level - 1)
+        else:
+            self.samples_with_headroom = 0
+
+    def set_level(self, level):
+        self.last_change_was_up = level < self.level
+        self.level = level
+        self.samples_since_change = 0
+        self.renderer.set_quality(QUALITY_LEVELS[level])
+        # The frames before the change say nothing about the new level.
+        self.frame_times.clear()
+
+    # Forgets the frames drawn so far, for example after the game was paused on a menu.
+    def reset_samples(self):
+        self.frame_times.clear()
+        self.samples_with_headroom = 0
@@ -0,0 +1,103 @@
+# render_backend.py
+import weakref
+import pygame
+from functions import *
+
+# The backends draw the render queues of the renderer and show the frames in the window. Both take the commands of
+# a RenderQueue through 'blits', like a surface, so the renderer draws the same way whichever backend it uses.
+# Text and overlays are still drawn with the usual pygame functions on the surface returned by 'ui_surface'.
+
+# Draws with software blits on the surface of the window made by pygame.display.set_mode. It is the usual way of
+# drawing with pygame, and the only one that supports the smaller render scales of the quality governor.
+class SurfaceBackend:
+    supports_render_scale = True
+
+    def __init__(self, surface):
+        self.surface = surface
+
+    # The images are drawn as they are, there is nothing to prepare.
+    def prewarm(self, images):
+        pass
+
+    def blits(self, commands, doreturn=False):
+        self.surface.blits(commands, doreturn=False)
+
+    def ui_surface(self):
+        return self.surface
+
+    def present(self):
+        pygame.display.update()
+
+# Draws with an SDL renderer (pygame._sdl2.video). Every image is uploaded once as a texture the first time it is
+# drawn ('prewarm' uploads the images of the game in advance), and each frame only asks the renderer to copy the
+# textures, which a graphics card does without the CPU. The part of an image drawn ('area', used by the scrolling
+# background) becomes the source rectangle of the copy. The flipped images (like the player facing left) are other
+# images of the caches, so they have their own textures.
+# The text and the overlays are drawn on a transparent surface which is uploaded and drawn on top of the frame,
+# only at the frames where something was drawn on it.
+# With 'settings.TEXTURE_RENDERER_SOFTWARE' the textures are copied by SDL's software renderer, which works on the
+# computers without a graphics card (and with the dummy video driver).
+class TextureBackend:
+    supports_render_scale = False
+
+    def __init__(self, size, title):
+        from pygame._sdl2.video import Window, Renderer, Texture
+        self.Texture = Texture
+        self.window = Window(title, size)
+        self.renderer = Renderer(self.window, accelerated=0 if settings.TEXTURE_RENDERER_SOFTWARE else -1, vsync=False)
+        # The texture of each image. The textures are forgotten with their images (like the texts evicted from the
+        # text cache).
+        self.textures = weakref.WeakKeyDictionary()
+        # The number of images uploaded as textures since the backend was created.
+        self.uploads = 0
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.surface_used = False
+
+    def texture(self, image):
+        texture = self.textures.get(image)
+        if texture is None:
+            texture = self.Texture.from_surface(self.renderer, image)
+            self.textures[image] = texture
+            self.uploads += 1
+        return texture
+
+    # Uploads the images before the game, so that the first frames do not stop to upload them.
+    def prewarm(self, images):
+        for image in images:
+            self.texture(image)
+
+    def blits(self, commands, doreturn=False):
+        texture = self.texture
+        for command in commands:
+            image = command[0]
+            dest = command[1]
+            x = dest[0]
+            y = dest[1]
+            if len(command) == 3:
+                area = command[2]
+                texture(image).draw(area, (x, y, area[2], area[3]))
+            else:
+                texture(image).draw(None, (x, y, image.get_width(), image.get_height()))
+
+    def ui_surface(self):
+        self.surface_used = True
+        return self.surface
+
+    def present(self):
+        if self.surface_used:
+            self.Texture.from_surface(self.renderer, self.surface).draw()
+            self.surface.fill((0, 0, 0, 0))
+            self.surface_used = False
+        self.renderer.present()
+        self.renderer.clear()
+
+# Creates the window and the backend chosen by 'settings.RENDER_BACKEND' ('surface' or 'texture').
+def create_backend(title):
+    size = (settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT)
+    if settings.RENDER_BACKEND == 'texture':
+        return TextureBackend(size, title)
+    if settings.RENDER_BACKEND != 'surface':
+        raise ValueError('Unknown render backend: %r' % settings.RENDER_BACKEND)
+    surface = pygame.display.set_mode(size)
+    pygame.display.set_caption(title)
+    return SurfaceBackend(surface)
@@ -0,0 +1,64 @@
+# render_queue.py
+
+# The layers of a frame, from the back to the front. The drawing order of the game is given by these numbers only:
+# the commands are sorted by layer, and the commands of the same layer are drawn in the order they were submitted.
+LAYER_BACKGROUND = 0
+# The score is drawn on the background, under the entities, like the game always did.
+LAYER_SCORE = 5
+LAYER_PLAYER = 10
+LAYER_BADDIES = 20
+LAYER_PLATFORMS = 30
+LAYER_SPEARS = 40
+LAYER_GROUND = 50
+LAYER_SHIELD_EFFECTS = 60
+LAYER_SHIELD_PICKUPS = 70
+LAYER_HUD = 100
+
+# Collects the drawing commands of a frame and draws them all at once on the target surface. Every part of the
+# renderer submits (surface, dest, area, layer) commands instead of drawing, and 'flush' sorts them by layer and
+# draws them with a single call to Surface.blits. That way the number of calls from Python to SDL stays the same
+# however many sprites there are.
+class RenderQueue:
+    def __init__(self, target):
+        self.target = target
+        # The commands of each layer, as the (surface, dest) or (surface, dest, area) tuples taken by Surface.blits.
+        self.layers = {}
+        # The number of commands drawn by the last flush, and the number of commands drawn and of flushes since the
+        # queue was created.
+        self.draws = 0
+        self.total_draws = 0
+        self.flushes = 0
+
+    def submit(self, surface, dest, area=None, layer=0):
+        commands = self.layers.get(layer)
+        if commands is None:
+            commands = self.layers[layer] = []
+        if area is None:
+            commands.append((surface, dest))
+        else:
+            commands.append((surface, dest, area))
+
+    # Submits a list of (surface, dest) or (surface, dest, area) commands on the same layer.
+    def submit_many(self, commands, layer=0):
+        layer_commands = self.layers.get(layer)
+        if layer_commands is None:
+            self.layers[layer] = list(commands)
+        else:
+            layer_commands.extend(commands)
+
+    # Draws every command on the target and empties the queue. Returns the number of commands drawn.
+    def flush(self):
+        layers = self.layers
+        if len(layers) == 1:
+            commands = next(iter(layers.values()))
+        else:
+            commands = []
+            for layer in sorted(layers):
+                commands += layers[layer]
+        if commands:
+            self.target.blits(commands, doreturn=False)
+        self.layers = {}
+        self.draws = len(commands)
+        self.total_draws += self.draws
+        self.flushes += 1
+        return self.draws
@@ -0,0 +1,233 @@
+# renderer.py
+import math
+import pygame
+from functions import *
+from parallax import ParallaxCompositor
+from surface_cache import SurfaceCache, surface_cache
+from render_queue import *
+from render_backend import SurfaceBackend
+
+# Draws the state of a GameSimulation on the window surface. The render queues of the window are drawn by the
+# backend (see render_backend.py), by default with software blits on the window surface.
+class GameRenderer:
+    def __init__(self, window_surface, assets, font, backend=None):
+        self.window_surface = window_surface
+        if backend is None:
+            backend = SurfaceBackend(window_surface)
+        self.backend = backend
+        self.assets = assets
+        self.font = font
+        # Creates the compositor that draws all of the background layers. Each layer scrolls at its own speed and loops
+        # horizontally, which makes the parallax effect of an infinite image.
+        self.background = ParallaxCompositor(assets.BACKGROUND_IMAGES_AND_SPEEDS, settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT)
+        # The compositors made for each quality, by (render scale, number of merged layers).
+        self.backgrounds = {(1, 1): self.background}
+        # The background and the entities are drawn on the scene surface. At the highest quality it is the window
+        # itself, at the lower ones it is a smaller surface scaled up to the window (see 'set_quality').
+        self.scene_surface = window_surface
+        self.render_scale = 1
+        # The images of the entities scaled to the size of the scene surface.
+        self.scaled_images = SurfaceCache(settings.QUALITY_SCALED_IMAGES_MAX_ENTRIES)
+        self.invulnerability_flash = True
+        # The name of the quality shown in the HUD. None when the quality never changes.
+        self.quality_name = None
+        self.quality_font = text_cache.get_font(None, 24)
+        # Everything is drawn through render queues: the scene queue draws on the scene surface and the window queue
+        # on the window. When the scene surface is the window, both are the same queue and the whole frame is drawn
+        # with a single call to Surface.blits.
+        self.window_queue = RenderQueue(backend)
+        self.scene_queue = self.window_queue
+        # The number of images drawn and of calls to Surface.blits during the current frame.
+        self.draws = 0
+        self.blits_calls = 0
+        # The phases of a frame, in the order they are drawn. Each phase has a name so that it can be measured separately.
+        self.draw_phases = [
+            ('background', self.draw_background),
+            ('entities', self.draw_entities),
+            ('upscale', self.upscale),
+            ('hud', self.draw_hud),
+            ('flush', self.flush),
+            ('overlays', self.draw_overlays),
+            ('display', self.present)
+        ]
+        # How far the frame is between the previous step of the simulation (0) and the last one (1). The sprites
+        # and the background are drawn between their two positions, so the movements stay smooth when the window
+        # is drawn more or less often than the simulation steps.
+        self.interpolation = 1.0
+        # Functions that draw on top of the game, like the profiler. Each one is called with the surface of the
+        # backend for text and overlays, and the simulation.
+        self.overlays = []
+
+    # The background scrolls once per step of the simulation.
+    def update(self):
+        self.background.update()
+
+    def draw(self, simulation):
+        self.draws = 0
+        self.blits_calls = 0
+        for phase_name, phase in self.draw_phases:
+            phase(simulation)
+
+    # Gives the images of the game to the backend before the first frame (the texture backend uploads them): the
+    # background layers, the frames of the player, the scaled images of the surface cache and the hearts.
+    def prewarm_backend(self):
+        images = [layer.image for layer in self.background.layers]
+        for frames in self.assets.PLAYER_ANIMATIONS.frames:
+            images.extend(frames)
+        images.extend(surface_cache.pinned.values())
+        images.extend(surface_cache.entries.values())
+        images.extend((self.assets.RED_HEART_IMAGE, self.assets.BLUE_HEART_IMAGE))
+        self.backend.prewarm(images)
+
+    # Changes the quality of the drawing to a QualityLevel (see quality.py).
+    # A backend that cannot draw on a smaller surface always draws at the size of the window.
+    def set_quality(self, quality):
+        scale = quality.render_scale if self.backend.supports_render_scale else 1
+        self.render_scale = scale
+        self.invulnerability_flash = quality.invulnerability_flash
+        self.quality_name = quality.name
+        if scale == 1:
+            self.scene_surface = self.window_surface
+            self.scene_queue = self.window_queue
+        else:
+            size = (round(settings.WINDOW_WIDTH * scale), round(settings.WINDOW_HEIGHT * scale))
+            if self.scene_surface.get_size() != size:
+                self.scene_surface = pygame.Surface(size, 0, self.window_surface)
+                self.scene_queue = RenderQueue(self.scene_surface)
+        key = (scale, quality.merged_background_layers)
+        background = self.backgrounds.get(key)
+        if background is None:
+            # The layers scroll by fewer pixels on a smaller surface.
+            images_and_speeds = [(image, speed * scale) for image, speed in self.assets.BACKGROUND_IMAGES_AND_SPEEDS]
+            width, height = self.scene_surface.get_size()
+            background = ParallaxCompositor(images_and_speeds, width, height, quality.merged_background_layers)
+            self.backgrounds[key] = background
+        background.scroll(self.background.steps)
+        self.background = background
+
+    # Returns the image scaled to the size of the scene surface. The size is rounded up so that the images drawn
+    # next to each other, like the ground, never leave a gap between them.
+    def scaled_image(self, image):
+        scale = self.render_scale
+        return self.scaled_images.get_scaled(image, (math.ceil(image.get_width() * scale), math.ceil(image.get_height() * scale)))
+
+    def draw_background(self, simulation):
+        self.scene_queue.submit_many(self.background.commands(self.interpolation), LAYER_BACKGROUND)
+
+    def draw_entities(self, simulation):
+        # The player is not drawn during the invisible part of the invulnerability flash.
+        if not (simulation.player.flash_hidden and self.invulnerability_flash):
+            self.draw_sprites([simulation.player], simulation, LAYER_PLAYER)
+        self.draw_sprites(simulation.baddie_group, simulation, LAYER_BADDIES)
+        if simulation.swarm is not None:
+            if self.render_scale == 1:
+                self.scene_queue.submit_many(simulation.swarm.commands(), LAYER_BADDIES)
+            else:
+                images = [None if image is None else self.scaled_image(image) for image in simulation.swarm.images]
+                self.scene_queue.submit_many(simulation.swarm.commands(self.render_scale, images), LAYER_BADDIES)
+        self.draw_sprites(simulation.platform_group, simulation, LAYER_PLATFORMS)
+        self.draw_sprites(simulation.spear_group, simulation, LAYER_SPEARS)
+        self.draw_ground(simulation)
+        self.draw_sprites(simulation.shield_effect_group, simulation, LAYER_SHIELD_EFFECTS)
+        self.draw_sprites(simulation.shield_pickup_group, simulation, LAYER_SHIELD_PICKUPS)
+
+    # The ground is drawn with its full image and not with its hitbox.
+    def draw_ground(self, simulation):
+        self.draw_sprites(simulation.ground_group, simulation, LAYER_GROUND)
+
+    # Submits the sprites on the layer, between their position before the last step and their current position. The player and the
+    # ground are drawn with their full image and not with their hitbox. The sprites that did not exist before the
+    # last step, or that jumped (like the ground looping back on the right), are drawn at their current position.
+    # On a smaller scene surface the positions and the images are scaled down.
+    def draw_sprites(self, sprites, simulation, layer):
+        interpolation = self.interpolation
+        scale = self.render_scale
+        if interpolation >= 1 and scale == 1:
+            self.scene_queue.submit_many([(sprite.image, getattr(sprite, 'full_image_rect', sprite.rect)) for sprite in sprites], layer)
+            return
+        previous_positions = simulation.previous_positions if interpolation < 1 else {}
+        max_distance = settings.INTERPOLATION_MAX_DISTANCE
+        blits = []
+        for sprite in sprites:
+            x, y = getattr(sprite, 'full_image_rect', sprite.rect).topleft
+            previous_position = previous_positions.get(sprite)
+            if previous_position is not None:
+                previous_x, previous_y = previous_position
+                if abs(x - previous_x) <= max_distance and abs(y - previous_y) <= max_distance:
+                    x = previous_x + (x - previous_x) * interpolation
+                    y = previous_y + (y - previous_y) * interpolation
+            image = sprite.image
+            if scale != 1:
+                image = self.scaled_image(image)
+                x *= scale
+                y *= scale
+            blits.append((image, (round(x), round(y))))
+        self.scene_queue.submit_many(blits, layer)
+
+    # At the lower qualities the background and the entities are drawn on a smaller surface, which is scaled up to
+    # the window here. The HUD is drawn after it, at the size of the window, so that the text stays sharp (the score
+    # is then drawn over the entities instead of under them).
+    def upscale(self, simulation=None):
+        if self.scene_surface is not self.window_surface:
+            self.flush_queue(self.scene_queue)
+            pygame.transform.scale(self.scene_surface, self.window_surface.get_size(), self.window_surface)
+
+    def draw_hud(self, simulation):
+        # The score changes at every frame, so it is drawn with the pre-rendered digits of the text cache.
+        self.window_queue.submit_many(text_cache.number_commands(self.font, 'Score: ', simulation.score, 10, 0, settings.SCORE_COLOR), LAYER_SCORE)
+        # Draws the number of lives the player has left
+        for i in range(simulation.player.lives):
+            heart_left = settings.WINDOW_WIDTH - settings.PLAYER_LIVES_MARGIN_X - (settings.PLAYER_LIVES_DISPLAY_SIZE * (i + 1)) - (settings.PLAYER_LIVES_HEART_SPACING * i)
+            if simulation.player.has_shield:
+                self.window_queue.submit(self.assets.BLUE_HEART_IMAGE, (heart_left, settings.PLAYER_LIVES_MARGIN_Y), layer=LAYER_HUD)
+            else:
+                self.window_queue.submit(self.assets.RED_HEART_IMAGE, (heart_left, settings.PLAYER_LIVES_MARGIN_Y), layer=LAYER_HUD)
+        # Shows the quality chosen by the quality governor under the hearts.
+        if self.quality_name is not None:
+            quality_text = text_cache.render(self.quality_font, 'Quality: ' + self.quality_name, settings.QUALITY_TEXT_COLOR)
+            quality_top = settings.PLAYER_LIVES_MARGIN_Y + settings.PLAYER_LIVES_DISPLAY_SIZE + 5
+            self.window_queue.submit(quality_text, (settings.WINDOW_WIDTH - settings.PLAYER_LIVES_MARGIN_X - quality_text.get_width(), quality_top), layer=LAYER_HUD)
+
+    # Draws everything submitted to the window queue (at the highest quality, the whole frame).
+    def flush(self, simulation=None):
+        self.flush_queue(self.window_queue)
+
+    def flush_queue(self, render_queue):
+        if render_queue.flush() > 0:
+            self.draws += render_queue.draws
+            self.blits_calls += 1
+
+    def draw_overlays(self, simulation):
+        if self.overlays:
+            surface = self.backend.ui_surface()
+            for overlay in self.overlays:
+                overlay(surface, simulation)
+
+    # Updates the window so that the player sees what has been drawn.
+    def present(self, simulation=None):
+        self.backend.present()
+
+    # The start screen is shown while the assets of the game are loading. Until they are loaded there is no
+    # simulation yet, so the ground is not drawn, and the loading progress is drawn under the text.
+    def draw_start_screen(self, simulation, loading_progress=None):
+        self.draw_background(simulation)
+        if simulation is not None:
+            self.draw_ground(simulation)
+        self.upscale()
+        self.flush()
+        # Draws the text on the starting screen.
+        surface = self.backend.ui_surface()
+        draw_text('Dodger', self.font, surface, settings.WINDOW_WIDTH // 3, settings.WINDOW_HEIGHT // 3)
+        draw_text('Press a key to start.', self.font, surface, settings.WINDOW_WIDTH // 3, (settings.WINDOW_HEIGHT // 3) + 50)
+        if loading_progress is not None and loading_progress < 1:
+            draw_progress_bar(surface, loading_progress)
+        self.present()
+
+    # The last frame of the game is drawn again under the text, because the texture backend does not keep the
+    # frames it has shown.
+    def draw_game_over_screen(self, simulation):
+        for phase_name, phase in self.draw_phases:
+            if phase_name not in ('overlays', 'display'):
+                phase(simulation)
+        game_over_text(self.backend.ui_surface())
+        self.present()
@@ -0,0 +1,170 @@
+# replay.py
+# Records the inputs of every step of the simulation in a file, and plays them back. The simulation only depends on
+# its seed and on its inputs, so playing the inputs back with the same seed gives exactly the same games. It is used
+# to reproduce bugs and to compare the speed of two versions of the game on the same games.
+#
+# Format of a replay file:
+# - a header: the magic bytes, the version of the format, the seed of the simulation and the length of a step,
+# - the inputs, as runs of steps with the same inputs. Each run is a variable length integer holding the number of
+#   steps of the run and the 4 bits of the inputs ((steps << 4) | bits). Most steps have the same inputs as the
+#   step before, so a run often covers many steps in one or two bytes.
+# - a 0, which marks the end of the replay.
+# The runs are written as soon as they end, and flushed regularly and at every new game, so the file is written during
+# the game and a crash only loses its last steps.
+import struct
+import time
+from functions import *
+from simulation import GameSimulation, InputState
+
+REPLAY_MAGIC = b'DODGEREP'
+# The version changes with the format, and also with every change of the simulation that gives other games for the
+# same inputs (like the pixel accurate collisions), so that an old replay is not played into different games.
+REPLAY_VERSION = 3
+HEADER = struct.Struct('<8sBQd')
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_ATTACK = 8
+
+def inputs_to_bits(inputs):
+    return ((INPUT_LEFT if inputs.left else 0) | (INPUT_RIGHT if inputs.right else 0) |
+            (INPUT_JUMP if inputs.jump else 0) | (INPUT_ATTACK if inputs.attack else 0))
+
+def bits_to_inputs(bits):
+    return InputState(bool(bits & INPUT_LEFT), bool(bits & INPUT_RIGHT), bool(bits & INPUT_JUMP), bool(bits & INPUT_ATTACK))
+
+def encode_varint(value):
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+# Reads a variable length integer from the file. Returns None at the end of the file.
+def read_varint(file):
+    value = 0
+    shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            return None
+        value |= (byte[0] & 0x7f) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+# Records the inputs of a simulation: set it as the 'input_recorder' of the simulation.
+class ReplayWriter:
+    def __init__(self, path, seed, timestep=None):
+        if timestep is None:
+            timestep = settings.SIMULATION_TIMESTEP
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, timestep))
+        self.bits = None
+        self.steps = 0
+        self.total_steps = 0
+        self.unflushed_runs = 0
+
+    def record(self, inputs):
+        bits = inputs_to_bits(inputs)
+        if bits != self.bits:
+            self.write_run()
+            self.bits = bits
+        self.steps += 1
+        self.total_steps += 1
+
+    def write_run(self):
+        if self.steps > 0:
+            self.file.write(encode_varint((self.steps << 4) | self.bits))
+            self.unflushed_runs += 1
+            if self.unflushed_runs >= settings.REPLAY_FLUSH_RUNS:
+                self.file.flush()
+                self.unflushed_runs = 0
+        self.steps = 0
+
+    # Writes the current run and everything buffered to the file, for example when a new game starts. The next
+    # steps with the same inputs start a new run.
+    def flush(self):
+        self.write_run()
+        self.file.flush()
+        self.unflushed_runs = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.write_run()
+        self.file.write(encode_varint(0))
+        self.file.close()
+
+class ReplayReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            magic, version, self.seed, self.timestep = HEADER.unpack(file.read(HEADER.size))
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError('%s is not a replay of this version of the game.' % path)
+
+    # Gives the inputs of every step, in order. A replay cut short (for example when the game was killed) stops
+    # at its last complete run.
+    def inputs(self):
+        with open(self.path, 'rb') as file:
+            file.seek(HEADER.size)
+            while True:
+                run = read_varint(file)
+                if not run:
+                    return
+                inputs = bits_to_inputs(run & 0xf)
+                for _ in range(run >> 4):
+                    yield inputs
+
+# Plays a replay back. Without a renderer, the steps run as fast as possible. With one, every step is drawn and the
+# replay runs in real time. A new game starts when the player dies, like in main.py.
+# Returns the scores of the games and the time spent.
+def play_replay(path, assets, renderer=None):
+    reader = ReplayReader(path)
+    simulation = GameSimulation(assets, seed=reader.seed)
+    clock = pygame.time.Clock()
+    scores = []
+    steps = 0
+    start_time = time.perf_counter()
+    for inputs in reader.inputs():
+        if simulation.game_over:
+            scores.append(simulation.score)
+            simulation.reset()
+        simulation.step(inputs, reader.timestep)
+        steps += 1
+        if renderer is not None:
+            pygame.event.pump()
+            renderer.update()
+            renderer.draw(simulation)
+            clock.tick(1000 / reader.timestep)
+    scores.append(simulation.score)
+    return scores, steps, time.perf_counter() - start_time
+
+# Plays a replay: python replay.py <file> [--realtime]
+# With --realtime the replay is shown in a window, otherwise it runs headless as fast as possible.
+if __name__ == '__main__':
+    import argparse
+    import os
+    parser = argparse.ArgumentParser(description='Plays a replay of the game.')
+    parser.add_argument('path')
+    parser.add_argument('--realtime', action='store_true', help='show the replay in a window, at the speed of the game')
+    arguments = parser.parse_args()
+    if not arguments.realtime:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from assets import GameAssets
+    from renderer import GameRenderer
+    pygame.init()
+    renderer = None
+    if arguments.realtime:
+        window_surface = pygame.display.set_mode((settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT))
+        pygame.display.set_caption('Dodger replay')
+        assets = GameAssets()
+        renderer = GameRenderer(window_surface, assets, text_cache.get_font(None, 48, system=True))
+    else:
+        assets = GameAssets()
+    scores, steps, elapsed_time = play_replay(arguments.path, assets, renderer)
+    print('%d steps, %d games, scores %s' % (steps, len(scores), scores))
+    print('played in %.2f s: %d steps per second' % (elapsed_time, steps / elapsed_time))
@@ -0,0 +1,70 @@
+# scheduler.py
+import heapq
+
+# The times are floats that add up steps of 1000 / 60 milliseconds, so an event due at the time of a step may be a
+# rounding error later than it. The events due less than this number of milliseconds after the time are run too.
+TIME_TOLERANCE = 1e-6
+
+# An event waiting in a Scheduler. It is returned by 'schedule' and 'schedule_every' so that it can be cancelled.
+class ScheduledEvent:
+    __slots__ = ('time', 'callback', 'arguments', 'interval', 'cancelled')
+
+    def __init__(self, time, callback, arguments, interval):
+        self.time = time
+        self.callback = callback
+        self.arguments = arguments
+        self.interval = interval
+        self.cancelled = False
+
+# Calls functions at given times of the simulation, once or at a regular interval. The events wait in a heap sorted
+# by time, so each step only looks at the events that are due instead of every timer of the game. The times are in
+# milliseconds of the simulation clock: 'run' is called at every step with the time of the clock, which is not
+# rounded, so that the events keep the exact intervals they were given.
+class Scheduler:
+    def __init__(self, time=0):
+        self.time = time
+        # The heap of (time, order, event). The order keeps the events due at the same time in the order they were
+        # scheduled.
+        self.events = []
+        self.order = 0
+
+    def __len__(self):
+        return len(self.events)
+
+    # Calls 'callback(*arguments)' once, 'delay' milliseconds from now.
+    def schedule(self, delay, callback, *arguments):
+        return self.push(ScheduledEvent(self.time + delay, callback, arguments, None))
+
+    # Calls 'callback(*arguments)' every 'interval' milliseconds, the first time 'interval' milliseconds from now.
+    def schedule_every(self, interval, callback, *arguments):
+        return self.push(ScheduledEvent(self.time + interval, callback, arguments, interval))
+
+    def push(self, event):
+        heapq.heappush(self.events, (event.time, self.order, event))
+        self.order += 1
+        return event
+
+    # A cancelled event stays in the heap until it is due, and is then dropped without being called.
+    def cancel(self, event):
+        if event is not None:
+            event.cancelled = True
+
+    # Forgets every event, for example when a new game starts.
+    def clear(self):
+        self.events = []
+
+    # Moves the time forward and calls the events that are due, in the order of their times. A recurring event is
+    # scheduled again from the time it was due, so that it does not drift when the steps are late.
+    def run(self, time):
+        self.time = time
+        events = self.events
+        time += TIME_TOLERANCE
+        while events and events[0][0] <= time:
+            event = heapq.heappop(events)[2]
+            if event.cancelled:
+                continue
+            if event.interval is not None:
+                event.time += event.interval
+                heapq.heappush(events, (event.time, self.order, event))
+                self.order += 1
+            event.callback(*event.arguments)
@@ -5,11 +5,18 @@ class Settings:
     # Window
     WINDOW_WIDTH = 1280
     WINDOW_HEIGHT = 720
-    FPS = 60
+    FPS = 60 # The number of steps of the simulation per second of game time.
+    SIMULATION_TIMESTEP = 1000 / FPS # The number of milliseconds of game time that pass at each step of the simulation.
+    RENDER_FPS = 60 # The maximum number of frames drawn per second. It does not change the speed of the game.
+    MAX_CATCH_UP_STEPS = 10 # The maximum number of steps run before drawing a frame. Past it, the game slows down.
+    PIPELINED_SIMULATION = False # True to run the simulation on its own thread while the frames are drawn (see pipeline.py).
+    PIPELINE_BUFFERS = 2 # 2 for double buffering (the simulation runs one frame ahead), 3 for triple buffering.
+    INTERPOLATION_MAX_DISTANCE = 64 # A sprite that moved more than this many pixels in one step is not interpolated.
     
     # Colors
     TEXT_COLOR = (0, 0, 0)
     BACKGROUND_COLOR = (255, 255, 255)
+    SCORE_COLOR = (255, 0, 0)
 
     # Ground
     GROUND_HEIGHT = 60
@@ -37,8 +44,8 @@ class Settings:
     SHIELD_DURATION_TIME = 5000 # The number of milliseconds the shield lasts.
 
     SHIELD_PICKUP_SIZE = 50 # The size of the pickable shield's image.
-    SHIELD_PICKUP_SPAWN_RATE_MIN = 10000 # The minimium number of milliseconds before another shield spawns (after the current one ends)
-    SHIELD_PICKUP_SPAWN_RATE_MAX = 20000 # The maximum number of milliseconds before another shield spawns (after the current one ends)
+    SHIELD_PICKUP_SPAWN_RATE_MIN = 10000 # The minimum number of milliseconds between two shield pickup spawns
+    SHIELD_PICKUP_SPAWN_RATE_MAX = 20000 # The maximum number of milliseconds between two shield pickup spawns
     SHIELD_PICKUP_SCROLL_SPEED = 4
 
     # Spear
@@ -62,4 +69,85 @@ class Settings:
     PLATFORM_WIDTH = 250
     PLATFORM_SPEED =  5
     ADD_NEW_PLATFORM_RATE = 20
+
+    # Spawn director
+    SPAWN_RAMP_SCORE = 3000 # The score at which the baddies spawn twice as often as at the start of a game...
+    SPAWN_MAX_RATE_MULTIPLIER = 3 # ...up to this many times as often.
+    SPAWN_BUDGET_PER_STEP = 2 # The maximum number of entities spawned during one step. The other spawns wait for the next steps.
+    MAX_LIVE_BADDIES = 40 # The maximum number of entities of each type alive at the same time. The spawns above it are dropped.
+    MAX_LIVE_PLATFORMS = 20
+    MAX_LIVE_SHIELD_PICKUPS = 2
+
+    # Swarm stress mode. When SWARM_BADDIES_PER_STEP is above 0, that many extra baddies are spawned at each step and
+    # stored in NumPy arrays instead of sprites (it needs NumPy).
+    SWARM_BADDIES_PER_STEP = 0
+    SWARM_CAPACITY = 20000 # The maximum number of baddies in the swarm.
+
+    # Surface cache
+    SURFACE_CACHE_MAX_ENTRIES = 256 # The maximum number of scaled images kept in the shared surface cache.
+
+    # Collisions
+    SPATIAL_HASH_CELL_SIZE = 128 # The size in pixels of the cells of the collision grid.
+    SPATIAL_HASH_MIN_SPRITES = 16 # Groups with fewer sprites than this are tested sprite by sprite without the grid.
+    SPATIAL_HASH_MIN_QUERIES = 16 # Groups tested fewer times than this per update are tested sprite by sprite without the grid.
+
+    # Replays
+    GAME_SEED = None # The seed of the random numbers of the game. None to choose a new one at every start.
+    REPLAY_FILE = None # The file where the inputs of the session are recorded, for example 'last_session.replay'. None to not record them.
+    REPLAY_FLUSH_RUNS = 256 # The recorded runs of inputs are written to the replay file at least once per this number of runs.
+
+    # Telemetry
+    TELEMETRY_DIRECTORY = None # The directory where the telemetry of each session is written (see telemetry.py). None to not record it.
+    TELEMETRY_BUFFER_RECORDS = 65536 # The number of records the ring buffer holds while they wait for the writer thread.
+    TELEMETRY_FLUSH_INTERVAL = 0.5 # The number of seconds between two writes of the writer thread.
+
+    # Vectorized environments
+    VEC_ENV_NEAREST_BADDIES = 4 # The number of baddies (the closest to the player) described in the observations.
+    VEC_ENV_NEAREST_PLATFORMS = 2 # The number of platforms (the closest to the player) described in the observations.
+    VEC_ENV_PIXEL_WIDTH = 80 # The size of the image observations.
+    VEC_ENV_PIXEL_HEIGHT = 45
+
+    # Asset pack
+    ASSET_PACK_FILE = 'assets.pack' # The file holding the images ready to be used. None to load the PNG files at every start.
+
+    # Asset loading
+    ASSET_LOADER_THREADS = 4 # The number of threads decoding the image and sound files.
+    ASSET_LOADER_PROGRESS_INTERVAL = 50 # The number of milliseconds between two updates of the loading progress bar.
+    LOADING_BAR_WIDTH = 400
+    LOADING_BAR_HEIGHT = 12
+    LOADING_BAR_COLOR = (255, 0, 0)
+
+    # Text cache
+    TEXT_CACHE_MAX_ENTRIES = 64 # The maximum number of rendered texts kept in the text cache.
+
+    # Sound effects
+    SOUND_EFFECT_CHANNELS = 8 # The number of mixer channels reserved for the sound effects.
+    SOUND_EFFECT_VOLUME = 0.5
+
+    # Quality governor. When the frames take too long, the quality of the drawing goes down one level at a time, and
+    # it goes back up when there is time left again.
+    QUALITY_GOVERNOR = True # False to always draw at the highest quality.
+    QUALITY_SAMPLE_FRAMES = 30 # The number of frames averaged before deciding to change the quality.
+    QUALITY_STEP_DOWN_LOAD = 0.9 # The quality goes down when the frames use more than this part of the frame budget.
+    QUALITY_STEP_UP_LOAD = 0.6 # The quality goes up when the frames use less than this part of the frame budget...
+    QUALITY_STEP_UP_SAMPLES = 4 # ...for this many samples in a row. It doubles each time a step up had to be undone.
+    QUALITY_MAX_STEP_UP_SAMPLES = 64
+    QUALITY_RENDER_SCALE = 0.5 # The size of the surface the game is drawn on at the lower levels, compared to the window.
+    QUALITY_MERGED_BACKGROUND_LAYERS = 4 # The number of the farthest background layers merged into one at the lower levels.
+    QUALITY_SCALED_IMAGES_MAX_ENTRIES = 512 # The maximum number of images kept scaled to the size of the smaller surface.
+    QUALITY_TEXT_COLOR = (255, 255, 255)
+
+    # Render backend
+    RENDER_BACKEND = 'surface' # 'surface' to draw with software blits, 'texture' to draw with an SDL renderer (see render_backend.py).
+    TEXTURE_RENDERER_SOFTWARE = False # True to use SDL's software renderer with the texture backend (for computers without a graphics card).
+
+    # Profiler overlay (F3 shows it, F4 writes a snapshot of the last seconds)
+    PROFILER_OVERLAY_X = 10
+    PROFILER_OVERLAY_Y = 50
+    PROFILER_GRAPH_LENGTH = 120 # The number of frames shown in the frame time graph.
+    PROFILER_GRAPH_HEIGHT = 60
+    PROFILER_CAPTURE_SECONDS = 10 # The number of seconds covered by a profile snapshot.
+    PROFILER_TEXT_COLOR = (255, 255, 255)
+    PROFILER_GRAPH_COLOR = (0, 255, 0)
+    PROFILER_BUDGET_COLOR = (255, 0, 0)
    
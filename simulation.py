@@ -0,0 +1,264 @@
+# simulation.py
+import pygame
+import random
+from functions import *
+from entity import *
+from spatial_hash import SpatialGroup
+from pools import EntityPool
+from swarm import BaddieSwarm
+from game_events import GameEvents, SPAWN_BADDIE, SPAWN_PLATFORM, SPAWN_SHIELD_PICKUP
+from scheduler import Scheduler
+from spawn_director import Spawner, SpawnDirector
+
+# The state of the player's controls during one step of the simulation. 'left' and 'right' are True as long as
+# the keys are held down, 'jump' and 'attack' are only True at the step where the key was pressed.
+class InputState:
+    def __init__(self, left=False, right=False, jump=False, attack=False):
+        self.left = left
+        self.right = right
+        self.jump = jump
+        self.attack = attack
+
+    # Adds the inputs read during a frame. The held keys are replaced, but a key pressed during a frame without any
+    # step is kept until the next step.
+    def add(self, inputs):
+        self.left = inputs.left
+        self.right = inputs.right
+        self.jump = self.jump or inputs.jump
+        self.attack = self.attack or inputs.attack
+
+    # Forgets the pressed keys once a step used them.
+    def clear_pressed_keys(self):
+        self.jump = False
+        self.attack = False
+
+# The clock of the simulation. The time only moves forward when the simulation steps, so the game runs at the
+# same speed no matter how fast the steps are computed.
+class SimulationClock:
+    def __init__(self, start_time=0):
+        self.time = start_time
+
+    def advance(self, dt):
+        self.time += dt
+
+    def get_ticks(self):
+        return int(self.time)
+
+# Every part of the game that draws random numbers has its own generator, made from the seed of the game and the
+# name of the part. The parts don't share a generator, so adding a random draw in one of them does not change the
+# numbers drawn by the others.
+class RandomStreams:
+    def __init__(self, seed):
+        self.seed = seed
+        self.streams = {}
+
+    def get(self, name):
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = random.Random('%d/%s' % (self.seed, name))
+            self.streams[name] = stream
+        return stream
+
+# Holds everything that happens in the game: the sprite groups, the timed events and the score. It does not
+# read the keyboard nor draw anything, so it can run without a window and as fast as the computer allows.
+# The groups that the player and the spears collide with are SpatialGroups, so the collisions only test the
+# sprites that are close to each other.
+class GameSimulation:
+    # The same seed and the same inputs at every step always give the same game. Without a seed, a random one is
+    # chosen.
+    def __init__(self, assets, clock=None, seed=None):
+        self.assets = assets
+        # The clock can be given by the caller. By default the simulation has its own clock.
+        if clock is None:
+            clock = SimulationClock()
+        self.clock = clock
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.random_streams = RandomStreams(seed)
+        # Can be set to an object whose 'record' method gets the inputs of every step (see replay.py).
+        self.input_recorder = None
+        # When set, each phase of a step is run by 'phase_timer(name, phase)' instead of being called directly, so
+        # that the benchmark can measure the phases of the real steps.
+        self.phase_timer = None
+        # Tells the subscribers (like the sound bank) what happens during the steps.
+        self.events = GameEvents(self)
+        # Runs the timed events of the game, like the spawns and the end of the shield (see scheduler.py).
+        self.scheduler = Scheduler(self.clock.time)
+
+        # The ground is created once and keeps scrolling from one game to the next.
+        self.ground_group = SpatialGroup()
+        ground_image, ground_speed = assets.GROUND_IMAGE_AND_SPEED
+        test_ground = Ground(ground_image, 0, 0, 0)
+        for index in range(0, 6):
+            self.ground_group.add(Ground(ground_image, ground_speed, index * test_ground.draw_width, settings.WINDOW_HEIGHT))
+
+        # The pools keep the killed entities so that they can be reused by the next spawns, and they stay the same
+        # from one game to the next.
+        self.baddie_pool = EntityPool(Baddies, assets.BADDIE_IMAGE, self.random_streams.get('Baddies'))
+        self.platform_pool = EntityPool(Platform, assets.PLATFORM_IMAGE, self.random_streams.get('Platform'))
+        self.shield_pickup_pool = EntityPool(ShieldPickup, assets.SHIELD_PICKUP_IMAGE, self.random_streams.get('ShieldPickup'))
+        self.spear_pool = EntityPool(Spear, assets.SPEAR_IMAGE)
+        self.pools = {
+            'Baddies': self.baddie_pool,
+            'Platform': self.platform_pool,
+            'ShieldPickup': self.shield_pickup_pool,
+            'Spear': self.spear_pool
+        }
+
+        # The baddies spawn more and more often as the score goes up, the platforms at a fixed rate, and the shield
+        # pickups at random times (see spawn_director.py).
+        self.shield_spawn_random = self.random_streams.get('ShieldPickupSpawns')
+        self.spawn_director = SpawnDirector(self, [
+            Spawner(SPAWN_BADDIE, 'baddie_group', self.baddie_pool, settings.MAX_LIVE_BADDIES, self.baddie_spawn_interval),
+            Spawner(SPAWN_PLATFORM, 'platform_group', self.platform_pool, settings.MAX_LIVE_PLATFORMS, settings.ADD_NEW_PLATFORM_RATE * settings.SIMULATION_TIMESTEP),
+            Spawner(SPAWN_SHIELD_PICKUP, 'shield_pickup_group', self.shield_pickup_pool, settings.MAX_LIVE_SHIELD_PICKUPS, self.shield_pickup_spawn_interval)
+        ])
+
+        # The phases of a step, in the order they run. Each phase has a name so that it can be measured separately.
+        self.update_phases = [
+            ('timers', self.run_timers),
+            ('spawn', self.spawn_director.spawn),
+            ('platform_group', self.update_platforms),
+            ('player_group', self.update_player),
+            ('baddie_group', self.update_baddies),
+            ('spear_group', self.update_spears),
+            ('ground_group', self.update_ground),
+            ('shield_effect_group', self.update_shield_effects),
+            ('shield_pickup_group', self.update_shield_pickups)
+        ]
+        # In the swarm stress mode, the extra baddies are stored in arrays and updated all at once.
+        self.swarm_baddies_per_step = settings.SWARM_BADDIES_PER_STEP
+        self.swarm = None
+        if self.swarm_baddies_per_step > 0:
+            self.swarm = BaddieSwarm(assets.BADDIE_IMAGE, seed=self.random_streams.get('Swarm').getrandbits(32))
+            self.update_phases.append(('swarm', self.update_swarm))
+        self.inputs = InputState()
+        self.player_group = None
+        self.reset()
+
+    # Starts a new game.
+    def reset(self):
+        # The entities of the previous game are killed, which puts them back in their pools.
+        if self.player_group is not None:
+            for group in (self.spear_group, self.baddie_group, self.platform_group, self.shield_effect_group, self.shield_pickup_group):
+                for sprite in group.sprites():
+                    sprite.kill()
+        # The events of the previous game (its spawns, the end of its player's shield) are forgotten.
+        self.scheduler.clear()
+        self.player = Player(self.assets.PLAYER_ANIMATIONS, self.events, self.scheduler)
+        self.player_group = pygame.sprite.GroupSingle(self.player)
+        self.spear_group = pygame.sprite.Group()
+        self.baddie_group = SpatialGroup()
+        self.platform_group = SpatialGroup()
+        self.shield_effect_group = pygame.sprite.Group()
+        self.shield_pickup_group = SpatialGroup()
+        if self.swarm is not None:
+            self.swarm.count = 0
+        self.score = 0
+        self.spawn_director.start()
+        self.previous_positions = {}
+
+    @property
+    def game_over(self):
+        return self.player.dead
+
+    # Advances the game by one step of 'dt' milliseconds with the given inputs.
+    def step(self, inputs, dt=None):
+        if dt is None:
+            dt = settings.SIMULATION_TIMESTEP
+        if self.input_recorder is not None:
+            self.input_recorder.record(inputs)
+        self.save_previous_positions()
+        self.clock.advance(dt)
+        self.inputs = inputs
+        self.score += 1
+        phase_timer = self.phase_timer
+        if phase_timer is None:
+            for phase_name, phase in self.update_phases:
+                phase()
+        else:
+            for phase_name, phase in self.update_phases:
+                phase_timer(phase_name, phase)
+
+    # Remembers where every sprite is drawn before the step, so that the renderer can draw the sprites between
+    # their previous and their current position.
+    def save_previous_positions(self):
+        previous_positions = {}
+        for group in (self.player_group, self.ground_group):
+            for sprite in group:
+                previous_positions[sprite] = sprite.full_image_rect.topleft
+        for group in (self.baddie_group, self.platform_group, self.spear_group, self.shield_effect_group, self.shield_pickup_group):
+            for sprite in group:
+                previous_positions[sprite] = sprite.rect.topleft
+        self.previous_positions = previous_positions
+
+    def run_timers(self):
+        self.scheduler.run(self.clock.time)
+
+    # The baddies spawn every 'settings.ADD_NEW_BADDIE_RATE' steps at the start of a game, and more often as the
+    # score goes up: twice as often at a score of 'settings.SPAWN_RAMP_SCORE', up to
+    # 'settings.SPAWN_MAX_RATE_MULTIPLIER' times as often.
+    def baddie_spawn_interval(self, score):
+        rate_multiplier = min(1 + score / settings.SPAWN_RAMP_SCORE, settings.SPAWN_MAX_RATE_MULTIPLIER)
+        return settings.ADD_NEW_BADDIE_RATE * settings.SIMULATION_TIMESTEP / rate_multiplier
+
+    def shield_pickup_spawn_interval(self, score):
+        return self.shield_spawn_random.uniform(settings.SHIELD_PICKUP_SPAWN_RATE_MIN, settings.SHIELD_PICKUP_SPAWN_RATE_MAX)
+
+    # The statistics of every pool, by entity type.
+    def pool_stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def update_platforms(self):
+        self.platform_group.update()
+
+    def update_player(self):
+        self.player_group.update(self.inputs, self.clock.get_ticks(), self.ground_group, self.platform_group, self.spear_group,
+                                 self.spear_pool, self.baddie_group, self.shield_pickup_group, self.shield_effect_group,
+                                 self.assets.SHIELD_EFFECT_IMAGE)
+
+    def update_baddies(self):
+        self.baddie_group.update()
+
+    def update_spears(self):
+        self.spear_group.update(self.baddie_group, self.events)
+
+    def update_ground(self):
+        self.ground_group.update()
+
+    def update_shield_effects(self):
+        self.shield_effect_group.update()
+
+    def update_shield_pickups(self):
+        self.shield_pickup_group.update()
+
+    def update_swarm(self):
+        self.swarm.spawn(self.swarm_baddies_per_step)
+        self.swarm.update()
+        self.swarm.collide(self.spear_group, self.player)
+
+# Runs the simulation without a window, with random inputs, and tells how many steps per second it reaches.
+# python simulation.py [number of steps]
+if __name__ == '__main__':
+    import os
+    import sys
+    import time
+    from assets import GameAssets
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    number_of_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    random.seed(0)
+    simulation = GameSimulation(GameAssets(), seed=0)
+    games = 1
+    start_time = time.perf_counter()
+    for _ in range(number_of_steps):
+        inputs = InputState(random.random() < 0.3, random.random() < 0.5, random.random() < 0.05, random.random() < 0.05)
+        simulation.step(inputs)
+        if simulation.game_over:
+            simulation.reset()
+            games += 1
+    elapsed_time = time.perf_counter() - start_time
+    print('%d steps (%d games) in %.2f s: %d steps per second' % (number_of_steps, games, elapsed_time, number_of_steps / elapsed_time))
+    for name, stats in simulation.pool_stats().items():
+        print('%s pool: %d created, %d reused, high-water mark %d' % (name, stats['created'], stats['reused'], stats['high_water_mark']))
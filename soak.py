@@ -0,0 +1,286 @@
+# soak.py
+# Plays the game without a window for a very long time, restarting it like main.py does, and watches the memory of
+# the process. A leak (an entity kept alive by a reference that should be gone, a cache that never stops growing)
+# is too slow to be seen in a normal game, but after millions of frames it shows up as a number that never stops
+# growing. The numbers are sampled at regular intervals, and the ones that grew at (almost) every sample are
+# reported, with the places in the code where the memory that grew was allocated.
+#
+# python soak.py                         -> plays 1 000 000 frames and reports what grew
+# python soak.py --frames 5000000 --render --output soak.json
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import pygame
+from functions import *
+from simulation import InputState
+
+# The sprite classes whose live objects are counted. A leaked entity shows up as a count that keeps growing.
+COUNTED_CLASSES = ('Player', 'Baddies', 'Platform', 'Spear', 'ShieldPickup', 'ShieldEffect', 'Ground')
+# The sprite groups of the simulation whose sizes are sampled.
+SAMPLED_GROUPS = ('baddie_group', 'platform_group', 'spear_group', 'ground_group', 'shield_effect_group', 'shield_pickup_group')
+# The allocation sites that grew by less than this number of bytes are not reported.
+MIN_SITE_GROWTH = 16 * 1024
+# The resident memory that grew by less than this number of kilobytes is not reported (the allocator of the process
+# keeps some memory it gets back, so the resident memory moves by a few hundred kilobytes without any leak).
+MIN_RSS_GROWTH_KB = 2048
+# The group of the simulation holding the entities of each pool.
+POOL_GROUPS = {'Baddies': 'baddie_group', 'Platform': 'platform_group', 'ShieldPickup': 'shield_pickup_group', 'Spear': 'spear_group'}
+# The metrics sampled for the report but not checked for growth. The pools keep the entities they created, so the
+# free lists of the pools and the numbers of pooled entities grow until the pools reach their high-water mark, which
+# is how the pools are meant to work. A pool that leaks shows up in 'pools_lost' instead.
+UNCHECKED_METRICS = ('frame', 'seconds', 'games', 'gc_counts', 'gc_collections', 'pools_free') + tuple('instances.' + name for name in POOL_GROUPS)
+# The number of allocation sites shown in the report.
+REPORTED_SITES = 10
+
+# Plays like a careless player: runs around, jumps over the baddies coming at it and throws spears at them. It
+# loses games regularly, so the soak test goes through many restarts.
+class SoakBot:
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.direction = 0
+
+    def play(self, simulation):
+        if self.random.random() < 0.02:
+            self.direction = self.random.choice((-1, 0, 1, 1))
+        player = simulation.player.rect
+        jump = False
+        attack = False
+        for baddie in simulation.baddie_group:
+            if abs(baddie.rect.centerx - player.centerx) < 150 and abs(baddie.rect.centery - player.centery) < 100:
+                jump = self.random.random() < 0.3
+                attack = self.random.random() < 0.3
+                break
+        return InputState(self.direction == -1, self.direction == 1, jump or self.random.random() < 0.01, attack or self.random.random() < 0.02)
+
+# The resident memory of the process in kilobytes, read from /proc/self/statm. None where it does not exist.
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+# Counts the live objects of the counted classes and of all types, in one pass over the objects the GC follows.
+def count_objects():
+    counts = dict.fromkeys(COUNTED_CLASSES, 0)
+    objects = gc.get_objects()
+    for obj in objects:
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts, len(objects)
+
+# True when the values grew from the first to the last, never went down, and went up between at least half of
+# the samples. Numbers that go up and down with the game (like the number of baddies) are not reported, and neither
+# are the ones that grew once and then stayed the same (like a cache filled at the start).
+def grows_monotonically(values):
+    if len(values) < 3 or values[-1] <= values[0]:
+        return False
+    increases = 0
+    for previous, value in zip(values, values[1:]):
+        if value < previous:
+            return False
+        if value > previous:
+            increases += 1
+    return increases * 2 >= len(values) - 1
+
+def metric_grows(name, values):
+    if name == 'rss_kb' and values[-1] - values[0] < MIN_RSS_GROWTH_KB:
+        return False
+    return grows_monotonically(values)
+
+class SoakTest:
+    def __init__(self, number_of_frames, sample_interval, seed, max_game_frames, warmup_samples, trace_frames, render):
+        self.number_of_frames = number_of_frames
+        self.sample_interval = sample_interval
+        self.seed = seed
+        self.max_game_frames = max_game_frames
+        self.warmup_samples = warmup_samples
+        self.trace_frames = trace_frames
+        self.render = render
+        self.samples = []
+        # The memory allocated at each allocation site, at each sample, when tracemalloc is on. The sites are
+        # stored as tuples of (file name, line number), and the samples only hold numbers, strings and tuples, so
+        # that the garbage collector stops tracking them and the harness does not count its own samples.
+        self.site_sizes = []
+        # The tracebacks of the sites of the last sample, to show them in the report.
+        self.site_tracebacks = {}
+        self.games = 0
+
+    def setup(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        from assets import GameAssets
+        from simulation import GameSimulation
+        from renderer import GameRenderer
+        pygame.init()
+        window_surface = pygame.display.set_mode((settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT))
+        assets = GameAssets()
+        self.simulation = GameSimulation(assets, seed=self.seed)
+        self.renderer = None
+        if self.render:
+            self.renderer = GameRenderer(window_surface, assets, text_cache.get_font(None, 48))
+        self.bot = SoakBot(self.seed)
+
+    def run(self):
+        self.setup()
+        # tracemalloc starts after the assets are loaded, so that only the memory allocated by the game is traced.
+        if self.trace_frames > 0:
+            tracemalloc.start(self.trace_frames)
+        simulation = self.simulation
+        renderer = self.renderer
+        game_frames = 0
+        start_time = time.perf_counter()
+        self.sample(0, start_time)
+        for frame in range(1, self.number_of_frames + 1):
+            event_dispatcher.poll()
+            simulation.step(self.bot.play(simulation))
+            if renderer is not None:
+                renderer.update()
+                renderer.draw(simulation)
+            game_frames += 1
+            # A new game starts when the player dies, or when the game lasts too long (like a player who quits),
+            # so that the soak test always goes through many restarts.
+            if simulation.game_over or game_frames >= self.max_game_frames:
+                simulation.reset()
+                self.games += 1
+                game_frames = 0
+            if frame % self.sample_interval == 0:
+                self.sample(frame, start_time)
+        if self.trace_frames > 0:
+            tracemalloc.stop()
+        return self.create_report(time.perf_counter() - start_time)
+
+    def sample(self, frame, start_time):
+        # The objects only kept alive by reference cycles are collected first, so they are not taken for leaks.
+        gc.collect()
+        class_counts, gc_objects = count_objects()
+        sample = {
+            'frame': frame,
+            'seconds': time.perf_counter() - start_time,
+            'games': self.games,
+            'rss_kb': resident_memory(),
+            'gc_objects': gc_objects,
+            'gc_counts': gc.get_count(),
+            'gc_collections': tuple(stats['collections'] for stats in gc.get_stats()),
+            'instances': class_counts,
+            'groups': {name: len(getattr(self.simulation, name)) for name in SAMPLED_GROUPS},
+            'pools_free': {name: stats['free'] for name, stats in self.simulation.pool_stats().items()},
+            'pools_lost': self.lost_pooled_entities()
+        }
+        if self.trace_frames > 0:
+            # The memory allocated by the harness itself is left out.
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<unknown>')
+            ))
+            statistics = snapshot.statistics('traceback')
+            sample['traced_kb'] = sum(stat.size for stat in statistics) // 1024
+            self.site_tracebacks = {tuple((frame.filename, frame.lineno) for frame in stat.traceback): stat.traceback for stat in statistics}
+            self.site_sizes.append(dict(zip(self.site_tracebacks, ((stat.size, stat.count) for stat in statistics))))
+        self.samples.append(sample)
+
+    # The number of entities of each pool that are in use but in none of the groups of the simulation: entities
+    # dropped without being killed, which never go back to their pool.
+    def lost_pooled_entities(self):
+        lost = {}
+        for name, pool in self.simulation.pools.items():
+            group = getattr(self.simulation, POOL_GROUPS[name])
+            lost[name] = pool.in_use - sum(1 for sprite in group if sprite.pool is pool)
+        return lost
+
+    # The metrics of every sample after the warmup, by name. The metrics of the dicts are named 'dict.key'.
+    def series(self):
+        samples = self.samples[self.warmup_samples:]
+        metrics = {}
+        for sample in samples:
+            for name, value in sample.items():
+                if name in UNCHECKED_METRICS or value is None:
+                    continue
+                if isinstance(value, dict):
+                    for key, item in value.items():
+                        metric_name = '%s.%s' % (name, key)
+                        if metric_name not in UNCHECKED_METRICS:
+                            metrics.setdefault(metric_name, []).append(item)
+                else:
+                    metrics.setdefault(name, []).append(value)
+        return metrics
+
+    # The allocation sites whose memory grew at (almost) every sample after the warmup, from the one that grew the
+    # most. Each one is (site, growth in bytes, growth in number of blocks).
+    def growing_sites(self):
+        site_sizes = self.site_sizes[self.warmup_samples:]
+        if len(site_sizes) < 3:
+            return []
+        sites = []
+        for site in site_sizes[-1]:
+            sizes = [sizes.get(site, (0, 0))[0] for sizes in site_sizes]
+            if sizes[-1] - sizes[0] >= MIN_SITE_GROWTH and grows_monotonically(sizes):
+                counts = [sizes.get(site, (0, 0))[1] for sizes in site_sizes]
+                sites.append((site, sizes[-1] - sizes[0], counts[-1] - counts[0]))
+        sites.sort(key=lambda site: site[1], reverse=True)
+        return sites[:REPORTED_SITES]
+
+    def create_report(self, elapsed_time):
+        metrics = self.series()
+        return {
+            'frames': self.number_of_frames,
+            'seed': self.seed,
+            'games': self.games,
+            'seconds': elapsed_time,
+            'samples': self.samples,
+            'growing_metrics': {name: [values[0], values[-1]] for name, values in metrics.items() if metric_grows(name, values)},
+            'growing_sites': [{'traceback': self.site_tracebacks[site].format(), 'size_bytes': size, 'blocks': blocks}
+                              for site, size, blocks in self.growing_sites()]
+        }
+
+def print_report(report):
+    print('%d frames, %d games, %.0f s (%.0f frames per second), seed %d' % (
+        report['frames'], report['games'], report['seconds'], report['frames'] / report['seconds'], report['seed']))
+    first, last = report['samples'][0], report['samples'][-1]
+    print('%-10s %10s %10s %12s %10s %s' % ('frame', 'games', 'rss_kb', 'traced_kb', 'objects', 'instances'))
+    for sample in report['samples']:
+        print('%-10d %10d %10s %12s %10d %s' % (sample['frame'], sample['games'], sample['rss_kb'], sample.get('traced_kb', '-'),
+                                               sample['gc_objects'], ' '.join('%s=%d' % item for item in sample['instances'].items() if item[1])))
+    print('gc collections (gen 0, 1, 2): %s' % [after - before for before, after in zip(first['gc_collections'], last['gc_collections'])])
+    for name, (start, end) in report['growing_metrics'].items():
+        print('GROWTH %s: %s -> %s' % (name, start, end))
+    for site in report['growing_sites']:
+        print('GROWTH of +%.1f KB in %d blocks allocated at:' % (site['size_bytes'] / 1024, site['blocks']))
+        for line in site['traceback']:
+            print('  ' + line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test of the game: plays for a long time and reports the memory that keeps growing.')
+    parser.add_argument('--frames', type=int, default=1000000, help='number of frames played')
+    parser.add_argument('--sample-interval', type=int, default=20000, help='number of frames between two samples')
+    parser.add_argument('--warmup-samples', type=int, default=2, help='number of samples ignored at the start, while the caches fill up')
+    parser.add_argument('--max-game-frames', type=int, default=10000, help='a new game starts after this many frames even if the player is alive')
+    parser.add_argument('--seed', type=int, default=1234, help='seed of the game and of the bot')
+    parser.add_argument('--trace-frames', type=int, default=4, help='number of stack frames kept by tracemalloc (0 turns it off)')
+    parser.add_argument('--render', action='store_true', help='also draw every frame, on a hidden window')
+    parser.add_argument('--output', help='also write the samples and the results to this JSON file')
+    arguments = parser.parse_args()
+
+    report = SoakTest(arguments.frames, arguments.sample_interval, arguments.seed, arguments.max_game_frames,
+                      arguments.warmup_samples, arguments.trace_frames, arguments.render).run()
+    print_report(report)
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    if report['growing_metrics'] or report['growing_sites']:
+        print('GROWTH FOUND')
+        return 1
+    print('no growth found')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
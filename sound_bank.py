@@ -0,0 +1,75 @@
+# sound_bank.py
+import pygame
+from functions import *
+
+# The priority of each sound effect and the minimum number of milliseconds between two plays of it. When every
+# channel is busy, a sound only takes the channel of a sound with a lower priority. A sound played again before its
+# minimum interval is skipped, so that a burst of kills plays one sound instead of ten.
+SOUND_EFFECTS = {
+    'DEATH': (3, 0),
+    'HIT': (3, 100),
+    'SHIELD_BREAK': (3, 100),
+    'SHIELD': (2, 200),
+    'PICKUP': (2, 100),
+    'BUTTON': (2, 100),
+    'ENEMY_ATTACK': (1, 150),
+    'KILL': (1, 80),
+    'ATTACK': (1, 100),
+    'JUMP': (0, 100)
+}
+
+# Plays the sound effects on a pool of mixer channels reserved for them. The sounds are decoded once when the
+# assets are loaded, so playing one only hands it to a channel. The other sounds (like the game over sound) play
+# on the channels that are not reserved, so the sound effects never cut them.
+class SoundBank:
+    def __init__(self, sounds):
+        self.sounds = {name: sounds[name] for name in SOUND_EFFECTS if name in sounds}
+        self.channels = []
+        # For each channel, the priority of the sound it is playing.
+        self.channel_priorities = []
+        self.last_play_times = {}
+        # The number of sounds skipped because of the rate limit or because no channel was free.
+        self.skipped = 0
+        if not pygame.mixer.get_init():
+            return
+        number_of_channels = settings.SOUND_EFFECT_CHANNELS
+        # The channels after the reserved ones are left for Sound.play.
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), number_of_channels + 2))
+        pygame.mixer.set_reserved(number_of_channels)
+        self.channels = [pygame.mixer.Channel(index) for index in range(number_of_channels)]
+        self.channel_priorities = [0] * number_of_channels
+        for sound in self.sounds.values():
+            sound.set_volume(settings.SOUND_EFFECT_VOLUME)
+
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is None or not self.channels:
+            return
+        priority, minimum_interval = SOUND_EFFECTS[name]
+        now = pygame.time.get_ticks()
+        last_play_time = self.last_play_times.get(name)
+        if last_play_time is not None and now - last_play_time < minimum_interval:
+            self.skipped += 1
+            return
+        index = self.find_channel(priority)
+        if index is None:
+            self.skipped += 1
+            return
+        self.channels[index].play(sound)
+        self.channel_priorities[index] = priority
+        self.last_play_times[name] = now
+
+    # Returns the index of a free channel or, when they are all busy, of the channel playing the sound with the
+    # lowest priority below 'priority'. Returns None when no channel can be used.
+    def find_channel(self, priority):
+        lowest_index = None
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+            if self.channel_priorities[index] < priority and (lowest_index is None or self.channel_priorities[index] < self.channel_priorities[lowest_index]):
+                lowest_index = index
+        return lowest_index
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
@@ -0,0 +1,118 @@
+# spatial_hash.py
+import pygame
+from functions import *
+
+# Counts the collision tests done by the game. 'queries' is the number of calls to spritecollide and 'checks' is
+# the number of sprites that had to be tested one by one.
+class CollisionStats:
+    def __init__(self):
+        self.queries = 0
+        self.checks = 0
+
+collision_stats = CollisionStats()
+
+# A sprite group that also sorts its sprites in a uniform grid. To find the sprites touching a rectangle we only
+# have to look at the sprites in the cells covered by the rectangle, instead of looking at every sprite of the group.
+# The grid is rebuilt the first time it is used after the sprites moved, so at most once per update of the group.
+# Building the grid costs about as much as testing every sprite 20 times, so the grid is only used when the group
+# was tested enough times since its previous update (for example by a lot of spears). Otherwise every sprite is
+# tested like pygame.sprite.spritecollide does. Both ways give exactly the same result.
+class SpatialGroup(pygame.sprite.Group):
+    def __init__(self, *sprites, cell_size=None):
+        if cell_size is None:
+            cell_size = settings.SPATIAL_HASH_CELL_SIZE
+        self.cell_size = cell_size
+        # Each cell (column, row) holds the list of the (index, sprite) touching it. The index is the position of the
+        # sprite in the group, it is used to give the results in the same order as pygame.sprite.spritecollide.
+        self.cells = {}
+        self.needs_rebuild = True
+        # The number of collision tests done since the last update, and during the update before it.
+        self.queries = 0
+        self.expected_queries = 0
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.needs_rebuild = True
+
+    # The sprites of the group only move when the group is updated.
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.needs_rebuild = True
+        self.expected_queries = self.queries
+        self.queries = 0
+
+    def rebuild(self):
+        cells = {}
+        cell_size = self.cell_size
+        for index, sprite in enumerate(self.spritedict):
+            rect = sprite.rect
+            entry = (index, sprite)
+            first_column = rect.left // cell_size
+            last_column = (rect.right - 1) // cell_size
+            first_row = rect.top // cell_size
+            last_row = (rect.bottom - 1) // cell_size
+            # Most sprites are smaller than a cell and only touch one cell.
+            if first_column == last_column and first_row == last_row:
+                cell = cells.get((first_column, first_row))
+                if cell is None:
+                    cells[(first_column, first_row)] = [entry]
+                else:
+                    cell.append(entry)
+                continue
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    cell = cells.get((column, row))
+                    if cell is None:
+                        cells[(column, row)] = [entry]
+                    else:
+                        cell.append(entry)
+        self.cells = cells
+        self.needs_rebuild = False
+
+    # Returns the sprites of the group that may touch the rectangle, in the order of the group.
+    def candidates(self, rect):
+        if self.needs_rebuild:
+            self.rebuild()
+        cells = self.cells
+        cell_size = self.cell_size
+        found = []
+        for column in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1):
+            for row in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                cell = cells.get((column, row))
+                if cell is not None:
+                    found += cell
+        # A sprite touching several cells is found several times. It may also have been removed from the group
+        # since the grid was built.
+        if len(found) > 1:
+            found = sorted(set(found), key=lambda entry: entry[0])
+        spritedict = self.spritedict
+        return [sprite for index, sprite in found if sprite in spritedict]
+
+    # Gives the same result as pygame.sprite.spritecollide(sprite, self, dokill, collided).
+    def spritecollide(self, sprite, dokill, collided=None):
+        collision_stats.queries += 1
+        self.queries += 1
+        # With only a few sprites or a few tests, testing all of the sprites is faster than building the grid.
+        if len(self.spritedict) < settings.SPATIAL_HASH_MIN_SPRITES or self.expected_queries < settings.SPATIAL_HASH_MIN_QUERIES:
+            candidates = self.sprites()
+        else:
+            candidates = self.candidates(sprite.rect)
+        collision_stats.checks += len(candidates)
+        if collided is None:
+            rect = sprite.rect
+            touched = [candidate for candidate in candidates if rect.colliderect(candidate.rect)]
+        else:
+            touched = [candidate for candidate in candidates if collided(sprite, candidate)]
+        if dokill:
+            for touched_sprite in touched:
+                touched_sprite.kill()
+        return touched
+
+# Finds the sprites of the group touching the sprite. It uses the grid when the group is a SpatialGroup.
+def spritecollide(sprite, group, dokill, collided=None):
+    if isinstance(group, SpatialGroup):
+        return group.spritecollide(sprite, dokill, collided)
+    collision_stats.queries += 1
+    collision_stats.checks += len(group)
+    return pygame.sprite.spritecollide(sprite, group, dokill, collided)
@@ -0,0 +1,67 @@
+# spawn_director.py
+from functions import *
+
+# One type of entity spawned by the SpawnDirector. 'group_name' is the group of the simulation the entities are
+# added to, 'pool' the EntityPool they come from, 'cap' the maximum number of them alive at the same time and
+# 'event' the name of the event emitted at each spawn.
+# 'interval' is the number of milliseconds between two spawns: either a number, for a fixed rate, or a function
+# of the score returning the time until the next spawn, for a rate that changes during the game.
+class Spawner:
+    def __init__(self, event, group_name, pool, cap, interval):
+        self.event = event
+        self.group_name = group_name
+        self.pool = pool
+        self.cap = cap
+        self.interval = interval
+
+# Decides when the entities spawn. Each spawner asks for a spawn through the scheduler of the simulation when its
+# time comes, and the spawns asked for are done during the 'spawn' phase of the step:
+# - a spawn is dropped when its group already has 'cap' entities, so the number of entities (and the time spent
+#   updating and drawing them) stays bounded however fast the rates ramp up,
+# - at most 'settings.SPAWN_BUDGET_PER_STEP' entities are spawned during one step. The other spawns wait for the
+#   next steps, so that a burst of spawns is spread over several steps.
+class SpawnDirector:
+    def __init__(self, simulation, spawners):
+        self.simulation = simulation
+        self.spawners = spawners
+        # The spawners whose spawn is due, in the order they asked.
+        self.pending = []
+        # The number of entities spawned, and of spawns dropped because of the caps.
+        self.spawned = 0
+        self.capped = 0
+
+    # Schedules the first spawn of every spawner. The scheduler must have been cleared before.
+    def start(self):
+        self.pending = []
+        for spawner in self.spawners:
+            if callable(spawner.interval):
+                self.simulation.scheduler.schedule(spawner.interval(self.simulation.score), self.request, spawner)
+            else:
+                self.simulation.scheduler.schedule_every(spawner.interval, self.request, spawner)
+
+    # Called by the scheduler when a spawner's time comes. A spawner whose rate changes schedules its next spawn
+    # with the score of now.
+    def request(self, spawner):
+        self.pending.append(spawner)
+        if callable(spawner.interval):
+            self.simulation.scheduler.schedule(spawner.interval(self.simulation.score), self.request, spawner)
+
+    # The 'spawn' phase of the simulation.
+    def spawn(self):
+        if not self.pending:
+            return
+        simulation = self.simulation
+        budget = settings.SPAWN_BUDGET_PER_STEP
+        waiting = []
+        for spawner in self.pending:
+            group = getattr(simulation, spawner.group_name)
+            if len(group) >= spawner.cap:
+                self.capped += 1
+            elif budget == 0:
+                waiting.append(spawner)
+            else:
+                group.add(spawner.pool.acquire())
+                simulation.events.emit(spawner.event)
+                self.spawned += 1
+                budget -= 1
+        self.pending = waiting
@@ -0,0 +1,73 @@
+# surface_cache.py
+import pygame
+from collections import OrderedDict
+from functions import *
+
+class SurfaceCache:
+    def __init__(self, max_entries):
+        # The cache stores the scaled (and possibly flipped) images. The key is made of the source image, the
+        # target size and the flips. An OrderedDict keeps the entries from the least recently used to the most
+        # recently used one, so when the cache is full we remove the first entry.
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        # The pinned images are never evicted (see 'pin'). They are kept apart from the least recently used ones.
+        self.pinned = {}
+        # Counters that tell us how useful the cache is.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_scaled(self, image, size, flip_x=False, flip_y=False):
+        # The key holds a reference to the source image, which keeps it alive as long as its scaled
+        # images are in the cache.
+        key = (image, size[0], size[1], flip_x, flip_y)
+        scaled_image = self.pinned.get(key)
+        if scaled_image is not None:
+            self.hits += 1
+            return scaled_image
+        scaled_image = self.entries.get(key)
+        if scaled_image is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return scaled_image
+
+        self.misses += 1
+        if image.get_size() == tuple(size):
+            scaled_image = image
+        else:
+            scaled_image = pygame.transform.scale(image, size)
+        if flip_x or flip_y:
+            scaled_image = pygame.transform.flip(scaled_image, flip_x, flip_y)
+        self.entries[key] = scaled_image
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return scaled_image
+
+    # Scales the image to every size in advance, so that the first entities of each size don't have to wait.
+    def prewarm(self, image, sizes):
+        for size in sizes:
+            self.get_scaled(image, size)
+
+    # Scales the image like 'get_scaled' and keeps the scaled image in the cache for good. The images of the
+    # entities are pinned, so that they stay the same surfaces for the whole game and their collision masks (see
+    # masks.py) never have to be computed again.
+    def pin(self, image, size, flip_x=False, flip_y=False):
+        scaled_image = self.get_scaled(image, size, flip_x, flip_y)
+        key = (image, size[0], size[1], flip_x, flip_y)
+        self.entries.pop(key, None)
+        self.pinned[key] = scaled_image
+        return scaled_image
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+    # The pinned images stay.
+    def clear(self):
+        self.entries.clear()
+
+# The cache shared by all of the entities. The images it returns are shared, so they must never be modified.
+surface_cache = SurfaceCache(settings.SURFACE_CACHE_MAX_ENTRIES)
@@ -0,0 +1,138 @@
+# swarm.py
+# An optional way of storing baddies for the stress modes with thousands of enemies. Instead of one sprite per
+# baddie, the baddies are stored as columns of NumPy arrays (x, y, w, h, speed, alive) and every baddie is moved,
+# removed or tested for collisions with a single operation on the arrays.
+import random
+from functions import *
+from surface_cache import surface_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ArrayEntityStore:
+    def __init__(self, capacity):
+        if numpy is None:
+            raise ImportError('The array entity store needs NumPy (pip install numpy).')
+        self.capacity = capacity
+        # The entities are always packed at the start of the arrays, 'count' is the number of entities stored.
+        self.count = 0
+        self.x = numpy.zeros(capacity, dtype=numpy.int32)
+        self.y = numpy.zeros(capacity, dtype=numpy.int32)
+        self.w = numpy.zeros(capacity, dtype=numpy.int32)
+        self.h = numpy.zeros(capacity, dtype=numpy.int32)
+        self.speed = numpy.zeros(capacity, dtype=numpy.int32)
+        self.alive = numpy.zeros(capacity, dtype=bool)
+        self.columns = (self.x, self.y, self.w, self.h, self.speed, self.alive)
+
+    def __len__(self):
+        return self.count
+
+    # Adds entities at the end of the arrays. Entities that don't fit in the store are not added.
+    def add(self, x, y, w, h, speed):
+        number = min(len(x), self.capacity - self.count)
+        start = self.count
+        end = start + number
+        self.x[start:end] = x[:number]
+        self.y[start:end] = y[:number]
+        self.w[start:end] = w[:number]
+        self.h[start:end] = h[:number]
+        self.speed[start:end] = speed[:number]
+        self.alive[start:end] = True
+        self.count = end
+
+    # Removes the dead entities by moving the alive ones to the start of the arrays.
+    def compact(self):
+        count = self.count
+        keep = self.alive[:count]
+        kept = int(numpy.count_nonzero(keep))
+        if kept == count:
+            return
+        for column in self.columns:
+            column[:kept] = column[:count][keep]
+        self.alive[kept:count] = False
+        self.count = kept
+
+    # Tests every entity against every rectangle of 'rects' (an array of (x, y, w, h) rows) at once. Returns a
+    # matrix of booleans with one row per rectangle and one column per entity.
+    def overlaps(self, rects):
+        count = self.count
+        rect_x = rects[:, 0:1]
+        rect_y = rects[:, 1:2]
+        rect_w = rects[:, 2:3]
+        rect_h = rects[:, 3:4]
+        x = self.x[:count]
+        y = self.y[:count]
+        # Same test as pygame.Rect.colliderect.
+        return ((x < rect_x + rect_w) & (x + self.w[:count] > rect_x) &
+                (y < rect_y + rect_h) & (y + self.h[:count] > rect_y) & self.alive[:count])
+
+class BaddieSwarm(ArrayEntityStore):
+    def __init__(self, BADDIE_IMAGE, capacity=None, seed=None):
+        if capacity is None:
+            capacity = settings.SWARM_CAPACITY
+        super().__init__(capacity)
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.random_generator = numpy.random.default_rng(seed)
+        # The baddie image at every possible size, indexed by the size.
+        self.images = [None] * (settings.BADDIE_MAX_SIZE + 1)
+        for size in range(settings.BADDIE_MIN_SIZE, settings.BADDIE_MAX_SIZE + 1):
+            self.images[size] = surface_cache.get_scaled(BADDIE_IMAGE, (size, size))
+        self.killed = 0
+
+    # Spawns 'number' baddies on the right of the screen, with the same random ranges as the Baddies class.
+    def spawn(self, number):
+        generator = self.random_generator
+        size = generator.integers(settings.BADDIE_MIN_SIZE, settings.BADDIE_MAX_SIZE + 1, number)
+        bottom = generator.integers(0, settings.WINDOW_HEIGHT - size + 1)
+        speed = generator.integers(settings.BADDIE_MIN_SPEED, settings.BADDIE_MAX_SPEED + 1, number)
+        x = numpy.full(number, settings.WINDOW_WIDTH)
+        self.add(x, bottom - size, size, size, speed)
+
+    def update(self):
+        count = self.count
+        # Every baddie moves to the left, and the ones that left the screen are removed.
+        self.x[:count] -= self.speed[:count]
+        self.alive[:count] &= self.x[:count] + self.w[:count] >= 0
+        self.compact()
+
+    # Tests the sprites against every baddie and returns the list of the sprites that touched a baddie.
+    # When 'dokill' is True the baddies touched are removed.
+    def collide_sprites(self, sprites, dokill):
+        if not sprites or self.count == 0:
+            return []
+        rects = numpy.array([tuple(sprite.rect) for sprite in sprites], dtype=numpy.int32)
+        touched = self.overlaps(rects)
+        if dokill:
+            killed = touched.any(axis=0)
+            self.killed += int(numpy.count_nonzero(killed))
+            self.alive[:self.count] &= ~killed
+        return [sprites[index] for index in numpy.flatnonzero(touched.any(axis=1))]
+
+    # The spears kill the baddies they touch and disappear, and the player takes damage from the baddies he touches.
+    def collide(self, spear_group, player):
+        for spear in self.collide_sprites(spear_group.sprites(), True):
+            spear.kill()
+        if self.collide_sprites([player], True):
+            player.take_damage()
+        self.compact()
+
+    # Returns the (image, position) commands drawing every baddie, for Surface.blits or a RenderQueue. When the game
+    # is drawn on a smaller surface, 'scale' is the size of that surface compared to the window and 'images' holds
+    # the baddie images scaled the same way.
+    def commands(self, scale=1, images=None):
+        count = self.count
+        if images is None:
+            images = self.images
+        x = self.x[:count]
+        y = self.y[:count]
+        if scale != 1:
+            x = x * scale
+            y = y * scale
+        return [(images[size], (x, y)) for size, x, y in zip(self.w[:count].tolist(), x.tolist(), y.tolist())]
+
+    # Draws every baddie with a single call to Surface.blits.
+    def draw(self, surface, scale=1, images=None):
+        surface.blits(self.commands(scale, images), doreturn=False)
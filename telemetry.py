@@ -0,0 +1,202 @@
+# telemetry.py
+# Records what happens during a session (the spawns, kills, hits, shields, deaths and scores, and the number of
+# entities at each frame) in a file, for balancing the game and for knowing how many entities it has to handle.
+#
+# The game never writes the file itself. The records are packed into a ring buffer allocated once, and a writer
+# thread copies what was added to the buffer into the file a few times per second. When the writer cannot keep up
+# and the buffer is full, the new records are dropped (and counted) instead of making the game wait.
+#
+# Format of a telemetry file:
+# - a header: the magic bytes, the version of the format, the seed of the simulation and the time the session
+#   started (seconds since 1970),
+# - the records, each one made of the time of the simulation in milliseconds, the code of the record, a detail
+#   (the entity group of the ENTITIES records) and a value (the score for the events of the game, the number of
+#   entities for the ENTITIES records, the number of dropped records for the DROPPED record).
+import os
+import struct
+import threading
+import time
+from collections import Counter
+from functions import *
+from game_events import *
+
+TELEMETRY_MAGIC = b'DODGETEL'
+TELEMETRY_VERSION = 1
+HEADER = struct.Struct('<8sBQd')
+RECORD = struct.Struct('<IHHi')
+
+# The codes of the records. The events of the game keep their names from game_events.py.
+RECORD_NAMES = (JUMP, ATTACK, KILL, ENEMY_ATTACK, HIT, DEATH, SHIELD_BREAK, PICKUP, SHIELD,
+                SPAWN_BADDIE, SPAWN_PLATFORM, SPAWN_SHIELD_PICKUP, 'FRAME', 'ENTITIES', 'DROPPED')
+RECORD_CODES = {name: code for code, name in enumerate(RECORD_NAMES)}
+FRAME = RECORD_CODES['FRAME']
+ENTITIES = RECORD_CODES['ENTITIES']
+DROPPED = RECORD_CODES['DROPPED']
+# The groups counted by the ENTITIES records, in the order of their detail.
+ENTITY_GROUPS = ('baddie_group', 'platform_group', 'spear_group', 'shield_effect_group', 'shield_pickup_group', 'swarm')
+
+# Records the telemetry of a simulation in a file. It is subscribed to the events of the simulation, and the game
+# loop calls 'record_frame' once per frame with the simulation or the snapshot it drew.
+class TelemetryLog:
+    def __init__(self, path, simulation, capacity=None):
+        if capacity is None:
+            capacity = settings.TELEMETRY_BUFFER_RECORDS
+        self.path = path
+        self.simulation = simulation
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        # 'head' is the number of records added to the buffer and 'tail' the number of records written to the file.
+        # The records between them are waiting for the writer.
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        # The records may be added from several threads (the events of a pipelined simulation are recorded on the
+        # main thread, when their frame is drawn). The writer never takes the lock.
+        self.lock = threading.Lock()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, simulation.seed, time.time()))
+        self.closing = False
+        self.wake_up = threading.Event()
+        self.writer = threading.Thread(target=self.write_records, name='telemetry', daemon=True)
+        self.writer.start()
+        simulation.events.subscribe(self.record_event)
+
+    # Creates the log of a new session in 'directory', in a file named after the date and the seed.
+    @classmethod
+    def for_session(cls, directory, simulation):
+        os.makedirs(directory, exist_ok=True)
+        file_name = 'session_%s_%d.telemetry' % (time.strftime('%Y%m%d_%H%M%S'), simulation.seed)
+        return cls(os.path.join(directory, file_name), simulation)
+
+    # 'ticks' is the time of the simulation the record belongs to.
+    def record(self, code, detail, value, ticks):
+        with self.lock:
+            head = self.head
+            if head - self.tail >= self.capacity:
+                self.dropped += 1
+                return
+            RECORD.pack_into(self.buffer, head % self.capacity * RECORD.size, ticks, code, detail, value)
+            self.head = head + 1
+            # The writer is woken up early when the buffer is half full.
+            if head - self.tail == self.capacity // 2:
+                self.wake_up.set()
+
+    # The time and the score are the ones of the moment the event was emitted (see game_events.py).
+    def record_event(self, name):
+        events = self.simulation.events
+        self.record(RECORD_CODES[name], 0, events.score, events.time)
+
+    # Records the score and the number of entities of each group. 'frame' is the simulation or the snapshot drawn.
+    def record_frame(self, frame):
+        ticks = frame.clock.get_ticks()
+        self.record(FRAME, 0, frame.score, ticks)
+        for detail, name in enumerate(ENTITY_GROUPS):
+            group = getattr(frame, name)
+            if group is not None:
+                self.record(ENTITIES, detail, len(group), ticks)
+
+    # The writer thread. The records of the buffer are written from the buffer itself: their slots are only reused
+    # once 'tail' has moved past them.
+    def write_records(self):
+        record_size = RECORD.size
+        buffer = memoryview(self.buffer)
+        while True:
+            closing = self.closing
+            head = self.head
+            while self.tail < head:
+                start = self.tail % self.capacity
+                end = min(start + head - self.tail, self.capacity)
+                self.file.write(buffer[start * record_size:end * record_size])
+                self.tail += end - start
+            if closing:
+                return
+            self.wake_up.wait(settings.TELEMETRY_FLUSH_INTERVAL)
+            self.wake_up.clear()
+
+    # Writes the last records and closes the file. The number of dropped records is written at the end.
+    def close(self):
+        if self.file.closed:
+            return
+        self.simulation.events.unsubscribe(self.record_event)
+        self.closing = True
+        self.wake_up.set()
+        self.writer.join()
+        self.file.write(RECORD.pack(self.simulation.clock.get_ticks(), DROPPED, 0, self.dropped))
+        self.file.close()
+
+# Reads a telemetry file. Returns the seed, the start time and the records as (time, name, detail, value) tuples.
+# A file cut short (for example when the game was killed) stops at its last complete record.
+def read_session(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, seed, start_time = HEADER.unpack_from(data)
+    if magic != TELEMETRY_MAGIC or version != TELEMETRY_VERSION:
+        raise ValueError('%s is not a telemetry file of this version of the game.' % path)
+    end = HEADER.size + (len(data) - HEADER.size) // RECORD.size * RECORD.size
+    records = [(ticks, RECORD_NAMES[code], detail, value) for ticks, code, detail, value in RECORD.iter_unpack(data[HEADER.size:end])]
+    return seed, start_time, records
+
+# Sums up a session: the number of each event, the scores of the games, and the mean and peak number of entities of
+# each group over the frames.
+def summarize_session(path):
+    seed, start_time, records = read_session(path)
+    events = Counter()
+    scores = []
+    frames = 0
+    entity_totals = [0] * len(ENTITY_GROUPS)
+    entity_peaks = [0] * len(ENTITY_GROUPS)
+    dropped = 0
+    for ticks, name, detail, value in records:
+        if name == 'ENTITIES':
+            entity_totals[detail] += value
+            if value > entity_peaks[detail]:
+                entity_peaks[detail] = value
+        elif name == 'FRAME':
+            frames += 1
+        elif name == 'DROPPED':
+            dropped = value
+        else:
+            events[name] += 1
+            if name == DEATH:
+                scores.append(value)
+    return {
+        'seed': seed,
+        'start_time': start_time,
+        'duration': records[-1][0] - records[0][0] if records else 0,
+        'frames': frames,
+        'events': events,
+        'scores': scores,
+        'entity_means': {name: entity_totals[index] / frames if frames else 0 for index, name in enumerate(ENTITY_GROUPS)},
+        'entity_peaks': dict(zip(ENTITY_GROUPS, entity_peaks)),
+        'dropped': dropped
+    }
+
+# Sums up telemetry files: python telemetry.py [files or directories]
+# A directory stands for all of the telemetry files in it. Without arguments, 'settings.TELEMETRY_DIRECTORY' is read.
+if __name__ == '__main__':
+    import sys
+    paths = sys.argv[1:] or [settings.TELEMETRY_DIRECTORY or '.']
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.telemetry'))
+        else:
+            files.append(path)
+    all_events = Counter()
+    all_scores = []
+    all_frames = 0
+    for path in files:
+        summary = summarize_session(path)
+        all_events += summary['events']
+        all_scores += summary['scores']
+        all_frames += summary['frames']
+        print('%s: seed %d, %.1f s of game, %d frames, %d games, best score %d, %d dropped records' % (
+            path, summary['seed'], summary['duration'] / 1000, summary['frames'], len(summary['scores']),
+            max(summary['scores'], default=0), summary['dropped']))
+        print('  entities (mean/peak): ' + ', '.join('%s %.1f/%d' % (name, summary['entity_means'][name], summary['entity_peaks'][name])
+                                                    for name in ENTITY_GROUPS if summary['entity_peaks'][name] > 0))
+    games = len(all_scores)
+    print('%d sessions, %d frames, %d games, mean score %.0f' % (len(files), all_frames, games, sum(all_scores) / games if games else 0))
+    for name in RECORD_NAMES:
+        if all_events[name]:
+            print('  %-20s %8d  (%.1f per game)' % (name, all_events[name], all_events[name] / max(games, 1)))
@@ -0,0 +1,79 @@
+# text_cache.py
+import pygame
+from collections import OrderedDict
+
+# The characters that are pre-rendered for the numbers of the HUD.
+NUMBER_CHARACTERS = '0123456789-'
+
+# Keeps the fonts and the rendered texts so that the same text is never rendered twice.
+# - The fonts are created once and reused.
+# - The rendered texts are kept in a least recently used cache of 'max_entries' texts.
+# - The numbers (like the score) change at every frame, so instead of rendering them we draw them with an atlas
+#   of pre-rendered digits.
+class TextCache:
+    def __init__(self, max_entries):
+        self.fonts = {}
+        self.rendered_texts = OrderedDict()
+        self.max_entries = max_entries
+        # Each atlas links a character to its rendered image, for one font and one color.
+        self.glyph_atlases = {}
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the font with this name and size. 'system' is True for the fonts found with pygame.font.SysFont.
+    def get_font(self, name, size, system=False):
+        key = (name, size, system)
+        font = self.fonts.get(key)
+        if font is None:
+            if system:
+                font = pygame.font.SysFont(name, size)
+            else:
+                font = pygame.font.Font(name, size)
+            self.fonts[key] = font
+        return font
+
+    # Returns the rendered text. It is only rendered the first time, the next calls return the same image.
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        text_surface = self.rendered_texts.get(key)
+        if text_surface is not None:
+            self.hits += 1
+            self.rendered_texts.move_to_end(key)
+            return text_surface
+        self.misses += 1
+        text_surface = font.render(text, True, color)
+        self.rendered_texts[key] = text_surface
+        if len(self.rendered_texts) > self.max_entries:
+            self.rendered_texts.popitem(last=False)
+        return text_surface
+
+    def glyph_atlas(self, font, color):
+        key = (font, tuple(color))
+        atlas = self.glyph_atlases.get(key)
+        if atlas is None:
+            atlas = {character: font.render(character, True, color) for character in NUMBER_CHARACTERS}
+            self.glyph_atlases[key] = atlas
+        return atlas
+
+    # Returns the (surface, position) commands drawing the prefix followed by the number, with its top left corner
+    # at (x, y), for Surface.blits or a RenderQueue. The prefix comes from the cache of rendered texts and the number
+    # is made of the pre-rendered digits.
+    def number_commands(self, font, prefix, number, x, y, color):
+        prefix_surface = self.render(font, prefix, color)
+        commands = [(prefix_surface, (x, y))]
+        x += prefix_surface.get_width()
+        atlas = self.glyph_atlas(font, color)
+        for character in str(number):
+            glyph = atlas[character]
+            commands.append((glyph, (x, y)))
+            x += glyph.get_width()
+        return commands
+
+    def draw_number(self, surface, font, prefix, number, x, y, color):
+        surface.blits(self.number_commands(font, prefix, number, x, y, color), doreturn=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
@@ -0,0 +1,305 @@
+# vec_env.py
+# Runs many games at once for bots and training, without any window. Each game is an environment:
+# - reset() starts a new game and returns its first observation,
+# - step(action) runs one step of the simulation and returns the observation, the reward (how much the score went
+#   up) and done (True when the player is dead).
+# The action is a number between 0 and 15 made of the same bits as the replays: 1 for left, 2 for right, 4 for jump
+# and 8 for attack.
+#
+# The observation is either a vector of features (see 'observe_features') or the image of the game, scaled down to
+# 'settings.VEC_ENV_PIXEL_WIDTH' x 'settings.VEC_ENV_PIXEL_HEIGHT' pixels and drawn on a surface that is never shown.
+#
+# VectorEnv runs N environments in a pool of processes. The actions, observations, rewards and dones are exchanged
+# through shared memory, so only a few bytes go through the pipes at each step. This module needs NumPy.
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from functions import *
+from replay import bits_to_inputs
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NUMBER_OF_ACTIONS = 16
+PLAYER_FEATURES = 8
+BADDIE_FEATURES = 5
+PLATFORM_FEATURES = 3
+SHIELD_PICKUP_FEATURES = 3
+# The number of seconds between two checks that a process is still running, while waiting for its answer.
+ANSWER_POLL_INTERVAL = 1.0
+
+def number_of_features():
+    return (PLAYER_FEATURES + settings.VEC_ENV_NEAREST_BADDIES * BADDIE_FEATURES +
+            settings.VEC_ENV_NEAREST_PLATFORMS * PLATFORM_FEATURES + SHIELD_PICKUP_FEATURES)
+
+def observation_shape(pixels):
+    if pixels:
+        return (settings.VEC_ENV_PIXEL_HEIGHT, settings.VEC_ENV_PIXEL_WIDTH, 3)
+    return (number_of_features(),)
+
+def observation_type(pixels):
+    if pixels:
+        return numpy.uint8
+    return numpy.float32
+
+# Returns the sprites of the group sorted from the closest to the farthest from the point.
+def closest_sprites(group, x, y, number):
+    return sorted(group, key=lambda sprite: (sprite.rect.centerx - x) ** 2 + (sprite.rect.centery - y) ** 2)[:number]
+
+# Writes the features of the game in 'features' (a float32 array). The positions are relative to the player and
+# divided by the size of the window, so that they stay around -1 to 1. The missing entities are left at 0, with a
+# 0 in their 'present' feature.
+def observe_features(simulation, features):
+    features[:] = 0
+    width = settings.WINDOW_WIDTH
+    height = settings.WINDOW_HEIGHT
+    player = simulation.player
+    x, y = player.rect.center
+    features[0:PLAYER_FEATURES] = (x / width, y / height,
+                                   player.velocity.x / settings.PLAYER_JUMP_STRENGTH, player.velocity.y / settings.PLAYER_JUMP_STRENGTH,
+                                   player.lives / settings.PLAYER_STARTING_LIVES, player.has_shield, player.is_invulnerable,
+                                   player.on_ground or player.on_platform)
+    index = PLAYER_FEATURES
+    for baddie in closest_sprites(simulation.baddie_group, x, y, settings.VEC_ENV_NEAREST_BADDIES):
+        features[index:index + BADDIE_FEATURES] = ((baddie.rect.centerx - x) / width, (baddie.rect.centery - y) / height,
+                                                   baddie.size / settings.BADDIE_MAX_SIZE, baddie.speed / settings.BADDIE_MAX_SPEED, 1)
+        index += BADDIE_FEATURES
+    index = PLAYER_FEATURES + settings.VEC_ENV_NEAREST_BADDIES * BADDIE_FEATURES
+    for platform in closest_sprites(simulation.platform_group, x, y, settings.VEC_ENV_NEAREST_PLATFORMS):
+        features[index:index + PLATFORM_FEATURES] = ((platform.rect.centerx - x) / width, (platform.rect.centery - y) / height, 1)
+        index += PLATFORM_FEATURES
+    index = PLAYER_FEATURES + settings.VEC_ENV_NEAREST_BADDIES * BADDIE_FEATURES + settings.VEC_ENV_NEAREST_PLATFORMS * PLATFORM_FEATURES
+    for shield_pickup in closest_sprites(simulation.shield_pickup_group, x, y, 1):
+        features[index:index + SHIELD_PICKUP_FEATURES] = ((shield_pickup.rect.centerx - x) / width, (shield_pickup.rect.centery - y) / height, 1)
+
+# One game without a window. 'observation' is the array where the observations are written, by default a new one.
+class DodgerEnv:
+    def __init__(self, assets, seed=None, pixels=False, observation=None):
+        if numpy is None:
+            raise ImportError('The environments need NumPy (pip install numpy).')
+        from simulation import GameSimulation
+        self.simulation = GameSimulation(assets, seed=seed)
+        self.pixels = pixels
+        if observation is None:
+            observation = numpy.zeros(observation_shape(pixels), dtype=observation_type(pixels))
+        self.observation = observation
+        self.renderer = None
+        if pixels:
+            from renderer import GameRenderer
+            # The game is drawn on a surface that is never shown, then scaled down.
+            self.surface = pygame.Surface((settings.WINDOW_WIDTH, settings.WINDOW_HEIGHT))
+            self.small_surface = pygame.Surface((settings.VEC_ENV_PIXEL_WIDTH, settings.VEC_ENV_PIXEL_HEIGHT))
+            self.renderer = GameRenderer(self.surface, assets, text_cache.get_font(None, 48))
+
+    def reset(self):
+        self.simulation.reset()
+        self.observe()
+        return self.observation
+
+    def step(self, action):
+        simulation = self.simulation
+        score = simulation.score
+        simulation.step(bits_to_inputs(action))
+        if self.renderer is not None:
+            self.renderer.update()
+        self.observe()
+        return self.observation, simulation.score - score, simulation.player.dead
+
+    def observe(self):
+        if not self.pixels:
+            observe_features(self.simulation, self.observation)
+            return
+        # Every phase of the renderer draws on the surface, except the one that updates the window.
+        for phase_name, phase in self.renderer.draw_phases:
+            if phase_name != 'display':
+                phase(self.simulation)
+        pygame.transform.scale(self.surface, self.small_surface.get_size(), self.small_surface)
+        self.observation[:] = numpy.frombuffer(pygame.image.tobytes(self.small_surface, 'RGB'), dtype=numpy.uint8).reshape(self.observation.shape)
+
+# The arrays shared by VectorEnv and its processes.
+class SharedArrays:
+    def __init__(self, number_of_envs, pixels, names=None):
+        shapes = {
+            'actions': ((number_of_envs,), numpy.uint8),
+            'observations': ((number_of_envs,) + observation_shape(pixels), observation_type(pixels)),
+            'rewards': ((number_of_envs,), numpy.float32),
+            'dones': ((number_of_envs,), numpy.bool_)
+        }
+        self.memories = {}
+        self.arrays = {}
+        for name, (shape, dtype) in shapes.items():
+            size = max(1, int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize)
+            if names is None:
+                memory = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                memory = shared_memory.SharedMemory(name=names[name])
+            self.memories[name] = memory
+            self.arrays[name] = numpy.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+    def names(self):
+        return {name: memory.name for name, memory in self.memories.items()}
+
+    def close(self, unlink=False):
+        self.arrays = {}
+        for memory in self.memories.values():
+            memory.close()
+            if unlink:
+                memory.unlink()
+
+# Runs in each process of the pool. It owns the environments 'first_env' to 'first_env + number_of_envs - 1' and
+# answers the commands received through the pipe. A finished game is reset at once, so the observation returned
+# with done=True is the first observation of the next game.
+def worker(connection, shared_names, total_envs, first_env, number_of_envs, pixels, seed):
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    pygame.init()
+    from assets import GameAssets
+    shared = SharedArrays(total_envs, pixels, shared_names)
+    # The asset pack was prepared by the parent process, the workers only open it.
+    assets = GameAssets(writes_pack=False)
+    actions = shared.arrays['actions']
+    observations = shared.arrays['observations']
+    rewards = shared.arrays['rewards']
+    dones = shared.arrays['dones']
+    envs = []
+    for index in range(first_env, first_env + number_of_envs):
+        env_seed = None if seed is None else seed + index
+        envs.append(DodgerEnv(assets, seed=env_seed, pixels=pixels, observation=observations[index]))
+    connection.send('ready')
+    while True:
+        command = connection.recv()
+        if command == 'step':
+            for index, env in enumerate(envs, first_env):
+                observation, reward, done = env.step(int(actions[index]))
+                if done:
+                    env.reset()
+                rewards[index] = reward
+                dones[index] = done
+        elif command == 'reset':
+            for env in envs:
+                env.reset()
+        connection.send(command)
+        if command == 'close':
+            break
+    envs = None
+    observations = actions = rewards = dones = None
+    shared.close()
+    connection.close()
+
+class VectorEnv:
+    def __init__(self, number_of_envs, number_of_processes=None, pixels=False, seed=None):
+        if numpy is None:
+            raise ImportError('The environments need NumPy (pip install numpy).')
+        if number_of_processes is None:
+            number_of_processes = os.cpu_count() or 1
+        number_of_processes = max(1, min(number_of_processes, number_of_envs))
+        self.number_of_envs = number_of_envs
+        self.shared = SharedArrays(number_of_envs, pixels)
+        self.actions = self.shared.arrays['actions']
+        self.observations = self.shared.arrays['observations']
+        self.rewards = self.shared.arrays['rewards']
+        self.dones = self.shared.arrays['dones']
+        # The asset pack is built here, once, before the processes open it.
+        from assets import prepare_asset_pack
+        prepare_asset_pack()
+        # The processes are started with 'spawn', so that each one initializes pygame and SDL on its own.
+        context = multiprocessing.get_context('spawn')
+        self.connections = []
+        self.processes = []
+        first_env = 0
+        for process_index in range(number_of_processes):
+            number_of_envs_in_process = number_of_envs // number_of_processes + (process_index < number_of_envs % number_of_processes)
+            connection, process_connection = context.Pipe()
+            process = context.Process(target=worker, args=(process_connection, self.shared.names(), number_of_envs, first_env,
+                                                           number_of_envs_in_process, pixels, seed), daemon=True)
+            process.start()
+            # Only the process keeps its end of the pipe open, so the pipe is closed when the process stops.
+            process_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+            first_env += number_of_envs_in_process
+        try:
+            self.wait_for_answers()
+        except RuntimeError:
+            self.close()
+            raise
+
+    # Waits for the answer of every process. A process that stopped (for example after an error) raises an error
+    # here instead of leaving the caller waiting forever.
+    def wait_for_answers(self):
+        for connection, process in zip(self.connections, self.processes):
+            while not connection.poll(ANSWER_POLL_INTERVAL):
+                if not process.is_alive():
+                    break
+            try:
+                connection.recv()
+            except EOFError:
+                process.join(ANSWER_POLL_INTERVAL)
+                raise RuntimeError('The process %s of the environments stopped (exit code %s).' % (process.name, process.exitcode)) from None
+
+    def send(self, command):
+        for connection in self.connections:
+            connection.send(command)
+        self.wait_for_answers()
+
+    # Starts a new game in every environment. The returned array is shared: it is overwritten by the next step.
+    def reset(self):
+        self.send('reset')
+        return self.observations
+
+    # 'actions' holds one action per environment. The returned arrays are shared: they are overwritten by the next step.
+    def step(self, actions):
+        self.actions[:] = actions
+        self.send('step')
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        if not self.processes:
+            return
+        try:
+            self.send('close')
+        except (RuntimeError, OSError):
+            # One of the processes stopped, the others are stopped too.
+            for process in self.processes:
+                process.terminate()
+        for process in self.processes:
+            process.join()
+        for connection in self.connections:
+            connection.close()
+        self.processes = []
+        self.connections = []
+        self.actions = self.observations = self.rewards = self.dones = None
+        self.shared.close(unlink=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+# Measures the number of steps per second of all the environments together, with random actions:
+# python vec_env.py [--envs N] [--processes P] [--steps S] [--pixels]
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Measures the speed of the vectorized environments.')
+    parser.add_argument('--envs', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--steps', type=int, default=2000, help='number of steps of each environment')
+    parser.add_argument('--pixels', action='store_true', help='observe the scaled down image instead of the features')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    random_generator = numpy.random.default_rng(arguments.seed)
+    with VectorEnv(arguments.envs, arguments.processes, arguments.pixels, arguments.seed) as env:
+        env.reset()
+        episodes = 0
+        start_time = time.perf_counter()
+        for _ in range(arguments.steps):
+            observations, rewards, dones = env.step(random_generator.integers(0, NUMBER_OF_ACTIONS, arguments.envs))
+            episodes += int(dones.sum())
+        elapsed_time = time.perf_counter() - start_time
+        total_steps = arguments.steps * arguments.envs
+        print('%d environments in %d processes, observations of shape %s' % (arguments.envs, len(env.processes), observations.shape[1:]))
+        print('%d steps (%d games finished) in %.2f s: %d steps per second' % (total_steps, episodes, elapsed_time, total_steps / elapsed_time))